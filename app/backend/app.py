@@ -1,6 +1,5 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
-from io import StringIO
 from typing import Optional
 import asyncio
 #from sse_starlette.sse import EventSourceResponse
@@ -9,45 +8,38 @@ from starlette.responses import Response
 import logging
 import os
 import json
+import hashlib
+import importlib
+import tempfile
 import urllib.parse
-import pandas as pd
+from functools import partial
 from datetime import datetime, time, timedelta
 from fastapi.staticfiles import StaticFiles
-from fastapi import FastAPI, File, HTTPException, Request, UploadFile
-from fastapi.responses import RedirectResponse, StreamingResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, RedirectResponse, StreamingResponse
 import openai
-from approaches.comparewebwithwork import CompareWebWithWork
-from approaches.compareworkwithweb import CompareWorkWithWeb
-from approaches.chatreadretrieveread import ChatReadRetrieveReadApproach
-from approaches.chatwebretrieveread import ChatWebRetrieveRead
-from approaches.gpt_direct_approach import GPTDirectApproach
+from openai import AsyncAzureOpenAI
 from approaches.approach import Approaches
+from core.semanticcache import SemanticCache
+from core.languagedetector import LanguageDetector
+from core.indexgeneration import IndexGeneration
+from core.httptransport import HttpTransport
+from core.citationcache import CitationCache
+from core.modelmetadata import ModelMetadata
+from core.approachregistry import ApproachRegistry
 from azure.core.credentials import AzureKeyCredential
 from azure.identity import DefaultAzureCredential, AzureAuthorityHosts
-from azure.mgmt.cognitiveservices import CognitiveServicesManagementClient
-from azure.search.documents import SearchClient
+from azure.search.documents.aio import SearchClient
 from azure.storage.blob import (
     AccountSasPermissions,
+    BlobPrefix,
     BlobServiceClient,
     ResourceTypes,
-    generate_account_sas,
-)
-from approaches.mathassistant import(
-    generate_response,
-    process_agent_scratch_pad,
-    process_agent_response,
-    stream_agent_responses
-)
-from approaches.tabulardataassistant import (
-    refreshagent,
-    save_df,
-    process_agent_response as td_agent_response,
-    process_agent_scratch_pad as td_agent_scratch_pad,
-    get_images_in_temp
-
 )
+from azure.storage.blob.aio import BlobServiceClient as AsyncBlobServiceClient
 from shared_code.status_log import State, StatusClassification, StatusLog, StatusQueryLevel
-from azure.cosmos import CosmosClient
+from shared_code.sas_provider import SasProvider
+from shared_code.ttl_cache import TTLCache
 
 
 # === ENV Setup ===
@@ -102,7 +94,46 @@ ENV = {
     "ENABLE_MATH_ASSISTANT": "false",
     "ENABLE_TABULAR_DATA_ASSISTANT": "false",
     "ENABLE_MULTIMEDIA": "false",
-    "MAX_CSV_FILE_SIZE": "7"
+    "MAX_CSV_FILE_SIZE": "7",
+    "ENABLE_PARALLEL_RETRIEVAL": "false",
+    "EMBEDDING_CACHE_SIZE": "1000",
+    "EMBEDDING_CACHE_TTL_SECONDS": "3600",
+    "ENABLE_ANSWER_CACHE": "false",
+    "ANSWER_CACHE_SIZE": "500",
+    "ANSWER_CACHE_TTL_SECONDS": "3600",
+    "ANSWER_CACHE_SIMILARITY_THRESHOLD": "0.97",
+    "ENABLE_LOCAL_LANGUAGE_DETECTION": "true",
+    "LANGUAGE_DETECTION_CONFIDENCE": "0.9",
+    "TRANSLATION_CACHE_SIZE": "1000",
+    "TRANSLATION_CACHE_TTL_SECONDS": "86400",
+    "SEARCH_CACHE_SIZE": "1000",
+    "SEARCH_CACHE_MAX_MB": "64",
+    "SEARCH_CACHE_TTL_SECONDS": "300",
+    "INDEX_GENERATION_REFRESH_SECONDS": "5",
+    "HTTP_POOL_OPENAI_MAX_CONNECTIONS": "100",
+    "HTTP_POOL_ENRICHMENT_MAX_CONNECTIONS": "50",
+    "HTTP_POOL_TRANSLATOR_MAX_CONNECTIONS": "20",
+    "HTTP_POOL_WARM_CONNECTIONS": "2",
+    "HTTP_POOL_KEEPALIVE_SECONDS": "120",
+    "FOLDER_CACHE_TTL_SECONDS": "30",
+    "TAG_CACHE_TTL_SECONDS": "60",
+    "CITATION_CACHE_SIZE": "500",
+    "CITATION_CACHE_TTL_SECONDS": "3600",
+    "CITATION_CACHE_REVALIDATE_SECONDS": "60",
+    "MODEL_METADATA_CACHE_FILE": os.path.join(os.path.expanduser("~"), ".cache", "infoasst", "model_metadata.json"),
+    "TABULAR_SESSION_MAX_MB": "512",
+    "TABULAR_STORE_MAX_MB": "2048",
+    "TABULAR_SESSION_TTL_SECONDS": "3600",
+    "TABULAR_SPILL_DIR": os.path.join(tempfile.gettempdir(), "infoasst_tabular"),
+    "TABULAR_CHARTS_PER_SESSION": "20",
+    "TABULAR_CHART_STORE_MAX_MB": "128",
+    "TABULAR_CHART_TTL_SECONDS": "3600",
+    "TABULAR_DATA_ENGINE": "pandas",
+    "TABULAR_DUCKDB_MEMORY_LIMIT_MB": "1024",
+    "TABULAR_DUCKDB_THREADS": "0",
+    "HINT_CACHE_SIZE": "1000",
+    "HINT_CACHE_TTL_SECONDS": "604800",
+    "HINT_CACHE_FILE": ""
     }
 
 for key, value in ENV.items():
@@ -118,7 +149,6 @@ log = logging.getLogger("uvicorn")
 log.setLevel('DEBUG')
 log.propagate = True
 
-dffinal = None
 # Used by the OpenAI SDK
 openai.api_type = "azure"
 openai.api_base = ENV["AZURE_OPENAI_ENDPOINT"]
@@ -156,40 +186,120 @@ blob_client = BlobServiceClient(
     account_url=ENV["AZURE_BLOB_STORAGE_ENDPOINT"],
     credential=ENV["AZURE_BLOB_STORAGE_KEY"],
 )
-blob_container = blob_client.get_container_client(ENV["AZURE_BLOB_STORAGE_CONTAINER"])
-
-model_name = ''
-model_version = ''
-
-# Set up OpenAI management client
-openai_mgmt_client = CognitiveServicesManagementClient(
-    credential=azure_credential,
-    subscription_id=ENV["AZURE_SUBSCRIPTION_ID"],
-    base_url=ENV["AZURE_ARM_MANAGEMENT_API"],
-    credential_scopes=[ENV["AZURE_ARM_MANAGEMENT_API"] + "/.default"])
-
-deployment = openai_mgmt_client.deployments.get(
-    resource_group_name=ENV["AZURE_OPENAI_RESOURCE_GROUP"],
-    account_name=ENV["AZURE_OPENAI_SERVICE"],
-    deployment_name=ENV["AZURE_OPENAI_CHATGPT_DEPLOYMENT"])
-
-model_name = deployment.properties.model.name
-model_version = deployment.properties.model.version
-
-if (str_to_bool.get(ENV["USE_AZURE_OPENAI_EMBEDDINGS"])):
-    embedding_deployment = openai_mgmt_client.deployments.get(
-        resource_group_name=ENV["AZURE_OPENAI_RESOURCE_GROUP"],
-        account_name=ENV["AZURE_OPENAI_SERVICE"],
-        deployment_name=ENV["EMBEDDING_DEPLOYMENT_NAME"])
-
-    embedding_model_name = embedding_deployment.properties.model.name
-    embedding_model_version = embedding_deployment.properties.model.version
+# Async blob client used on the request path (citations) so downloads don't block the event loop
+async_blob_client = AsyncBlobServiceClient(
+    account_url=ENV["AZURE_BLOB_STORAGE_ENDPOINT"],
+    credential=ENV["AZURE_BLOB_STORAGE_KEY"],
+)
+async_blob_container = async_blob_client.get_container_client(ENV["AZURE_BLOB_STORAGE_CONTAINER"])
+# SAS tokens are signed once per scope and shared by the approaches and the upload URL endpoint
+sas_provider = SasProvider(ENV["AZURE_BLOB_STORAGE_ACCOUNT"], ENV["AZURE_BLOB_STORAGE_KEY"])
+
+def resolve_model_metadata() -> dict:
+    """Look up the models behind the chat and embeddings deployments, unless they are set in the environment"""
+    values = {
+        "model_name": ENV["AZURE_OPENAI_CHATGPT_MODEL_NAME"],
+        "model_version": ENV["AZURE_OPENAI_CHATGPT_MODEL_VERSION"],
+        "embedding_model_name": ENV["AZURE_OPENAI_EMBEDDINGS_MODEL_NAME"],
+        "embedding_model_version": ENV["AZURE_OPENAI_EMBEDDINGS_VERSION"],
+    }
+    deployments = {"model": ENV["AZURE_OPENAI_CHATGPT_DEPLOYMENT"]}
+    if str_to_bool.get(ENV["USE_AZURE_OPENAI_EMBEDDINGS"]):
+        deployments["embedding_model"] = ENV["EMBEDDING_DEPLOYMENT_NAME"]
+    else:
+        values["embedding_model_name"] = ""
+        values["embedding_model_version"] = ""
+    deployments = {prefix: name for prefix, name in deployments.items()
+                   if not (values[f"{prefix}_name"] and values[f"{prefix}_version"])}
+    if deployments:
+        from azure.mgmt.cognitiveservices import CognitiveServicesManagementClient
+        # Set up OpenAI management client
+        openai_mgmt_client = CognitiveServicesManagementClient(
+            credential=azure_credential,
+            subscription_id=ENV["AZURE_SUBSCRIPTION_ID"],
+            base_url=ENV["AZURE_ARM_MANAGEMENT_API"],
+            credential_scopes=[ENV["AZURE_ARM_MANAGEMENT_API"] + "/.default"])
+        for prefix, deployment_name in deployments.items():
+            deployment = openai_mgmt_client.deployments.get(
+                resource_group_name=ENV["AZURE_OPENAI_RESOURCE_GROUP"],
+                account_name=ENV["AZURE_OPENAI_SERVICE"],
+                deployment_name=deployment_name)
+            values[f"{prefix}_name"] = deployment.properties.model.name
+            values[f"{prefix}_version"] = deployment.properties.model.version
+    return values
+
+# Model names and versions are resolved after startup, the values of the previous run are used meanwhile
+model_metadata = ModelMetadata(
+    ENV["MODEL_METADATA_CACHE_FILE"],
+    {
+        "service": ENV["AZURE_OPENAI_SERVICE"],
+        "chat_deployment": ENV["AZURE_OPENAI_CHATGPT_DEPLOYMENT"],
+        "embedding_deployment": ENV["EMBEDDING_DEPLOYMENT_NAME"] if str_to_bool.get(ENV["USE_AZURE_OPENAI_EMBEDDINGS"]) else "",
+    },
+    resolve_model_metadata)
+
+# Query embeddings are shared by the grounded approaches so popular queries skip the enrichment service
+embedding_cache = TTLCache(int(ENV["EMBEDDING_CACHE_SIZE"]), float(ENV["EMBEDDING_CACHE_TTL_SECONDS"]))
+# Final grounded answers replayed for semantically equivalent questions
+if str_to_bool.get(ENV["ENABLE_ANSWER_CACHE"]):
+    answer_cache = SemanticCache(int(ENV["ANSWER_CACHE_SIZE"]),
+                                 float(ENV["ANSWER_CACHE_TTL_SECONDS"]),
+                                 float(ENV["ANSWER_CACHE_SIMILARITY_THRESHOLD"]))
 else:
-    embedding_model_name = ""
-    embedding_model_version = ""
-
-chat_approaches = {
-    Approaches.ReadRetrieveRead: ChatReadRetrieveReadApproach(
+    answer_cache = None
+# Language of the questions is identified locally when confident, translated queries are reused
+if str_to_bool.get(ENV["ENABLE_LOCAL_LANGUAGE_DETECTION"]):
+    language_detector = LanguageDetector(float(ENV["LANGUAGE_DETECTION_CONFIDENCE"]))
+else:
+    language_detector = None
+translation_cache = TTLCache(int(ENV["TRANSLATION_CACHE_SIZE"]), float(ENV["TRANSLATION_CACHE_TTL_SECONDS"]))
+# Search results are bounded by their serialized size and invalidated when the index generation changes
+search_cache = TTLCache(int(ENV["SEARCH_CACHE_SIZE"]),
+                        float(ENV["SEARCH_CACHE_TTL_SECONDS"]),
+                        max_weight=int(float(ENV["SEARCH_CACHE_MAX_MB"]) * 1024 * 1024),
+                        weigher=lambda results: len(json.dumps(results, default=str)))
+# Tags in use, read from the catalog maintained by StatusLog.update_document_tags
+tag_cache = TTLCache(1, float(ENV["TAG_CACHE_TTL_SECONDS"]))
+
+def on_index_change():
+    """Drop what depends on indexed content, newly tagged documents are indexed too"""
+    search_cache.clear()
+    tag_cache.clear()
+
+index_generation = IndexGeneration(statusLog, float(ENV["INDEX_GENERATION_REFRESH_SECONDS"]), on_index_change)
+
+# Keep-alive connection pools for the outbound calls, one per upstream, shared by every approach
+http_transport = HttpTransport(keepalive_seconds=float(ENV["HTTP_POOL_KEEPALIVE_SECONDS"]))
+warm_connections = int(ENV["HTTP_POOL_WARM_CONNECTIONS"])
+http_transport.add("openai", ENV["AZURE_OPENAI_ENDPOINT"], int(ENV["HTTP_POOL_OPENAI_MAX_CONNECTIONS"]), warm_connections)
+http_transport.add("enrichment", ENV["ENRICHMENT_APPSERVICE_URL"], int(ENV["HTTP_POOL_ENRICHMENT_MAX_CONNECTIONS"]), warm_connections)
+http_transport.add("translator", f"https://{ENV['AZURE_AI_TRANSLATION_DOMAIN']}", int(ENV["HTTP_POOL_TRANSLATOR_MAX_CONNECTIONS"]), warm_connections)
+openai_client = AsyncAzureOpenAI(
+    azure_endpoint=ENV["AZURE_OPENAI_ENDPOINT"],
+    api_key=ENV["AZURE_OPENAI_SERVICE_KEY"],
+    api_version=openai.api_version,
+    http_client=http_transport.client("openai"))
+web_search_client = None
+# Chunks opened as citations, warmed with the citations of each answer while it streams
+citation_cache = CitationCache(async_blob_container,
+                               int(ENV["CITATION_CACHE_SIZE"]),
+                               float(ENV["CITATION_CACHE_TTL_SECONDS"]),
+                               float(ENV["CITATION_CACHE_REVALIDATE_SECONDS"]))
+# Folders of the upload container, read from the catalog maintained by the upload and deletion functions
+folder_cache = TTLCache(1, float(ENV["FOLDER_CACHE_TTL_SECONDS"]))
+
+def get_web_search_client():
+    """Bing client shared by the web approaches, created with the first of them"""
+    global web_search_client
+    if web_search_client is None:
+        from approaches.chatwebretrieveread import build_web_search_client
+        web_search_client = build_web_search_client(ENV["BING_SEARCH_ENDPOINT"], ENV["BING_SEARCH_KEY"])
+    return web_search_client
+
+# The approach modules are imported by their factory, so disabled approaches cost nothing at startup
+def build_read_retrieve_read():
+    from approaches.chatreadretrieveread import ChatReadRetrieveReadApproach
+    return ChatReadRetrieveReadApproach(
                                     search_client,
                                     ENV["AZURE_OPENAI_ENDPOINT"],
                                     ENV["AZURE_OPENAI_SERVICE_KEY"],
@@ -201,33 +311,56 @@ chat_approaches = {
                                     ENV["AZURE_BLOB_STORAGE_CONTAINER"],
                                     blob_client,
                                     ENV["QUERY_TERM_LANGUAGE"],
-                                    model_name,
-                                    model_version,
+                                    model_metadata.get("model_name"),
+                                    model_metadata.get("model_version"),
                                     ENV["TARGET_EMBEDDINGS_MODEL"],
                                     ENV["ENRICHMENT_APPSERVICE_URL"],
                                     ENV["TARGET_TRANSLATION_LANGUAGE"],
                                     ENV["ENRICHMENT_ENDPOINT"],
                                     ENV["ENRICHMENT_KEY"],
                                     ENV["AZURE_AI_TRANSLATION_DOMAIN"],
-                                    str_to_bool.get(ENV["USE_SEMANTIC_RERANKER"])
-                                ),
-    Approaches.ChatWebRetrieveRead: ChatWebRetrieveRead(
-                                    model_name,
+                                    str_to_bool.get(ENV["USE_SEMANTIC_RERANKER"]),
+                                    str_to_bool.get(ENV["ENABLE_PARALLEL_RETRIEVAL"]),
+                                    embedding_cache,
+                                    answer_cache,
+                                    language_detector,
+                                    translation_cache,
+                                    sas_provider,
+                                    search_cache,
+                                    index_generation,
+                                    openai_client,
+                                    http_transport
+                                )
+
+def build_chat_web_retrieve_read():
+    from approaches.chatwebretrieveread import ChatWebRetrieveRead
+    return ChatWebRetrieveRead(
+                                    model_metadata.get("model_name"),
                                     ENV["AZURE_OPENAI_CHATGPT_DEPLOYMENT"],
                                     ENV["TARGET_TRANSLATION_LANGUAGE"],
                                     ENV["BING_SEARCH_ENDPOINT"],
                                     ENV["BING_SEARCH_KEY"],
-                                    str_to_bool.get(ENV["ENABLE_BING_SAFE_SEARCH"])
-    ),
-    Approaches.CompareWorkWithWeb: CompareWorkWithWeb( 
-                                    model_name,
+                                    str_to_bool.get(ENV["ENABLE_BING_SAFE_SEARCH"]),
+                                    openai_client,
+                                    get_web_search_client()
+    )
+
+def build_compare_work_with_web():
+    from approaches.compareworkwithweb import CompareWorkWithWeb
+    return CompareWorkWithWeb(
+                                    model_metadata.get("model_name"),
                                     ENV["AZURE_OPENAI_CHATGPT_DEPLOYMENT"],
                                     ENV["TARGET_TRANSLATION_LANGUAGE"],
                                     ENV["BING_SEARCH_ENDPOINT"],
                                     ENV["BING_SEARCH_KEY"],
-                                    str_to_bool.get(ENV["ENABLE_BING_SAFE_SEARCH"])
-    ),
-    Approaches.CompareWebWithWork: CompareWebWithWork(
+                                    str_to_bool.get(ENV["ENABLE_BING_SAFE_SEARCH"]),
+                                    openai_client,
+                                    get_web_search_client()
+    )
+
+def build_compare_web_with_work():
+    from approaches.comparewebwithwork import CompareWebWithWork
+    return CompareWebWithWork(
                                     search_client,
                                     ENV["AZURE_OPENAI_ENDPOINT"],
                                     ENV["AZURE_OPENAI_SERVICE_KEY"],
@@ -239,26 +372,178 @@ chat_approaches = {
                                     ENV["AZURE_BLOB_STORAGE_CONTAINER"],
                                     blob_client,
                                     ENV["QUERY_TERM_LANGUAGE"],
-                                    model_name,
-                                    model_version,
+                                    model_metadata.get("model_name"),
+                                    model_metadata.get("model_version"),
                                     ENV["TARGET_EMBEDDINGS_MODEL"],
                                     ENV["ENRICHMENT_APPSERVICE_URL"],
                                     ENV["TARGET_TRANSLATION_LANGUAGE"],
                                     ENV["ENRICHMENT_ENDPOINT"],
                                     ENV["ENRICHMENT_KEY"],
                                     ENV["AZURE_AI_TRANSLATION_DOMAIN"],
-                                    str_to_bool.get(ENV["USE_SEMANTIC_RERANKER"])
-                                ),
-    Approaches.GPTDirect: GPTDirectApproach(
+                                    str_to_bool.get(ENV["USE_SEMANTIC_RERANKER"]),
+                                    str_to_bool.get(ENV["ENABLE_PARALLEL_RETRIEVAL"]),
+                                    embedding_cache,
+                                    language_detector,
+                                    translation_cache,
+                                    sas_provider,
+                                    search_cache,
+                                    index_generation,
+                                    openai_client,
+                                    http_transport
+                                )
+
+def build_gpt_direct():
+    from approaches.gpt_direct_approach import GPTDirectApproach
+    return GPTDirectApproach(
                                 ENV["AZURE_OPENAI_SERVICE"],
                                 ENV["AZURE_OPENAI_SERVICE_KEY"],
                                 ENV["AZURE_OPENAI_CHATGPT_DEPLOYMENT"],
                                 ENV["QUERY_TERM_LANGUAGE"],
-                                model_name,
-                                model_version,
-                                ENV["AZURE_OPENAI_ENDPOINT"]
+                                model_metadata.get("model_name"),
+                                model_metadata.get("model_version"),
+                                ENV["AZURE_OPENAI_ENDPOINT"],
+                                openai_client
+    )
+
+def build_compare_work_and_web():
+    """Answers from work and web at once, reusing the instances of both approaches"""
+    from approaches.compareworkandweb import CompareWorkAndWeb
+    return CompareWorkAndWeb(
+                                chat_approaches.build(Approaches.ReadRetrieveRead),
+                                chat_approaches.build(Approaches.ChatWebRetrieveRead),
+                                model_metadata.get("model_name"),
+                                ENV["AZURE_OPENAI_CHATGPT_DEPLOYMENT"],
+                                ENV["TARGET_TRANSLATION_LANGUAGE"],
+                                openai_client
     )
-}
+
+enable_web_chat = str_to_bool.get(ENV["ENABLE_WEB_CHAT"])
+chat_approaches = ApproachRegistry(model_metadata.wait)
+chat_approaches.register(Approaches.ReadRetrieveRead, build_read_retrieve_read)
+chat_approaches.register(Approaches.ChatWebRetrieveRead, build_chat_web_retrieve_read, enable_web_chat)
+chat_approaches.register(Approaches.CompareWorkWithWeb, build_compare_work_with_web, enable_web_chat)
+chat_approaches.register(Approaches.CompareWebWithWork, build_compare_web_with_work, enable_web_chat)
+chat_approaches.register(Approaches.GPTDirect, build_gpt_direct, str_to_bool.get(ENV["ENABLE_UNGROUNDED_CHAT"]))
+chat_approaches.register(Approaches.CompareWorkAndWeb, build_compare_work_and_web, enable_web_chat)
+
+def math_assistant():
+    """The math assistant module, imported on first use since importing it builds its LangChain agent"""
+    return importlib.import_module("approaches.mathassistant")
+
+def tabular_data_assistant():
+    """The tabular data assistant module, imported on first use since it pulls in pandas and matplotlib"""
+    return importlib.import_module("approaches.tabulardataassistant")
+
+def tabular_sql_assistant():
+    """The tabular data assistant module answering with DuckDB SQL, imported on first use"""
+    return importlib.import_module("approaches.tabularsqlassistant")
+
+def use_duckdb_engine():
+    """Whether the tabular data assistant queries the uploaded data with DuckDB instead of pandas"""
+    return ENV["TABULAR_DATA_ENGINE"].lower() == "duckdb"
+
+# Frames uploaded to the tabular data assistant by session, created on first use since it pulls in pandas
+dataframe_store = None
+
+def get_dataframe_store():
+    """The store of the uploaded frames"""
+    global dataframe_store
+    if dataframe_store is None:
+        from core.dataframestore import DataFrameStore
+        from core.dataframeprofile import profile_frame
+        dataframe_store = DataFrameStore(ENV["TABULAR_SPILL_DIR"],
+                                         int(float(ENV["TABULAR_SESSION_MAX_MB"]) * 1024 * 1024),
+                                         int(float(ENV["TABULAR_STORE_MAX_MB"]) * 1024 * 1024),
+                                         float(ENV["TABULAR_SESSION_TTL_SECONDS"]),
+                                         profile_frame)
+    return dataframe_store
+
+# Charts generated by the tabular data assistant by session, created on first use since it pulls in matplotlib
+chart_store = None
+
+def get_chart_store():
+    """The store of the generated charts"""
+    global chart_store
+    if chart_store is None:
+        from core.chartstore import ChartStore
+        chart_store = ChartStore(int(ENV["TABULAR_CHARTS_PER_SESSION"]),
+                                 int(float(ENV["TABULAR_CHART_STORE_MAX_MB"]) * 1024 * 1024),
+                                 float(ENV["TABULAR_CHART_TTL_SECONDS"]))
+    return chart_store
+
+# Hints of the math tutor by question, created on first use since its key covers the hint prompt
+hint_cache = None
+
+def get_hint_cache():
+    """The cache of the math tutor hints"""
+    global hint_cache
+    if hint_cache is None:
+        from core.hintcache import HintCache
+        hint_cache = HintCache(int(ENV["HINT_CACHE_SIZE"]),
+                               float(ENV["HINT_CACHE_TTL_SECONDS"]),
+                               ENV["HINT_CACHE_FILE"],
+                               {"chat_deployment": ENV["AZURE_OPENAI_CHATGPT_DEPLOYMENT"],
+                                "prompt": hashlib.sha256(math_assistant().prompt.encode()).hexdigest()})
+    return hint_cache
+
+async def generate_hint(question: str) -> str:
+    """The clues of the math tutor's response to a question"""
+    response = await math_assistant().generate_response(question)
+    return response.split("Clues")[1][2:]
+
+# Embedded DuckDB the tabular data assistant runs its SQL on, created on first use
+duckdb_engine = None
+
+def get_duckdb_engine():
+    """The DuckDB engine of the tabular data assistant"""
+    global duckdb_engine
+    if duckdb_engine is None:
+        from core.duckdbengine import DuckDbEngine
+        duckdb_engine = DuckDbEngine(os.path.join(ENV["TABULAR_SPILL_DIR"], "duckdb"),
+                                     int(float(ENV["TABULAR_DUCKDB_MEMORY_LIMIT_MB"]) * 1024 * 1024),
+                                     int(ENV["TABULAR_DUCKDB_THREADS"]))
+    return duckdb_engine
+
+def tabular_agent(session_id: str):
+    """The tabular data assistant module of the configured engine, with the last argument of its
+    agent functions: the DuckDB engine, or the capture of the charts of the session"""
+    if use_duckdb_engine():
+        return tabular_sql_assistant(), get_duckdb_engine()
+    return tabular_data_assistant(), partial(get_chart_store().capture, session_id)
+
+def get_session_df(session_id: Optional[str]):
+    """The frame uploaded in a tabular data session and its profile, reading a spilled frame back
+    from disk, so called in a worker thread"""
+    if not session_id:
+        raise HTTPException(status_code=400, detail="session_id is required")
+    try:
+        return get_dataframe_store().get(session_id), get_dataframe_store().profile(session_id)
+    except KeyError as ex:
+        raise HTTPException(status_code=404, detail="Csv has not been loaded") from ex
+
+assistant_modules = []
+if str_to_bool.get(ENV["ENABLE_MATH_ASSISTANT"]):
+    assistant_modules.append(math_assistant)
+if str_to_bool.get(ENV["ENABLE_TABULAR_DATA_ASSISTANT"]):
+    assistant_modules.append(tabular_sql_assistant if use_duckdb_engine() else tabular_data_assistant)
+
+async def warm_up():
+    """Resolve the model metadata, then construct the enabled approaches and import the enabled
+    assistants, in the background so the app accepts requests right away"""
+    await http_transport.warm()
+    if await model_metadata.refresh():
+        # The approaches built meanwhile used the cached model names and versions
+        log.info("Model metadata changed, constructing the approaches again")
+        await asyncio.to_thread(chat_approaches.invalidate)
+    await chat_approaches.warm()
+    for assistant_module in assistant_modules:
+        try:
+            await asyncio.to_thread(assistant_module)
+        except Exception as ex:
+            log.warning(f"Unable to import the {assistant_module.__name__} module: {ex}")
+
+# Reference to the background warm up so it is not garbage collected
+warm_up_task = None
 
 # Create API
 app = FastAPI(
@@ -268,12 +553,41 @@ app = FastAPI(
     docs_url="/docs",
 )
 
+@app.on_event("startup")
+async def startup_event():
+    """Warm up the connections, the model metadata and the approaches without holding up startup"""
+    global warm_up_task
+    warm_up_task = asyncio.create_task(warm_up())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close the async Azure clients and their connection pools"""
+    await search_client.close()
+    await async_blob_client.close()
+    await http_transport.aclose()
+    if web_search_client is not None:
+        web_search_client.close()
+
 @app.get("/", include_in_schema=False, response_class=RedirectResponse)
 async def root():
     """Redirect to the index.html page"""
     return RedirectResponse(url="/index.html")
 
 
+async def prefetch_citations(events):
+    """Passes the chat events through, loading the cited chunks into the citation cache
+    as soon as the event carrying the work citations goes by"""
+    prefetched = False
+    async for event in events:
+        if not prefetched and '"work_citation_lookup"' in event:
+            prefetched = True
+            try:
+                work_citation_lookup = json.loads(event).get("work_citation_lookup") or {}
+                citation_cache.prefetch(entry["citation"] for entry in work_citation_lookup.values())
+            except Exception as ex:
+                log.warning(f"Unable to prefetch citations: {ex}")
+        yield event
+
 @app.post("/chat")
 async def chat(request: Request):
     """Chat with the bot using a given approach
@@ -290,7 +604,7 @@ async def chat(request: Request):
     json_body = await request.json()
     approach = json_body.get("approach")
     try:
-        impl = chat_approaches.get(Approaches(int(approach)))
+        impl = await chat_approaches.get(Approaches(int(approach)))
         if not impl:
             return {"error": "unknown approach"}, 400
         
@@ -299,7 +613,7 @@ async def chat(request: Request):
         else:
             r = impl.run(json_body.get("history", []), json_body.get("overrides", {}), {}, json_body.get("thought_chain", {}))
        
-        return StreamingResponse(r, media_type="application/x-ndjson")
+        return StreamingResponse(prefetch_citations(r), media_type="application/x-ndjson")
 
     except Exception as ex:
         log.error(f"Error in chat:: {ex}")
@@ -318,9 +632,7 @@ async def get_blob_client_url():
     Returns:
         dict: A dictionary containing the URL with the SAS token.
     """
-    sas_token = generate_account_sas(
-        ENV["AZURE_BLOB_STORAGE_ACCOUNT"],
-        ENV["AZURE_BLOB_STORAGE_KEY"],
+    sas_token = sas_provider.get_account_sas(
         resource_types=ResourceTypes(object=True, service=True, container=True),
         permission=AccountSasPermissions(
             read=True,
@@ -331,8 +643,7 @@ async def get_blob_client_url():
             create=True,
             update=True,
             process=False,
-        ),
-        expiry=datetime.utcnow() + timedelta(hours=1),
+        )
     )
     return {"url": f"{blob_client.url}?{sas_token}"}
 
@@ -342,52 +653,131 @@ async def get_all_upload_status(request: Request):
     Get the status and tags of all file uploads in the last N hours.
 
     Parameters:
-    - request: The HTTP request object.
+    - request: The HTTP request object. Besides the filters the body may set
+      - page_size: return one page of statuses and the continuation_token of the next one
+      - continuation_token: the token returned with the previous page
+      - concise: leave out the status_updates of each file
+      - sort_by / sort_order: server-side sort field and "asc" or "desc"
+      - stream: stream the statuses as NDJSON, one file per line
 
     Returns:
-    - results: The status of all file uploads in the specified timeframe.
+    - results: The status of all file uploads in the specified timeframe, or a page
+      {"statuses", "continuation_token"} when page_size is given.
     """
     json_body = await request.json()
     timeframe = json_body.get("timeframe")
     state = json_body.get("state")
     folder = json_body.get("folder")
     tag = json_body.get("tag")   
+    page_size = json_body.get("page_size")
+    query_options = {
+        "include_status_updates": not json_body.get("concise", False),
+        "sort_by": json_body.get("sort_by") or "state_timestamp",
+        "descending": (json_body.get("sort_order") or "desc").lower() != "asc"
+    }
+    if query_options["sort_by"] not in StatusLog.STATUS_SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"sort_by must be one of {', '.join(StatusLog.STATUS_SORT_FIELDS)}")
     try:
+        if json_body.get("stream"):
+            statuses = statusLog.iter_files_status(timeframe,
+                State[state],
+                folder,
+                tag,
+                ENV["AZURE_BLOB_STORAGE_UPLOAD_CONTAINER"],
+                page_size=int(page_size or 100),
+                **query_options)
+            # The generator is synchronous, Starlette iterates it in a worker thread
+            return StreamingResponse((json.dumps(status) + "\n" for status in statuses),
+                                     media_type="application/x-ndjson")
+        if page_size:
+            statuses, continuation_token = await asyncio.to_thread(statusLog.read_files_status_page,
+                timeframe,
+                State[state],
+                folder,
+                tag,
+                ENV["AZURE_BLOB_STORAGE_UPLOAD_CONTAINER"],
+                page_size=int(page_size),
+                continuation_token=json_body.get("continuation_token"),
+                **query_options)
+            return {"statuses": statuses, "continuation_token": continuation_token}
+        if not query_options["include_status_updates"]:
+            return await asyncio.to_thread(lambda: list(statusLog.iter_files_status(timeframe,
+                State[state],
+                folder,
+                tag,
+                ENV["AZURE_BLOB_STORAGE_UPLOAD_CONTAINER"],
+                **query_options)))
         results = statusLog.read_files_status_by_timeframe(timeframe, 
             State[state], 
             folder, 
             tag,
             os.environ["AZURE_BLOB_STORAGE_UPLOAD_CONTAINER"])
 
-        # retrieve tags for each file
-         # Initialize an empty list to hold the tags
-        items = []              
-        cosmos_client = CosmosClient(url=statusLog._url, credential=statusLog._key)
-        database = cosmos_client.get_database_client(statusLog._database_name)
-        container = database.get_container_client(statusLog._container_name)
-        query_string = "SELECT DISTINCT VALUE t FROM c JOIN t IN c.tags"
-        items = list(container.query_items(
-            query=query_string,
-            enable_cross_partition_query=True
-        ))           
-
-        # Extract and split tags
-        unique_tags = set()
-        for item in items:
-            tags = item.split(',')
-            unique_tags.update(tags)        
-
-        
     except Exception as ex:
         log.exception("Exception in /getalluploadstatus")
         raise HTTPException(status_code=500, detail=str(ex)) from ex
     return results
 
-@app.post("/getfolders")
+@app.post("/getfilestatus")
+async def get_file_status(request: Request):
+    """
+    Get the status updates of a single file, for status lists fetched in concise mode.
+
+    Parameters:
+    - request: The HTTP request object, its body holds the path of the file.
+
+    Returns:
+    - results: The status updates of the file.
+    """
+    json_body = await request.json()
+    path = json_body.get("path")
+    try:
+        items = await asyncio.to_thread(statusLog.read_file_status, path, StatusQueryLevel.VERBOSE)
+    except Exception as ex:
+        log.exception("Exception in /getfilestatus")
+        raise HTTPException(status_code=500, detail=str(ex)) from ex
+    if not items:
+        raise HTTPException(status_code=404, detail=f"No status found for {path}")
+    return items[0].get("status_updates", [])
+
+def list_upload_folders() -> list[str]:
+    """Lists the folders holding files in the upload container, one hierarchy level at a time"""
+    upload_container = blob_client.get_container_client(ENV["AZURE_BLOB_STORAGE_UPLOAD_CONTAINER"])
+    folders = []
+    prefixes = [""]
+    while prefixes:
+        prefix = prefixes.pop()
+        has_files = False
+        for item in upload_container.walk_blobs(name_starts_with=prefix or None, delimiter="/"):
+            if isinstance(item, BlobPrefix):
+                prefixes.append(item.name)
+            else:
+                has_files = True
+        if prefix and has_files:
+            folders.append(prefix.rstrip("/"))
+    return sorted(folders)
+
+def build_folder_catalog():
+    """Builds the folder catalog from a listing of the upload container. The functions only update
+    a catalog that exists, so the container is listed again once the catalog is written and the
+    folders created or emptied in between are reconciled"""
+    folders = list_upload_folders()
+    statusLog.write_folder_catalog(folders)
+    current = list_upload_folders()
+    added, removed = set(current) - set(folders), set(folders) - set(current)
+    if added or removed:
+        statusLog.update_folder_catalog(added=sorted(added), removed=sorted(removed))
+    return current
+
+@app.api_route("/getfolders", methods=["GET", "POST"])
 async def get_folders(request: Request):
     """
     Get all folders.
 
+    The folders are read from the folder catalog kept in Cosmos DB. The catalog is built from a
+    listing of the upload container the first time it is missing. The response carries an ETag,
+    so a client sending it back in If-None-Match gets a 304 while the folders are unchanged.
+
     Parameters:
     - request: The HTTP request object.
 
@@ -395,21 +785,22 @@ async def get_folders(request: Request):
     - results: list of unique folders.
     """
     try:
-        blob_container = blob_client.get_container_client(os.environ["AZURE_BLOB_STORAGE_UPLOAD_CONTAINER"])
-        # Initialize an empty list to hold the folder paths
-        folders = []
-        # List all blobs in the container
-        blob_list = blob_container.list_blobs()
-        # Iterate through the blobs and extract folder names and add unique values to the list
-        for blob in blob_list:
-            # Extract the folder path if exists
-            folder_path = os.path.dirname(blob.name)
-            if folder_path and folder_path not in folders:
-                folders.append(folder_path)
+        folders = folder_cache.get("folders")
+        if folders is None:
+            folders = await asyncio.to_thread(statusLog.read_folder_catalog)
+            if folders is None:
+                folders = await asyncio.to_thread(build_folder_catalog)
+            folder_cache.set("folders", folders)
     except Exception as ex:
         log.exception("Exception in /getfolders")
         raise HTTPException(status_code=500, detail=str(ex)) from ex
-    return folders
+    headers = {
+        "ETag": f'"{hashlib.sha256(json.dumps(folders).encode()).hexdigest()}"',
+        "Cache-Control": "private, no-cache"
+    }
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(folders, headers=headers)
 
 
 @app.post("/deleteItems")
@@ -479,6 +870,16 @@ async def resubmit_Items(request: Request):
     return True
 
 
+async def read_tags() -> list[str]:
+    """Returns the tags in use from the tag catalog, building the catalog the first time it is missing"""
+    tags = tag_cache.get("tags")
+    if tags is None:
+        tags = await asyncio.to_thread(statusLog.read_tag_catalog)
+        if tags is None:
+            tags = await asyncio.to_thread(statusLog.build_tag_catalog)
+        tag_cache.set("tags", tags)
+    return tags
+
 @app.post("/gettags")
 async def get_tags(request: Request):
     """
@@ -491,23 +892,7 @@ async def get_tags(request: Request):
     - results: list of unique tags.
     """
     try:
-        # Initialize an empty list to hold the tags
-        items = []              
-        cosmos_client = CosmosClient(url=statusLog._url, credential=statusLog._key)     
-        database = cosmos_client.get_database_client(statusLog._database_name)               
-        container = database.get_container_client(statusLog._container_name) 
-        query_string = "SELECT DISTINCT VALUE t FROM c JOIN t IN c.tags"  
-        items = list(container.query_items(
-            query=query_string,
-            enable_cross_partition_query=True
-        ))           
-
-        # Extract and split tags
-        unique_tags = set()
-        for item in items:
-            tags = item.split(',')
-            unique_tags.update(tags)                  
-                
+        unique_tags = await read_tags()
     except Exception as ex:
         log.exception("Exception in /gettags")
         raise HTTPException(status_code=500, detail=str(ex)) from ex
@@ -563,18 +948,22 @@ async def get_info_data():
             - "EMBEDDINGS_MODEL_NAME": The name of the embeddings model.
             - "EMBEDDINGS_MODEL_VERSION": The version of the embeddings model.
     """
+    try:
+        await model_metadata.wait()
+    except RuntimeError as ex:
+        raise HTTPException(status_code=503, detail=str(ex)) from ex
     response = {
         "AZURE_OPENAI_CHATGPT_DEPLOYMENT": ENV["AZURE_OPENAI_CHATGPT_DEPLOYMENT"],
-        "AZURE_OPENAI_MODEL_NAME": f"{model_name}",
-        "AZURE_OPENAI_MODEL_VERSION": f"{model_version}",
+        "AZURE_OPENAI_MODEL_NAME": model_metadata.get("model_name"),
+        "AZURE_OPENAI_MODEL_VERSION": model_metadata.get("model_version"),
         "AZURE_OPENAI_SERVICE": ENV["AZURE_OPENAI_SERVICE"],
         "AZURE_SEARCH_SERVICE": ENV["AZURE_SEARCH_SERVICE"],
         "AZURE_SEARCH_INDEX": ENV["AZURE_SEARCH_INDEX"],
         "TARGET_LANGUAGE": ENV["QUERY_TERM_LANGUAGE"],
         "USE_AZURE_OPENAI_EMBEDDINGS": ENV["USE_AZURE_OPENAI_EMBEDDINGS"],
         "EMBEDDINGS_DEPLOYMENT": ENV["EMBEDDING_DEPLOYMENT_NAME"],
-        "EMBEDDINGS_MODEL_NAME": f"{embedding_model_name}",
-        "EMBEDDINGS_MODEL_VERSION": f"{embedding_model_version}",
+        "EMBEDDINGS_MODEL_NAME": model_metadata.get("embedding_model_name"),
+        "EMBEDDINGS_MODEL_VERSION": model_metadata.get("embedding_model_version"),
     }
     return response
 
@@ -595,11 +984,14 @@ async def get_max_csv_file_size():
         }
     return response
 
-@app.post("/getcitation")
+@app.api_route("/getcitation", methods=["GET", "POST"])
 async def get_citation(request: Request):
     """
     Get the citation for a given file
 
+    The citation is passed in the JSON body (POST) or as the citation query parameter (GET).
+    Responses carry the chunk ETag and may be cached briefly by the browser.
+
     Parameters:
         request (Request): The HTTP request object
 
@@ -607,15 +999,43 @@ async def get_citation(request: Request):
         dict: The citation results in JSON format
     """
     try:
-        json_body = await request.json()
-        citation = urllib.parse.unquote(json_body.get("citation"))    
-        blob = blob_container.get_blob_client(citation).download_blob()
-        decoded_text = blob.readall().decode()
-        results = json.loads(decoded_text)
+        if request.method == "GET":
+            citation = urllib.parse.unquote(request.query_params.get("citation"))
+        else:
+            json_body = await request.json()
+            citation = urllib.parse.unquote(json_body.get("citation"))
+        results, etag = await citation_cache.get(citation)
     except Exception as ex:
         log.exception("Exception in /getcitation")
         raise HTTPException(status_code=500, detail=str(ex)) from ex
-    return results
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={int(citation_cache.revalidate_seconds)}"
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(results, headers=headers)
+
+@app.post("/getcitations")
+async def get_citations(request: Request):
+    """
+    Get the citations for several files at once
+
+    Parameters:
+        request (Request): The HTTP request object, its body holds the list of citations
+
+    Returns:
+        dict: The citation results by citation, with an error entry for the citations that could not be read
+    """
+    try:
+        json_body = await request.json()
+        citations = json_body.get("citations") or []
+        results = await citation_cache.get_many(urllib.parse.unquote(citation) for citation in citations)
+    except Exception as ex:
+        log.exception("Exception in /getcitations")
+        raise HTTPException(status_code=500, detail=str(ex)) from ex
+    # Key the results on the citations as they were sent
+    return {citation: results[urllib.parse.unquote(citation)] for citation in citations}
 
 # Return APPLICATION_TITLE
 @app.get("/getApplicationTitle")
@@ -639,21 +1059,33 @@ async def get_all_tags():
         dict: A dictionary containing the status of all tags
     """
     try:
-        results = statusLog.get_all_tags()
+        results = ",".join(await read_tags())
     except Exception as ex:
         log.exception("Exception in /getalltags")
         raise HTTPException(status_code=500, detail=str(ex)) from ex
     return results
 
-@app.get("/getTempImages")
-async def get_temp_images():
-    """Get the images in the temp directory
+@app.get("/getCharts")
+async def get_charts(session_id: str):
+    """Get the charts generated in a tabular data session since the previous call
 
     Returns:
-        list: A list of image data in the temp directory.
+        dict: The ids of the charts, each one served by /charts/{chart_id}
     """
-    images = get_images_in_temp()
-    return {"images": images}
+    return {"charts": get_chart_store().take(session_id)}
+
+@app.get("/charts/{chart_id}")
+async def get_chart(chart_id: str, request: Request):
+    """Get a generated chart as PNG. A chart never changes, browsers keep it until it expires"""
+    chart = get_chart_store().get(chart_id)
+    if chart is None:
+        raise HTTPException(status_code=404, detail="Chart not found")
+    png, etag = chart
+    headers = {"ETag": f'"{etag}"',
+               "Cache-Control": f"private, max-age={int(float(ENV['TABULAR_CHART_TTL_SECONDS']))}, immutable"}
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=png, media_type="image/png", headers=headers)
 
 @app.get("/getHint")
 async def getHint(question: Optional[str] = None):
@@ -667,35 +1099,74 @@ async def getHint(question: Optional[str] = None):
         raise HTTPException(status_code=400, detail="Question is required")
 
     try:
-        results = generate_response(question).split("Clues")[1][2:]
+        # Repeated homework questions are served from the cache without a completion
+        results = await get_hint_cache().get_or_generate(question, generate_hint)
     except Exception as ex:
         log.exception("Exception in /getHint")
         raise HTTPException(status_code=500, detail=str(ex)) from ex
     return results
 
+# Room for the multipart boundaries and the other form fields of a CSV upload
+CSV_UPLOAD_FORM_OVERHEAD = 64 * 1024
+
 @app.post("/posttd")
-async def posttd(csv: UploadFile = File(...)):
+async def posttd(request: Request):
+    """Upload a CSV to the tabular data assistant
+
+    The multipart form holds the file as "csv" and optionally the "session_id" to replace the
+    data of, a new session is started when it is omitted or not one the store issued.
+
+    Returns:
+        dict: The session id to pass to the analysis endpoints, with the shape of the data
+    """
+    max_bytes = int(float(ENV["MAX_CSV_FILE_SIZE"]) * 1024 * 1024)
+    # Refuse an oversized upload from its headers, before its body is received
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes + CSV_UPLOAD_FORM_OVERHEAD:
+        raise HTTPException(status_code=413, detail=f"The file is larger than {ENV['MAX_CSV_FILE_SIZE']} MB")
+    form = await request.form()
     try:
-        global dffinal
-            # Read the file into a pandas DataFrame
-        content = await csv.read()
-        df = pd.read_csv(StringIO(content.decode('latin-1')))
-
-        dffinal = df
-        # Process the DataFrame...
-        save_df(df)
+        csv = form.get("csv")
+        if csv is None or isinstance(csv, str):
+            raise HTTPException(status_code=400, detail="csv file is required")
+        session_id = form.get("session_id") or None
+        from core.csvingest import CsvTooLarge, read_csv_upload
+        try:
+            # Parsed straight from the spooled upload, Arrow reads it on several threads
+            df = await asyncio.to_thread(read_csv_upload, csv.file, max_bytes)
+        except CsvTooLarge as ex:
+            raise HTTPException(status_code=413, detail=str(ex)) from ex
+        try:
+            session = await asyncio.to_thread(get_dataframe_store().put, df, session_id)
+        except ValueError as ex:
+            raise HTTPException(status_code=413, detail=str(ex)) from ex
+    except HTTPException:
+        raise
     except Exception as ex:
-            raise HTTPException(status_code=500, detail=str(ex)) from ex
-    
-    
-    #return {"filename": csv.filename}
+        log.exception("Exception in /posttd")
+        raise HTTPException(status_code=500, detail=str(ex)) from ex
+    finally:
+        await form.close()
+    return get_dataframe_store().info(session.session_id)
+
+@app.get("/tdsession")
+async def td_session(session_id: str):
+    """Get the shape of the data of a tabular data session, 404 once it expired"""
+    try:
+        return get_dataframe_store().info(session_id)
+    except KeyError as ex:
+        raise HTTPException(status_code=404, detail="Csv has not been loaded") from ex
+
 @app.get("/process_td_agent_response")
-async def process_td_agent_response(retries=3, delay=1000, question: Optional[str] = None):
+async def process_td_agent_response(retries=3, delay=1000, question: Optional[str] = None, session_id: Optional[str] = None):
     if question is None:
         raise HTTPException(status_code=400, detail="Question is required")
+    df, profile = await asyncio.to_thread(get_session_df, session_id)
     for i in range(retries):
         try:
-            results = td_agent_response(question)
+            assistant, context = tabular_agent(session_id)
+            # The agent is synchronous, keep its model calls and code off the event loop
+            results = await asyncio.to_thread(assistant.process_agent_response, question, df, profile, context)
             return results
         except AttributeError as ex:
             log.exception(f"Exception in /process_tabular_data_agent_response:{str(ex)}")
@@ -714,15 +1185,16 @@ async def process_td_agent_response(retries=3, delay=1000, question: Optional[st
                 raise HTTPException(status_code=500, detail=str(ex)) from ex
 
 @app.get("/getTdAnalysis")
-async def getTdAnalysis(retries=3, delay=1, question: Optional[str] = None):
-    global dffinal
+async def getTdAnalysis(retries=3, delay=1, question: Optional[str] = None, session_id: Optional[str] = None):
     if question is None:
             raise HTTPException(status_code=400, detail="Question is required")
-        
+    df, profile = await asyncio.to_thread(get_session_df, session_id)
+
     for i in range(retries):
         try:
-            save_df(dffinal)
-            results = td_agent_scratch_pad(question, dffinal)
+            assistant, context = tabular_agent(session_id)
+            # The agent is synchronous, run all of its steps off the event loop
+            results = await asyncio.to_thread(lambda: list(assistant.process_agent_scratch_pad(question, df, profile, context)))
             return results
         except AttributeError as ex:
             log.exception(f"Exception in /getTdAnalysis:{str(ex)}")
@@ -754,7 +1226,7 @@ async def refresh():
         dict: A dictionary containing the status of the agent's state.
     """
     try:
-        refreshagent()
+        tabular_data_assistant().refreshagent()
     except Exception as ex:
         log.exception("Exception in /refresh")
         raise HTTPException(status_code=500, detail=str(ex)) from ex
@@ -764,19 +1236,19 @@ async def refresh():
 @app.get("/stream")
 async def stream_response(question: str):
     try:
-        stream = stream_agent_responses(question)
+        stream = math_assistant().stream_agent_responses(question)
         return StreamingResponse(stream, media_type="text/event-stream")
     except Exception as ex:
         log.exception("Exception in /stream")
         raise HTTPException(status_code=500, detail=str(ex)) from ex
 
 @app.get("/tdstream")
-async def td_stream_response(question: str):
-    save_df(dffinal)
-    
+async def td_stream_response(question: str, session_id: Optional[str] = None):
+    df, profile = await asyncio.to_thread(get_session_df, session_id)
 
     try:
-        stream = td_agent_scratch_pad(question, dffinal)
+        assistant, context = tabular_agent(session_id)
+        stream = assistant.process_agent_scratch_pad(question, df, profile, context)
         return StreamingResponse(stream, media_type="text/event-stream")
     except Exception as ex:
         log.exception("Exception in /stream")
@@ -806,13 +1278,50 @@ async def stream_agent_response(question: str):
         raise HTTPException(status_code=400, detail="Question is required")
 
     try:
-        results = process_agent_response(question)
+        results = await math_assistant().process_agent_response(question)
     except Exception as e:
         print(f"Error processing agent response: {e}")
         raise HTTPException(status_code=500, detail=str(e))
     return results
 
 
+@app.get("/getCacheStats")
+async def get_cache_stats():
+    """Get the size and hit/miss counters of the in-process caches"""
+    response = {
+        "EMBEDDING_CACHE": embedding_cache.stats(),
+        "ANSWER_CACHE": answer_cache.stats() if answer_cache is not None else None,
+        "TRANSLATION_CACHE": translation_cache.stats(),
+        "LANGUAGE_DETECTION": language_detector.stats() if language_detector is not None else None,
+        "SAS_TOKENS": sas_provider.stats(),
+        "SEARCH_CACHE": {**search_cache.stats(), "index_generation": index_generation.generation},
+        "FOLDER_CACHE": folder_cache.stats(),
+        "TAG_CACHE": tag_cache.stats(),
+        "CITATION_CACHE": citation_cache.stats(),
+        "TABULAR_DATA_STORE": dataframe_store.stats() if dataframe_store is not None else None,
+        "TABULAR_CHART_STORE": chart_store.stats() if chart_store is not None else None,
+        "TABULAR_DUCKDB": duckdb_engine.stats() if duckdb_engine is not None else None,
+        "HINT_CACHE": hint_cache.stats() if hint_cache is not None else None
+    }
+    return response
+
+@app.get("/getHttpPoolStats")
+async def get_http_pool_stats():
+    """Get the request counters and connection pool state of every outbound upstream"""
+    return http_transport.stats()
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe. Returns 503 until the model metadata is available, the approaches are
+    constructed on first use from then on"""
+    response = {
+        "ready": model_metadata.ready.is_set(),
+        "model_metadata": model_metadata.stats(),
+        "approaches": chat_approaches.stats(),
+        "warm_up_done": warm_up_task is not None and warm_up_task.done(),
+    }
+    return JSONResponse(response, status_code=200 if response["ready"] else 503)
+
 @app.get("/getFeatureFlags")
 async def get_feature_flags():
     """
@@ -2,10 +2,11 @@
 # Licensed under the MIT license.
 from core.messagebuilder import MessageBuilder
 from typing import Any, Sequence
-import tiktoken
+from shared_code import tokenizer
 from enum import Enum
 
-#This class must match the Enum in app\frontend\src\api
+#This class must match the Enum in app\frontend\src\api, except CompareWorkAndWeb which is only
+#available through the /chat API
 class Approaches(Enum):
     RetrieveThenRead = 0
     ReadRetrieveRead = 1
@@ -14,6 +15,7 @@ class Approaches(Enum):
     ChatWebRetrieveRead = 4
     CompareWorkWithWeb = 5
     CompareWebWithWork = 6
+    CompareWorkAndWeb = 7
 
 class Approach:
     """
@@ -56,16 +58,30 @@ class Approach:
             message_builder.append_message(shot.get('role'), shot.get('content'))
 
         user_content = user_conv
-        append_index = len(few_shots) + 1
 
-        message_builder.append_message(self.USER, user_content, index=append_index)
+        message_builder.append_message(self.USER, user_content)
 
-        for h in reversed(history[:-1]):
+        # When even an upper bound of the earlier turns' size fits, add them all without encoding them
+        earlier_turns = history[:-1]
+        turn_bounds = [tokenizer.max_count(h.get('user') or '') + tokenizer.max_count(h.get('bot') or '') + 6
+                       for h in earlier_turns]
+        if message_builder.token_length + sum(turn_bounds) <= max_tokens:
+            for h, turn_bound in zip(reversed(earlier_turns), reversed(turn_bounds)):
+                if h.get("bot"):
+                    message_builder.append_history_message(self.ASSISTANT, h.get('bot'), 0)
+                message_builder.append_history_message(self.USER, h.get('user'), turn_bound)
+            return message_builder.messages
+
+        # Add the earlier turns, most recent first, as long as whole turns fit in the token budget
+        for h in reversed(earlier_turns):
+            turn_tokens = message_builder.count_tokens(self.USER, h.get('user'))
             if h.get("bot"):
-                message_builder.append_message(self.ASSISTANT, h.get('bot'), index=append_index)
-            message_builder.append_message(self.USER, h.get('user'), index=append_index)
-            if message_builder.token_length > max_tokens:
+                turn_tokens += message_builder.count_tokens(self.ASSISTANT, h.get('bot'))
+            if message_builder.token_length + turn_tokens > max_tokens:
                 break
+            if h.get("bot"):
+                message_builder.append_history_message(self.ASSISTANT, h.get('bot'))
+            message_builder.append_history_message(self.USER, h.get('user'))
 
         messages = message_builder.messages
         return messages
@@ -84,9 +100,7 @@ class Approach:
 
     def num_tokens_from_string(self, string: str, encoding_name: str) -> int:
         """ Function to return the number of tokens in a text string"""
-        encoding = tiktoken.get_encoding(encoding_name)
-        num_tokens = len(encoding.encode(string))
-        return num_tokens
+        return tokenizer.count(string, encoding_name)
 
     
    
\ No newline at end of file
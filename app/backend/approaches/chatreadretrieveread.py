@@ -1,29 +1,45 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 
+import asyncio
 import json
 import re
 import logging
+import time
 import urllib.parse
-from datetime import datetime, timedelta
-from typing import Any, AsyncGenerator, Coroutine, Sequence
+from typing import Any, AsyncGenerator, Awaitable, Coroutine, Sequence
 
 import openai
 from openai import AzureOpenAI
 from openai import  AsyncAzureOpenAI
 from approaches.approach import Approach
-from azure.search.documents import SearchClient  
+from azure.search.documents.aio import SearchClient
 from azure.search.documents.models import RawVectorQuery
 from azure.search.documents.models import QueryType
 from azure.storage.blob import (
     AccountSasPermissions,
     BlobServiceClient,
     ResourceTypes,
-    generate_account_sas,
 )
 from text import nonewlines
 from core.modelhelper import get_token_limit
-import requests
+from core.semanticcache import CachedAnswer, SemanticCache, cosine_similarity
+from core.languagedetector import LanguageDetector
+from core.indexgeneration import IndexGeneration
+from core.httptransport import HttpTransport
+from shared_code import tokenizer
+from shared_code.sas_provider import SasProvider
+from shared_code.ttl_cache import TTLCache
+
+class EmbeddingError(Exception):
+    """Raised when the enrichment service fails to embed a query"""
+    def __init__(self, status_code: int):
+        super().__init__(f"Error generating embedding: {status_code}")
+        self.status_code = status_code
+
+def normalize_query(query: str) -> str:
+    """Normalizes a search query so that trivially different spellings share an embedding cache entry"""
+    return re.sub(r'\s+', ' ', query).strip().strip('"\'.,;:!?').strip().casefold()
 
 class ChatReadRetrieveReadApproach(Approach):
     """Approach that uses a simple retrieve-then-read implementation, using the Azure AI Search and
@@ -82,6 +98,19 @@ class ChatReadRetrieveReadApproach(Approach):
         {'role': Approach.USER, 'content': 'What steps are being taken to promote energy conservation?'},
         {'role': Approach.ASSISTANT, 'content': 'Several steps are being taken to promote energy conservation including reducing energy consumption, increasing energy efficiency, and increasing the use of renewable energy sources.Citations[File0]'}
     ]
+
+    # Minimum similarity between the raw question and the generated search query for the
+    # speculative search results to be kept when parallel retrieval is enabled
+    SPECULATIVE_SIMILARITY_THRESHOLD = 0.92
+
+    # Tokens reserved for the generated search query
+    QUERY_MAX_TOKENS = 100
+
+    # Share of the context window left after the response that the retrieved sources may fill,
+    # the rest is kept for the system prompt, the few-shots and the chat history
+    SOURCES_TOKEN_BUDGET_RATIO = 0.5
+    # Tokens added to each source by the "FileX | " prefix
+    SOURCE_PREFIX_TOKENS = 5
     
     
     def __init__(
@@ -105,8 +134,17 @@ class ChatReadRetrieveReadApproach(Approach):
         enrichment_endpoint:str,
         enrichment_key:str,
         azure_ai_translation_domain: str,
-        use_semantic_reranker: bool
-        
+        use_semantic_reranker: bool,
+        parallel_retrieval: bool = False,
+        embedding_cache: TTLCache = None,
+        answer_cache: SemanticCache = None,
+        language_detector: LanguageDetector = None,
+        translation_cache: TTLCache = None,
+        sas_provider: SasProvider = None,
+        search_cache: TTLCache = None,
+        index_generation: IndexGeneration = None,
+        openai_client: AsyncAzureOpenAI = None,
+        http_transport: HttpTransport = None
     ):
         self.search_client = search_client
         self.chatgpt_deployment = chatgpt_deployment
@@ -127,16 +165,42 @@ class ChatReadRetrieveReadApproach(Approach):
         self.embedding_service_url = enrichment_appservice_uri
         self.azure_ai_translation_domain=azure_ai_translation_domain
         self.use_semantic_reranker=use_semantic_reranker
+        self.parallel_retrieval=parallel_retrieval
+        # Query embeddings shared across requests, keyed on the target model and the normalized query
+        self.embedding_cache=embedding_cache
+        # Final answers replayed for semantically equivalent questions asked with the same settings
+        self.answer_cache=answer_cache
+        # Local language identification, the Translator API is only asked when it is not confident
+        self.language_detector=language_detector
+        self.translation_cache=translation_cache
+        # SAS tokens are signed once per scope and reused for every search hit
+        self.sas_provider=sas_provider or SasProvider(blob_client.account_name, blob_client.credential.account_key)
+        # Search results keyed on the index generation, so they are dropped as soon as indexed content changes
+        self.search_cache=search_cache
+        self.index_generation=index_generation
         
         openai.api_base = oai_endpoint
         openai.api_type = 'azure'
         openai.api_key = oai_service_key
         openai.api_version = "2024-02-01"
         
-        self.client = AsyncAzureOpenAI(
+        # Pooled connections shared with the other approaches, built here only when none are passed in
+        if http_transport is None:
+            http_transport = HttpTransport()
+            http_transport.add("openai", oai_endpoint, 100)
+            http_transport.add("enrichment", enrichment_appservice_uri, 50)
+            http_transport.add("translator", f"https://{azure_ai_translation_domain}", 20)
+        self.http_transport = http_transport
+        self.client = openai_client or AsyncAzureOpenAI(
         azure_endpoint = openai.api_base, 
         api_key=openai.api_key,  
-        api_version=openai.api_version)
+        api_version=openai.api_version,
+        http_client=http_transport.client("openai"))
+
+        # Async HTTP clients for the enrichment (embedding) and translator calls so that
+        # the retrieval steps never block the event loop
+        self.enrichment_http_client = http_transport.client("enrichment")
+        self.translator_http_client = http_transport.client("translator")
                
 
         self.model_name = model_name
@@ -147,6 +211,24 @@ class ChatReadRetrieveReadApproach(Approach):
         
     # def run(self, history: list[dict], overrides: dict) -> any:
     async def run(self, history: Sequence[dict[str, str]], overrides: dict[str, Any], citation_lookup: dict[str, Any], thought_chain: dict[str, Any]) -> Any:
+        # Tasks started ahead of the step needing them, cancelled when the response ends without
+        # them, fails, or is abandoned by the client
+        speculative_tasks = []
+        events = self._run(history, overrides, citation_lookup, thought_chain, speculative_tasks)
+        try:
+            async for event in events:
+                yield event
+        finally:
+            await events.aclose()
+            for task in speculative_tasks:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    # Retrieved so that a failed speculative task is not reported as never retrieved
+                    task.exception()
+
+    async def _run(self, history: Sequence[dict[str, str]], overrides: dict[str, Any], citation_lookup: dict[str, Any],
+                   thought_chain: dict[str, Any], speculative_tasks: list) -> Any:
 
         log = logging.getLogger("uvicorn")
         log.setLevel('DEBUG')
@@ -164,114 +246,115 @@ class ChatReadRetrieveReadApproach(Approach):
         user_q = 'Generate search query for: ' + history[-1]["user"]
         thought_chain["work_query"] = user_q
 
-        # Detect the language of the user's question
-        detectedlanguage = self.detect_language(user_q)
-
-        if detectedlanguage != self.target_translation_language:
-            user_question = self.translate_response(user_q, self.target_translation_language)
+        search_filter = self.build_search_filter(folder_filter, tags_filter)
+        use_semantic_ranker = self.use_semantic_reranker and overrides.get("semantic_ranker")
+        timings = {}
+        speculative_search = None
+
+        if self.parallel_retrieval:
+            # Speculatively embed and search the raw user question while the keyword query is generated.
+            # The results are kept only if the generated query turns out to be equivalent.
+            speculative_embedding = asyncio.create_task(self.embed_query(history[-1]["user"]))
+            speculative_search = asyncio.create_task(self.timed(
+                timings, "speculative_search",
+                self.search_speculatively(history[-1]["user"], speculative_embedding, top, search_filter,
+                                          use_semantic_ranker, use_semantic_captions)))
+            # Detect the language of the user's question alongside query generation, assuming it needs no translation
+            detect_task = asyncio.create_task(self.timed(timings, "detect_language", self.detect_language(history[-1]["user"])))
+            query_task = asyncio.create_task(self.timed(timings, "generate_query", self.generate_search_query(history, user_q)))
+            speculative_tasks.extend((speculative_embedding, speculative_search, detect_task, query_task))
+            detectedlanguage = await detect_task
+            if detectedlanguage != self.target_translation_language:
+                query_task.cancel()
+                user_question = await self.timed(timings, "translate", self.translate_response(user_q, self.target_translation_language))
+                query_task = asyncio.create_task(self.timed(timings, "generate_query", self.generate_search_query(history, user_question)))
+                speculative_tasks.append(query_task)
         else:
-            user_question = user_q
+            # Detect the language of the user's question
+            detectedlanguage = await self.timed(timings, "detect_language", self.detect_language(history[-1]["user"]))
 
-        query_prompt=self.QUERY_PROMPT_TEMPLATE.format(query_term_language=self.query_term_language)
+            if detectedlanguage != self.target_translation_language:
+                user_question = await self.timed(timings, "translate", self.translate_response(user_q, self.target_translation_language))
+            else:
+                user_question = user_q
 
-        # STEP 1: Generate an optimized keyword search query based on the chat history and the last question
-        messages = self.get_messages_from_history(
-            query_prompt,
-            self.model_name,
-            history,
-            user_question,
-            self.QUERY_PROMPT_FEW_SHOTS,
-            self.chatgpt_token_limit - len(user_question)
-            )
+            query_task = self.timed(timings, "generate_query", self.generate_search_query(history, user_question))
 
+        # STEP 1: Generate an optimized keyword search query based on the chat history and the last question
         try:
-            chat_completion= await self.client.chat.completions.create(
-                    model=self.chatgpt_deployment,
-                    messages=messages,
-                    temperature=0.0,
-                    # max_tokens=32, # setting it too low may cause malformed JSON
-                    max_tokens=100,
-                n=1)
-        
+            generated_query = await query_task
         except Exception as e:
             log.error(f"Error generating optimized keyword search: {str(e)}")
             yield json.dumps({"error": f"Error generating optimized keyword search: {str(e)}"}) + "\n"
             return
 
-        generated_query = chat_completion.choices[0].message.content
-        
         #if we fail to generate a query, return the last user question
         if generated_query.strip() == "0":
             generated_query = history[-1]["user"]
 
         thought_chain["work_search_term"] = generated_query
-        
-        # Generate embedding using REST API
-        url = f'{self.embedding_service_url}/models/{self.escaped_target_model}/embed'
-        data = [f'"{generated_query}"']
-        
-        headers = {
-                'Accept': 'application/json',  
-                'Content-Type': 'application/json',
-            }
 
-        embedded_query_vector = None
-        try:
-            response = requests.post(url, json=data,headers=headers,timeout=60)
-            if response.status_code == 200:
-                response_data = response.json()
-                embedded_query_vector =response_data.get('data')          
-            else:
+        answer_scope = (search_filter, user_persona, system_persona, response_length, detectedlanguage,
+                        overrides.get("prompt_template"), bool(overrides.get("suggest_followup_questions")),
+                        overrides.get("response_temp"))
+        cached_answer = None
+        r = None
+        if speculative_search is not None and generated_query == history[-1]["user"]:
+            # The generated query is the raw question, so the speculative search is exactly what we need
+            r = await self.speculative_results(speculative_embedding, speculative_search)
+            if r is not None:
+                cached_answer = await self.lookup_cached_answer(answer_scope, speculative_embedding.result())
+
+        if r is None:
+            # Generate embedding using REST API
+            try:
+                embedded_query_vector = await self.timed(timings, "embed_query", self.embed_query(generated_query))
+            except EmbeddingError as e:
                 # Generate an error message if the embedding generation fails
-                log.error(f"Error generating embedding:: {response.status_code}")
+                log.error(f"Error generating embedding:: {e.status_code}")
                 yield json.dumps({"error": "Error generating embedding"}) + "\n"
                 return # Go no further
-        except Exception as e:
-            # Timeout or other error has occurred
-            log.error(f"Error generating embedding: {str(e)}")
-            yield json.dumps({"error": f"Error generating embedding: {str(e)}"}) + "\n"
-            return # Go no further
-        
-        #vector set up for pure vector search & Hybrid search & Hybrid semantic
-        vector = RawVectorQuery(vector=embedded_query_vector, k=top, fields="contentVector")
+            except Exception as e:
+                # Timeout or other error has occurred
+                log.error(f"Error generating embedding: {str(e)}")
+                yield json.dumps({"error": f"Error generating embedding: {str(e)}"}) + "\n"
+                return # Go no further
 
-        #Create a filter for the search query
-        if (folder_filter != "") & (folder_filter != "All"):
-            search_filter = f"search.in(folder, '{folder_filter}', ',')"
+            if self.answer_cache is not None:
+                cached_answer = await self.timed(timings, "answer_cache",
+                                                 self.lookup_cached_answer(answer_scope, embedded_query_vector))
+            if cached_answer is None:
+                if speculative_search is not None:
+                    r = await self.speculative_results(speculative_embedding, speculative_search, embedded_query_vector)
+
+                if r is None:
+                    r = await self.timed(timings, "search", self.search(generated_query, embedded_query_vector, top, search_filter,
+                                                                        use_semantic_ranker, use_semantic_captions))
         else:
-            search_filter = None
-        if tags_filter != "" :
-            if search_filter is not None:
-                search_filter = search_filter + f" and tags/any(t: search.in(t, '{tags_filter}', ','))"
-            else:
-                search_filter = f"tags/any(t: search.in(t, '{tags_filter}', ','))"
+            embedded_query_vector = speculative_embedding.result()
 
-        # Hybrid Search
-        # r = self.search_client.search(generated_query, vector_queries =[vector], top=top)
+        if cached_answer is not None:
+            thought_chain["work_answer_cache"] = "hit"
+            thought_chain["work_stage_timings"] = ", ".join(f"{stage}: {ms} ms" for stage, ms in timings.items())
+            # Replay the cached answer through the same NDJSON events as a generated one
+            yield json.dumps({"data_points": {},
+                              "thoughts": cached_answer.thoughts,
+                              "thought_chain": thought_chain,
+                              "work_citation_lookup": self.sign_citation_lookup(cached_answer),
+                              "web_citation_lookup": {}}) + "\n"
+            yield json.dumps({"content": cached_answer.answer}) + "\n"
+            return
 
-        # Pure Vector Search
-        # r=self.search_client.search(search_text=None,vector_queries =[vector], top=top)
-        
-        # vector search with filter
-        # r=self.search_client.search(search_text=None, vectors=[vector], filter="processed_datetime le 2023-09-18T04:06:29.675Z" , top=top)
-        # r=self.search_client.search(search_text=None, vectors=[vector], filter="search.ismatch('upload/ospolicydocs/China, climate change and the energy transition.pdf', 'file_name')", top=top)
+        if self.answer_cache is not None:
+            thought_chain["work_answer_cache"] = "miss"
+        if speculative_search is not None:
+            thought_chain["work_speculative_search"] = "used" if "search" not in timings else "discarded"
+        thought_chain["work_stage_timings"] = ", ".join(f"{stage}: {ms} ms" for stage, ms in timings.items())
 
-        #  hybrid semantic search using semantic reranker
-        if (self.use_semantic_reranker and overrides.get("semantic_ranker")):
-            r = self.search_client.search(
-                generated_query,
-                query_type=QueryType.SEMANTIC,
-                semantic_configuration_name="default",
-                top=top,
-                query_caption="extractive|highlight-false"
-                if use_semantic_captions else None,
-                vector_queries =[vector],
-                filter=search_filter
-            )
-        else:
-            r = self.search_client.search(
-                generated_query, top=top,vector_queries=[vector], filter=search_filter
-            )
+        # STEP 2: Keep the best ranked chunks that fit in the token budget for sources
+        sources_token_budget = max(0, int((self.chatgpt_token_limit - response_length) * self.SOURCES_TOKEN_BUDGET_RATIO))
+        r, sources_tokens = self.pack_sources(r, sources_token_budget)
+        thought_chain["work_sources_tokens"] = f"{sources_tokens} of {sources_token_budget} tokens, {len(r)} chunks"
 
         citation_lookup = {}  # dict of "FileX" moniker to the actual file name
         results = []  # list of results to be used in the prompt
@@ -379,13 +462,6 @@ class ChatReadRetrieveReadApproach(Approach):
             #print("System Message Tokens: ", self.num_tokens_from_string(system_message, "cl100k_base"))
             #print("Few Shot Tokens: ", self.num_tokens_from_string(self.response_prompt_few_shots[0]['content'], "cl100k_base"))
             #print("Message Tokens: ", self.num_tokens_from_string(message_string, "cl100k_base"))
-                chat_completion= await self.client.chat.completions.create(
-                    model=self.chatgpt_deployment,
-                    messages=messages,
-                    temperature=float(overrides.get("response_temp")) or 0.6,
-                    n=1,
-                    stream=True
-                )
 
             elif self.model_name.startswith("gpt-4"):
                 messages = self.get_messages_from_history(
@@ -421,26 +497,39 @@ class ChatReadRetrieveReadApproach(Approach):
             msg_to_display = '\n\n'.join([str(message) for message in messages])
         
         
+            thoughts = f"Searched for:<br>{generated_query}<br><br>Conversations:<br>" + msg_to_display.replace('\n', '<br>')
             # Return the data we know
             yield json.dumps({"data_points": {},
-                              "thoughts": f"Searched for:<br>{generated_query}<br><br>Conversations:<br>" + msg_to_display.replace('\n', '<br>'),
+                              "thoughts": thoughts,
                               "thought_chain": thought_chain,
                               "work_citation_lookup": citation_lookup,
                               "web_citation_lookup": {}}) + "\n"
         
             # STEP 4: Format the response
+            answer = []
             async for chunk in chat_completion:
                 # Check if there is at least one element and the first element has the key 'delta'
                 if len(chunk.choices) > 0:
+                    answer.append(chunk.choices[0].delta.content or "")
                     yield json.dumps({"content": chunk.choices[0].delta.content}) + "\n"
         except Exception as e:
             log.error(f"Error generating chat completion: {str(e)}")
             yield json.dumps({"error": f"Error generating chat completion: {str(e)}"}) + "\n"
             return
 
+        if self.answer_cache is not None:
+            self.store_answer(answer_scope, embedded_query_vector, "".join(answer), thoughts, citation_lookup, r)
 
-    def detect_language(self, text: str) -> str:
+
+    async def detect_language(self, text: str) -> str:
         """ Function to detect the language of the text"""
+        if self.language_detector is not None:
+            language = self.language_detector.detect(text)
+            if language is not None:
+                # The local model returns ISO 639-1 codes, the Translator may add a script subtag (e.g. zh-Hans)
+                if language == self.target_translation_language.split("-")[0].lower():
+                    return self.target_translation_language
+                return language
         try:
             endpoint_region = self.enrichment_endpoint.split("https://")[1].split(".api")[0]
             api_detect_endpoint = f"https://{self.azure_ai_translation_domain}/detect?api-version=3.0"
@@ -450,7 +539,7 @@ class ChatReadRetrieveReadApproach(Approach):
                 'Ocp-Apim-Subscription-Region': endpoint_region
             }
             data = [{"text": text}]
-            response = requests.post(api_detect_endpoint, headers=headers, json=data)
+            response = await self.translator_http_client.post(api_detect_endpoint, headers=headers, json=data)
 
             if response.status_code == 200:
                 detected_language = response.json()[0]['language']
@@ -460,8 +549,13 @@ class ChatReadRetrieveReadApproach(Approach):
         except Exception as e:
             raise Exception(f"An error occurred during language detection: {str(e)}") from e
      
-    def translate_response(self, response: str, target_language: str) -> str:
+    async def translate_response(self, response: str, target_language: str) -> str:
         """ Function to translate the response to target language"""
+        cache_key = (target_language, response)
+        if self.translation_cache is not None:
+            cached_translation = self.translation_cache.get(cache_key)
+            if cached_translation is not None:
+                return cached_translation
         endpoint_region = self.enrichment_endpoint.split("https://")[1].split(".api")[0]      
         api_translate_endpoint = f"https://{self.azure_ai_translation_domain}/translate?api-version=3.0"
         headers = {
@@ -473,20 +567,213 @@ class ChatReadRetrieveReadApproach(Approach):
         data = [{
             "text": response
         }]          
-        response = requests.post(api_translate_endpoint, headers=headers, json=data, params=params)
+        response = await self.translator_http_client.post(api_translate_endpoint, headers=headers, json=data, params=params)
         
         if response.status_code == 200:
             translated_response = response.json()[0]['translations'][0]['text']
+            if self.translation_cache is not None:
+                self.translation_cache.set(cache_key, translated_response)
             return translated_response
         else:
             raise Exception(f"Error translating response: {response.status_code}")
 
+    async def timed(self, timings: dict[str, int], stage: str, awaitable: Awaitable) -> Any:
+        """ Function to await a retrieval stage and record its duration in milliseconds"""
+        start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            timings[stage] = round((time.perf_counter() - start) * 1000)
+
+    async def generate_search_query(self, history: Sequence[dict[str, str]], user_question: str) -> str:
+        """ Function to generate an optimized keyword search query from the chat history and the question"""
+        query_prompt=self.QUERY_PROMPT_TEMPLATE.format(query_term_language=self.query_term_language)
+        messages = self.get_messages_from_history(
+            query_prompt,
+            self.model_name,
+            history,
+            user_question,
+            self.QUERY_PROMPT_FEW_SHOTS,
+            self.chatgpt_token_limit - self.QUERY_MAX_TOKENS
+            )
+        chat_completion= await self.client.chat.completions.create(
+                model=self.chatgpt_deployment,
+                messages=messages,
+                temperature=0.0,
+                # max_tokens=32, # setting it too low may cause malformed JSON
+                max_tokens=self.QUERY_MAX_TOKENS,
+            n=1)
+        return chat_completion.choices[0].message.content
+
+    async def search_speculatively(self, query: str, query_embedding: asyncio.Task, top: int, search_filter: str,
+                                   use_semantic_ranker: bool, use_semantic_captions: bool) -> list[dict]:
+        """ Function to search with the raw user question as soon as its embedding is available"""
+        query_vector = await query_embedding
+        return await self.search(query, query_vector, top, search_filter, use_semantic_ranker, use_semantic_captions)
+
+    async def speculative_results(self, speculative_embedding: asyncio.Task, speculative_search: asyncio.Task,
+                                  query_vector: list[float] = None) -> list[dict]:
+        """ Function to return the speculative search results if they can stand in for the generated query.
+        When a query vector is given the results are only kept if the raw question is semantically
+        equivalent to the generated query, otherwise the speculative search is cancelled and None returned."""
+        try:
+            if query_vector is not None:
+                speculative_vector = await speculative_embedding
+                if cosine_similarity(speculative_vector, query_vector) < self.SPECULATIVE_SIMILARITY_THRESHOLD:
+                    speculative_search.cancel()
+                    return None
+            return await speculative_search
+        except Exception as e:
+            logging.debug(f"Discarding failed speculative search: {str(e)}")
+            speculative_search.cancel()
+            return None
+
+    async def embed_query(self, query: str) -> list[float]:
+        """ Function to generate the embedding of a search query using the enrichment service"""
+        cache_key = (self.escaped_target_model, normalize_query(query))
+        if self.embedding_cache is not None:
+            cached_vector = self.embedding_cache.get(cache_key)
+            if cached_vector is not None:
+                return cached_vector
+        url = f'{self.embedding_service_url}/models/{self.escaped_target_model}/embed'
+        data = [f'"{query}"']
+        headers = {
+                'Accept': 'application/json',  
+                'Content-Type': 'application/json',
+            }
+        response = await self.enrichment_http_client.post(url, json=data, headers=headers, timeout=60)
+        if response.status_code != 200:
+            raise EmbeddingError(response.status_code)
+        query_vector = response.json().get('data')
+        if self.embedding_cache is not None:
+            self.embedding_cache.set(cache_key, query_vector)
+        return query_vector
+
+    def pack_sources(self, results: list[dict], token_budget: int) -> tuple[list[dict], int]:
+        """ Function to fill the token budget with search hits in score order, using the token count
+        stored in the index at indexing time. Hits that do not fit are skipped so smaller, lower
+        ranked ones can still use the remaining budget"""
+        packed = []
+        used_tokens = 0
+        for doc in results:
+            # Chunks indexed before token_count was added fall back to a 4 characters per token estimate
+            doc_tokens = (doc.get("token_count") or tokenizer.approx_count(doc[self.content_field])) + self.SOURCE_PREFIX_TOKENS
+            if used_tokens + doc_tokens > token_budget:
+                continue
+            packed.append(doc)
+            used_tokens += doc_tokens
+        return packed, used_tokens
+
+    async def lookup_cached_answer(self, scope: tuple, query_vector: list[float]) -> CachedAnswer:
+        """ Function to find a cached answer for an equivalent query whose cited chunks have not been re-indexed"""
+        if self.answer_cache is None:
+            return None
+        cached_answer = self.answer_cache.lookup(scope, query_vector)
+        if cached_answer is None:
+            return None
+        try:
+            chunk_ids = ",".join(cached_answer.cited_chunks)
+            r = await self.search_client.search(
+                search_text="*",
+                filter=f"search.in(id, '{chunk_ids}', ',')",
+                select=["id", "processed_datetime"],
+                top=len(cached_answer.cited_chunks)
+            )
+            indexed_chunks = {doc["id"]: str(doc["processed_datetime"]) async for doc in r}
+        except Exception as e:
+            logging.warning(f"Unable to validate cached answer, ignoring it: {str(e)}")
+            return None
+        if indexed_chunks != cached_answer.cited_chunks:
+            # A cited chunk was re-indexed or removed since the answer was generated
+            self.answer_cache.invalidate(cached_answer)
+            return None
+        return cached_answer
+
+    def store_answer(self, scope: tuple, query_vector: list[float], answer: str, thoughts: str,
+                     citation_lookup: dict[str, Any], search_results: list[dict]) -> None:
+        """ Function to cache a final answer along with the chunks it cites"""
+        cited_files = set(re.findall(r"\[(File\d+)\]", answer))
+        if not cited_files:
+            # Answers without citations (e.g. "I am not sure") may change as soon as new content is indexed
+            return
+        cited_chunks = {}
+        source_files = {}
+        unsigned_lookup = {}
+        for idx, doc in enumerate(search_results):
+            moniker = f"File{idx}"
+            source_files[moniker] = doc[self.source_file_field]
+            unsigned_lookup[moniker] = {**citation_lookup[moniker], "source_path": ""}
+            if moniker in cited_files:
+                cited_chunks[doc["id"]] = str(doc["processed_datetime"])
+        if not cited_chunks:
+            return
+        self.answer_cache.store(CachedAnswer(scope, query_vector, answer, thoughts,
+                                             unsigned_lookup, source_files, cited_chunks))
+
+    def sign_citation_lookup(self, cached_answer: CachedAnswer) -> dict[str, Any]:
+        """ Function to rebuild the citation lookup of a cached answer with fresh SAS tokens"""
+        return {moniker: {**citation, "source_path": self.get_source_file_with_sas(cached_answer.source_files[moniker])}
+                for moniker, citation in cached_answer.citation_lookup.items()}
+
+    def build_search_filter(self, folder_filter: str, tags_filter: str) -> str:
+        """ Function to build the AI Search filter expression for the selected folders and tags"""
+        if (folder_filter != "") & (folder_filter != "All"):
+            search_filter = f"search.in(folder, '{folder_filter}', ',')"
+        else:
+            search_filter = None
+        if tags_filter != "" :
+            if search_filter is not None:
+                search_filter = search_filter + f" and tags/any(t: search.in(t, '{tags_filter}', ','))"
+            else:
+                search_filter = f"tags/any(t: search.in(t, '{tags_filter}', ','))"
+        return search_filter
+
+    async def search(self, query: str, query_vector: list[float], top: int, search_filter: str,
+                     use_semantic_ranker: bool, use_semantic_captions: bool) -> list[dict]:
+        """ Function to run the hybrid (optionally semantic) search and return the hits"""
+        if self.search_cache is not None and self.index_generation is not None:
+            cache_key = (await self.index_generation.current(), query, tuple(query_vector), search_filter, top,
+                         bool(use_semantic_ranker), bool(use_semantic_captions))
+            cached_results = self.search_cache.get(cache_key)
+            if cached_results is not None:
+                return cached_results
+        else:
+            cache_key = None
+
+        #vector set up for pure vector search & Hybrid search & Hybrid semantic
+        vector = RawVectorQuery(vector=query_vector, k=top, fields="contentVector")
+
+        # Hybrid Search
+        # r = await self.search_client.search(query, vector_queries =[vector], top=top)
+
+        # Pure Vector Search
+        # r = await self.search_client.search(search_text=None,vector_queries =[vector], top=top)
+
+        #  hybrid semantic search using semantic reranker
+        if use_semantic_ranker:
+            r = await self.search_client.search(
+                query,
+                query_type=QueryType.SEMANTIC,
+                semantic_configuration_name="default",
+                top=top,
+                query_caption="extractive|highlight-false"
+                if use_semantic_captions else None,
+                vector_queries =[vector],
+                filter=search_filter
+            )
+        else:
+            r = await self.search_client.search(
+                query, top=top,vector_queries=[vector], filter=search_filter
+            )
+        results = [doc async for doc in r]
+        if cache_key is not None:
+            self.search_cache.set(cache_key, results)
+        return results
+
     def get_source_file_with_sas(self, source_file: str) -> str:
         """ Function to return the source file with a SAS token"""
         try:
-            sas_token = generate_account_sas(
-                self.blob_client.account_name,
-                self.blob_client.credential.account_key,
+            sas_token = self.sas_provider.get_account_sas(
                 resource_types=ResourceTypes(object=True, service=True, container=True),
                 permission=AccountSasPermissions(
                     read=True,
@@ -497,8 +784,7 @@ class ChatReadRetrieveReadApproach(Approach):
                     create=True,
                     update=True,
                     process=False,
-                ),
-                expiry=datetime.utcnow() + timedelta(hours=1),
+                )
             )
             return source_file + "?" + sas_token
         except Exception as error:
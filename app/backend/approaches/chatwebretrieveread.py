@@ -1,6 +1,7 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 
+import asyncio
 import json
 import logging
 import os
@@ -17,6 +18,12 @@ from approaches.approach import Approach
 from core.messagebuilder import MessageBuilder
 from core.modelhelper import get_token_limit
 
+def build_web_search_client(bing_search_endpoint: str, bing_search_key: str) -> WebSearchClient:
+    """Creates a Bing client that keeps its HTTP session, and so its connections, across searches"""
+    client = WebSearchClient(AzureKeyCredential(bing_search_key), endpoint=bing_search_endpoint)
+    client.config.keep_alive = True
+    return client
+
 class ChatWebRetrieveRead(Approach):
     """Class to help perform RAG based on Bing Search and ChatGPT."""
 
@@ -71,10 +78,13 @@ class ChatWebRetrieveRead(Approach):
     ]
     
  
-    citations = {}
+    # Tokens reserved for the generated search query
+    QUERY_MAX_TOKENS = 100
+
     approach_class = ""
 
-    def __init__(self, model_name: str, chatgpt_deployment: str, query_term_language: str, bing_search_endpoint: str, bing_search_key: str, bing_safe_search: bool):
+    def __init__(self, model_name: str, chatgpt_deployment: str, query_term_language: str, bing_search_endpoint: str, bing_search_key: str, bing_safe_search: bool,
+                 openai_client: AsyncAzureOpenAI = None, web_search_client: WebSearchClient = None):
         self.name = "ChatBingSearch"
         self.model_name = model_name
         self.chatgpt_deployment = chatgpt_deployment
@@ -89,10 +99,13 @@ class ChatWebRetrieveRead(Approach):
         openai.api_version = "2024-02-01"
        
          
-        self.client = AsyncAzureOpenAI(
+        self.client = openai_client or AsyncAzureOpenAI(
         azure_endpoint = openai.api_base , 
         api_key=openai.api_key,  
         api_version=openai.api_version)
+
+        # One Bing client per process, its requests session keeps the connections alive between queries
+        self.web_search_client = web_search_client or build_web_search_client(bing_search_endpoint, bing_search_key)
         
 
     async def run(self, history: Sequence[dict[str, str]],overrides: dict[str, Any], citation_lookup: dict[str, Any], thought_chain: dict[str, Any]) -> Any:
@@ -130,11 +143,11 @@ class ChatWebRetrieveRead(Approach):
             history,
             user_query,
             self.QUERY_PROMPT_FEW_SHOTS,
-            self.chatgpt_token_limit - len(user_query)
+            self.chatgpt_token_limit - self.QUERY_MAX_TOKENS
             )
         
         try:
-            query_resp = await self.make_chat_completion(messages)
+            query_resp = await self.make_chat_completion(messages, max_tokens=self.QUERY_MAX_TOKENS)
         except Exception as e:
             log.error(f"Error generating optimized keyword search: {str(e)}")
             yield json.dumps({"error": f"Error generating optimized keyword search: {str(e)}"}) + "\n"
@@ -142,7 +155,9 @@ class ChatWebRetrieveRead(Approach):
         
         thought_chain["web_search_term"] = query_resp
         # STEP 2: Use the search query to get the top web search results
-        url_snippet_dict = await self.web_search_with_safe_search(query_resp)
+        # Citations are collected per request, the approach instance is shared by concurrent requests
+        citations = {}
+        url_snippet_dict = await self.web_search_with_safe_search(query_resp, citations)
         content = ', '.join(f'{snippet} | {url}' for url, snippet in url_snippet_dict.items())
         user_query += "Url Sources:\n" + content + "\n\n"
 
@@ -181,7 +196,7 @@ class ChatWebRetrieveRead(Approach):
                             "thoughts": f"Searched for:<br>{query_resp}<br><br>Conversations:<br>" + msg_to_display.replace('\n', '<br>'),
                             "thought_chain": thought_chain,
                             "work_citation_lookup": {},
-                            "web_citation_lookup": self.citations}) + "\n"
+                            "web_citation_lookup": citations}) + "\n"
             
             # STEP 4: Format the response
             async for chunk in resp:
@@ -195,25 +210,26 @@ class ChatWebRetrieveRead(Approach):
             return
     
 
-    async def web_search_with_safe_search(self, user_query):
+    async def web_search_with_safe_search(self, user_query, citations):
         """
         Performs a web search with specified parameters.
 
         Args:
             user_query (str): The query string for the web search.
+            citations (dict): The citation lookup filled with the URLs of the results.
 
         Returns:
             dict: A dictionary containing URL snippets as values and corresponding URLs as keys.
         """
-        client = WebSearchClient(AzureKeyCredential(self.bing_search_key), endpoint=self.bing_search_endpoint)
-
         try:
             if self.bing_safe_search:
                 safe_search = SafeSearch.STRICT
             else:
                 safe_search = SafeSearch.OFF
 
-            web_data = client.web.search(
+            # The Bing SDK is synchronous, keep it off the event loop
+            web_data = await asyncio.to_thread(
+                self.web_search_client.web.search,
                 query=user_query,
                 answer_count=10,
                 safe_search=safe_search
@@ -223,7 +239,7 @@ class ChatWebRetrieveRead(Approach):
 
                 url_snippet_dict = {}
                 for idx, page in enumerate(web_data.web_pages.value):
-                    self.citations[f"url{idx}"] = {
+                    citations[f"url{idx}"] = {
                         "citation": page.url,
                         "source_path": "",
                         "page_number": "0",
@@ -239,12 +255,13 @@ class ChatWebRetrieveRead(Approach):
         except Exception as err:
             print("Encountered exception. {}".format(err))
 
-    async def make_chat_completion(self, messages):
+    async def make_chat_completion(self, messages, max_tokens: int = openai.NOT_GIVEN):
         """
         Generates a chat completion response using the chat-based language model.
 
         Args:
             messages (List[dict[str, str]]): The list of messages for the chat-based language model.
+            max_tokens (int): The maximum number of tokens of the response, unbounded when omitted.
 
         Returns:
             str: The generated chat completion response.
@@ -255,6 +272,7 @@ class ChatWebRetrieveRead(Approach):
             model=self.chatgpt_deployment,
             messages=messages,
             temperature=0.6,
+            max_tokens=max_tokens,
             n=1
         )
         return chat_completion.choices[0].message.content
@@ -277,9 +295,8 @@ class ChatWebRetrieveRead(Approach):
             message_builder.append_message(shot.get('role'), shot.get('content'))
 
         user_content = user_conv
-        append_index = len(few_shots) + 1
 
-        message_builder.append_message(self.USER, user_content, index=append_index)
+        message_builder.append_message(self.USER, user_content)
 
         messages = message_builder.messages
         return messages    
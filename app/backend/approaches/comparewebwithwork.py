@@ -12,12 +12,17 @@ from openai import AzureOpenAI
 from openai import  AsyncAzureOpenAI
 from approaches.chatreadretrieveread import ChatReadRetrieveReadApproach
 from approaches.approach import Approach
-from azure.search.documents import SearchClient  
+from azure.search.documents.aio import SearchClient
 from core.messagebuilder import MessageBuilder
 from azure.storage.blob import (
     BlobServiceClient
 )
 from core.modelhelper import get_token_limit
+from core.languagedetector import LanguageDetector
+from core.indexgeneration import IndexGeneration
+from core.httptransport import HttpTransport
+from shared_code.sas_provider import SasProvider
+from shared_code.ttl_cache import TTLCache
 
 class CompareWebWithWork(Approach):
     """
@@ -63,7 +68,16 @@ class CompareWebWithWork(Approach):
         enrichment_endpoint:str,
         enrichment_key:str,
         azure_ai_translation_domain: str,
-        use_semantic_reranker: bool
+        use_semantic_reranker: bool,
+        parallel_retrieval: bool = False,
+        embedding_cache: TTLCache = None,
+        language_detector: LanguageDetector = None,
+        translation_cache: TTLCache = None,
+        sas_provider: SasProvider = None,
+        search_cache: TTLCache = None,
+        index_generation: IndexGeneration = None,
+        openai_client: AsyncAzureOpenAI = None,
+        http_transport: HttpTransport = None
     ):
         self.search_client = search_client
         self.chatgpt_deployment = chatgpt_deployment
@@ -86,28 +100,26 @@ class CompareWebWithWork(Approach):
         self.enrichment_appservice_url = enrichment_appservice_url
         self.azure_ai_translation_domain = azure_ai_translation_domain
         self.use_semantic_reranker = use_semantic_reranker
+        self.parallel_retrieval = parallel_retrieval
+        self.embedding_cache = embedding_cache
+        self.language_detector = language_detector
+        self.translation_cache = translation_cache
+        self.sas_provider = sas_provider
+        self.search_cache = search_cache
+        self.index_generation = index_generation
+        self.http_transport = http_transport
         
           # openai.api_base = oai_endpoint
         openai.api_type = 'azure'
         openai.api_version = "2024-02-01"
                
-        self.client = AsyncAzureOpenAI(
+        self.client = openai_client or AsyncAzureOpenAI(
         azure_endpoint = openai.api_base, 
         api_key=openai.api_key,  
         api_version=openai.api_version)
 
-    async def run(self, history: Sequence[dict[str, str]], overrides: dict[str, Any], web_citation_lookup: dict[str, Any], thought_chain: dict[str, Any]) -> Any:
-        """
-        Runs the approach to compare and contrast answers from internal data and Web Search results.
-
-        Args:
-            history (Sequence[dict[str, str]]): The conversation history.
-            overrides (dict[str, Any]): The overrides for the approach.
-
-        Returns:
-            Any: The result of the approach.
-        """
-        chat_rrr_approach = ChatReadRetrieveReadApproach(
+        # Build the work (RAG) approach once so its HTTP connections are reused across requests
+        self.chat_rrr_approach = ChatReadRetrieveReadApproach(
                                     self.search_client,
                                     self.oai_service_name,
                                     self.oai_service_key,
@@ -127,9 +139,30 @@ class CompareWebWithWork(Approach):
                                     self.enrichment_endpoint,
                                     self.enrichment_key,
                                     self.azure_ai_translation_domain,
-                                    self.use_semantic_reranker
+                                    self.use_semantic_reranker,
+                                    self.parallel_retrieval,
+                                    self.embedding_cache,
+                                    language_detector=self.language_detector,
+                                    translation_cache=self.translation_cache,
+                                    sas_provider=self.sas_provider,
+                                    search_cache=self.search_cache,
+                                    index_generation=self.index_generation,
+                                    openai_client=self.client,
+                                    http_transport=self.http_transport
                                 )
-        rrr_response = chat_rrr_approach.run(history, overrides, {}, thought_chain)
+
+    async def run(self, history: Sequence[dict[str, str]], overrides: dict[str, Any], web_citation_lookup: dict[str, Any], thought_chain: dict[str, Any]) -> Any:
+        """
+        Runs the approach to compare and contrast answers from internal data and Web Search results.
+
+        Args:
+            history (Sequence[dict[str, str]]): The conversation history.
+            overrides (dict[str, Any]): The overrides for the approach.
+
+        Returns:
+            Any: The result of the approach.
+        """
+        rrr_response = self.chat_rrr_approach.run(history, overrides, {}, thought_chain)
         content = ""
         work_citations = {}
         async for event in rrr_response:
@@ -234,9 +267,8 @@ class CompareWebWithWork(Approach):
             message_builder.append_message(shot.get('role'), shot.get('content'))
 
         user_content = user_conv
-        append_index = len(few_shots) + 1
 
-        message_builder.append_message(self.USER, user_content, index=append_index)
+        message_builder.append_message(self.USER, user_content)
 
         messages = message_builder.messages
         return messages
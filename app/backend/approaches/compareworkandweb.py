@@ -0,0 +1,164 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import asyncio
+import json
+import logging
+from typing import Any, Sequence
+from openai import AsyncAzureOpenAI
+from approaches.approach import Approach
+from approaches.chatreadretrieveread import ChatReadRetrieveReadApproach
+from approaches.chatwebretrieveread import ChatWebRetrieveRead
+from core.messagebuilder import MessageBuilder
+from core.modelhelper import get_token_limit
+
+
+class CompareWorkAndWeb(Approach):
+    """
+    Approach that answers from work (RAG) and web (Bing) search at the same time and then compares both answers.
+    Both answers are streamed as they are generated, so the wall-clock time is the slower of the two plus the comparison.
+    The web app does not offer it, it is only available to clients of the /chat API that render both streams.
+    """
+
+    COMPARATIVE_SYSTEM_MESSAGE_CHAT_CONVERSATION = """You are an Azure OpenAI Completion system. Your persona is {systemPersona}. User persona is {userPersona}.
+    Compare and contrast the answers provided below from two sources of data. The first source is Work where internal data is indexed using a RAG pattern while the second source Web where results are from an internet search.
+    Only explain the differences between the two sources and nothing else. Do not provide personal opinions or assumptions.
+    Only answer in the language {query_term_language}.
+    If you cannot find answer in below sources, respond with I am not sure. Do not provide personal opinions or assumptions.
+
+    {follow_up_questions_prompt}
+    """
+
+    COMPARATIVE_RESPONSE_PROMPT_FEW_SHOTS = [
+        {"role": Approach.USER ,'content': 'I am looking to compare and contrast answers obtained from both Work internal documents and Web search results'},
+        {'role': Approach.ASSISTANT, 'content': 'User wants to compare and contrast responses from both Work internal documents and Web search results.'},
+        {"role": Approach.USER, 'content': "Even if one of the sources doesn't provide a definite answer, I still want to compare and contrast the available information."},
+        {'role': Approach.ASSISTANT, 'content': "User emphasizes the importance of comparing and contrasting data even if one of the sources is uncertain about the answer."}
+    ]
+
+    def __init__(self, work_approach: ChatReadRetrieveReadApproach, web_approach: ChatWebRetrieveRead, model_name: str,
+                 chatgpt_deployment: str, query_term_language: str, openai_client: AsyncAzureOpenAI):
+        """
+        Initializes the CompareWorkAndWeb approach.
+
+        Args:
+            work_approach (ChatReadRetrieveReadApproach): The already constructed work (RAG) approach.
+            web_approach (ChatWebRetrieveRead): The already constructed web (Bing) approach.
+            model_name (str): The name of the model to be used for chat-based language model.
+            chatgpt_deployment (str): The deployment ID of the chat-based language model.
+            query_term_language (str): The language to be used for querying the data.
+            openai_client (AsyncAzureOpenAI): The shared Azure OpenAI client.
+        """
+        self.name = "CompareWorkAndWeb"
+        self.work_approach = work_approach
+        self.web_approach = web_approach
+        self.model_name = model_name
+        self.chatgpt_deployment = chatgpt_deployment
+        self.query_term_language = query_term_language
+        self.chatgpt_token_limit = get_token_limit(model_name)
+        self.client = openai_client
+
+    async def run(self, history: Sequence[dict[str, str]], overrides: dict[str, Any], citation_lookup: dict[str, Any], thought_chain: dict[str, Any]) -> Any:
+        """
+        Runs the work and web approaches concurrently, streams both answers and then their comparison.
+
+        The answers of the two sources are multiplexed on the stream as {"work_content": ...} and
+        {"web_content": ...} events, followed by the usual data points event and the content of the comparison.
+
+        Args:
+            history (Sequence[dict[str, str]]): The chat conversation history.
+            overrides (dict[str, Any]): Overrides for user and system personas, response length, etc.
+
+        Returns:
+            Any: The result of the comparative analysis.
+        """
+        # Step 1: Run both sources at once, each pushing its events on a shared queue. Each one
+        # records its steps in its own thought chain, they are merged once both have finished
+        events = asyncio.Queue()
+        sources = {"work": self.work_approach, "web": self.web_approach}
+        source_thought_chains = {source: dict(thought_chain) for source in sources}
+
+        async def drain(source: str, approach: Approach):
+            try:
+                async for event in approach.run(history, overrides, {}, source_thought_chains[source]):
+                    await events.put((source, json.loads(event)))
+            except Exception as e:
+                await events.put((source, {"error": str(e)}))
+            finally:
+                await events.put((source, None))
+
+        tasks = [asyncio.create_task(drain(source, approach)) for source, approach in sources.items()]
+        answers = {source: "" for source in sources}
+        citations = {source: {} for source in sources}
+        errors = {}
+        try:
+            remaining = len(tasks)
+            while remaining:
+                source, event = await events.get()
+                if event is None:
+                    remaining -= 1
+                elif "error" in event:
+                    errors[source] = event["error"]
+                elif "data_points" in event:
+                    citations[source] = event.get(f"{source}_citation_lookup") or {}
+                elif event.get("content"):
+                    answers[source] += event["content"]
+                    yield json.dumps({f"{source}_content": event["content"]}) + "\n"
+        finally:
+            # Stop the sources if the client went away before they finished
+            for task in tasks:
+                task.cancel()
+
+        if errors:
+            logging.error(f"Error in compare work and web: {errors}")
+            yield json.dumps({"error": "; ".join(f"{source}: {error}" for source, error in errors.items())}) + "\n"
+            return
+
+        for source in sources:
+            thought_chain.update(source_thought_chains[source])
+        thought_chain["work_response"] = answers["work"]
+        thought_chain["web_response"] = answers["web"]
+        user_query = history[-1].get("user")
+        user_persona = overrides.get("user_persona", "")
+        system_persona = overrides.get("system_persona", "")
+
+        # Step 2: Construct the comparative system message with both answers
+        compare_query = user_query + "Work internal documents:\n" + answers["work"] + "\n\n" + " Web search results:\n" + answers["web"] + "\n\n"
+        thought_chain["work_and_web_comparison_query"] = compare_query
+        message_builder = MessageBuilder(
+            self.COMPARATIVE_SYSTEM_MESSAGE_CHAT_CONVERSATION.format(
+                query_term_language=self.query_term_language,
+                follow_up_questions_prompt='',
+                userPersona=user_persona,
+                systemPersona=system_persona,
+            ),
+            self.model_name)
+        for shot in self.COMPARATIVE_RESPONSE_PROMPT_FEW_SHOTS:
+            message_builder.append_message(shot.get('role'), shot.get('content'))
+        message_builder.append_message(self.USER, compare_query)
+        messages = message_builder.messages
+        msg_to_display = '\n\n'.join([str(message) for message in messages])
+        try:
+            # Step 3: Comparative analysis using OpenAI Chat Completion
+            chat_completion = await self.client.chat.completions.create(
+                model=self.chatgpt_deployment,
+                messages=messages,
+                temperature=float(overrides.get("response_temp") or 0.6),
+                n=1,
+                stream=True)
+
+            yield json.dumps({"data_points": {},
+                            "thoughts": "Searched for:<br>A Comparitive Analysis<br><br>Conversations:<br>" + msg_to_display.replace('\n', '<br>'),
+                            "thought_chain": thought_chain,
+                            "work_citation_lookup": citations["work"],
+                            "web_citation_lookup": citations["web"]}) + "\n"
+
+            # Step 4: Format the response
+            async for chunk in chat_completion:
+                # Check if there is at least one element and the first element has the key 'delta'
+                if len(chunk.choices) > 0:
+                    yield json.dumps({"content": chunk.choices[0].delta.content}) + "\n"
+        except Exception as e:
+            logging.error(f"Error in compare work and web: {e}")
+            yield json.dumps({"error": "An error occurred while generating the completion."}) + "\n"
+            return
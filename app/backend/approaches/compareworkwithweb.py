@@ -9,6 +9,7 @@ import urllib.parse
 import openai
 from openai import AzureOpenAI
 from openai import AsyncAzureOpenAI
+from web_search_client import WebSearchClient
 from approaches.chatwebretrieveread import ChatWebRetrieveRead
 from approaches.approach import Approach
 from core.messagebuilder import MessageBuilder
@@ -39,7 +40,8 @@ class CompareWorkWithWeb(Approach):
     
     web_citations = {}
 
-    def __init__(self, model_name: str, chatgpt_deployment: str, query_term_language: str, bing_search_endpoint: str, bing_search_key: str, bing_safe_search: bool):
+    def __init__(self, model_name: str, chatgpt_deployment: str, query_term_language: str, bing_search_endpoint: str, bing_search_key: str, bing_safe_search: bool,
+                 openai_client: AsyncAzureOpenAI = None, web_search_client: WebSearchClient = None):
         """
         Initializes the CompareWorkWithWeb approach.
 
@@ -50,6 +52,8 @@ class CompareWorkWithWeb(Approach):
             bing_search_endpoint (str): The endpoint for the Bing Search API.
             bing_search_key (str): The API key for the Bing Search API.
             bing_safe_search (bool): The flag to enable or disable safe search for the Bing Search API.
+            openai_client (AsyncAzureOpenAI): The shared Azure OpenAI client, created when not given.
+            web_search_client (WebSearchClient): The shared Bing Search client, created when not given.
         """
         self.name = "CompareWorkWithWeb"
         self.model_name = model_name
@@ -64,11 +68,15 @@ class CompareWorkWithWeb(Approach):
         openai.api_type = 'azure'
         openai.api_version = "2024-02-01"
         
-        self.client = AsyncAzureOpenAI(
+        self.client = openai_client or AsyncAzureOpenAI(
         azure_endpoint = openai.api_base, 
         api_key=openai.api_key,  
         api_version=openai.api_version)
 
+        # Build the web approach once so its clients and connections are reused across requests
+        self.chat_bing_search = ChatWebRetrieveRead(self.model_name, self.chatgpt_deployment, self.query_term_language, self.bing_search_endpoint, self.bing_search_key, self.bing_safe_search,
+                                                    self.client, web_search_client)
+
     async def run(self, history: Sequence[dict[str, str]], overrides: dict[str, Any], work_citation_lookup: dict[str, Any], thought_chain: dict[str, Any]) -> Any:
         """
         Runs the comparative analysis between Bing Search Response and Internal Documents.
@@ -81,8 +89,7 @@ class CompareWorkWithWeb(Approach):
             Any: The result of the comparative analysis.
         """
         # Step 1: Call bing Search Approach for a Bing LLM Response and Citations
-        chat_bing_search = ChatWebRetrieveRead(self.model_name, self.chatgpt_deployment, self.query_term_language, self.bing_search_endpoint, self.bing_search_key, self.bing_safe_search)
-        bing_search_response = chat_bing_search.run(history, overrides, {}, thought_chain)
+        bing_search_response = self.chat_bing_search.run(history, overrides, {}, thought_chain)
         
         content = ""
         async for event in bing_search_response:
@@ -176,9 +183,8 @@ class CompareWorkWithWeb(Approach):
             message_builder.append_message(shot.get('role'), shot.get('content'))
 
         user_content = user_conv
-        append_index = len(few_shots) + 1
 
-        message_builder.append_message(self.USER, user_content, index=append_index)
+        message_builder.append_message(self.USER, user_content)
 
         messages = message_builder.messages
         return messages
@@ -83,7 +83,8 @@ class GPTDirectApproach(Approach):
         query_term_language: str,
         model_name: str,
         model_version: str,
-        azure_openai_endpoint: str
+        azure_openai_endpoint: str,
+        openai_client: AsyncAzureOpenAI = None
     ):
         self.chatgpt_deployment = chatgpt_deployment
         self.query_term_language = query_term_language
@@ -100,7 +101,7 @@ class GPTDirectApproach(Approach):
         openai.api_type = 'azure'
         openai.api_version = "2024-02-01"
         
-        self.client = AsyncAzureOpenAI(
+        self.client = openai_client or AsyncAzureOpenAI(
         azure_endpoint = openai.api_base, 
         api_key=openai.api_key,  
         api_version=openai.api_version)
@@ -53,6 +53,11 @@ model = AzureChatOpenAI(
 #1. Tool to calculate pythagorean theorem
 
 from langchain.tools import BaseTool
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from contextlib import contextmanager
 from typing import Optional
 from math import sqrt, cos, sin
 from typing import Union
@@ -92,6 +97,7 @@ tools = [PythagorasTool()]
 
 #2.tool to calculate the area of a circle
 from math import pi
+from approaches import mathsolver
 
   
 
@@ -121,88 +127,135 @@ In handling math queries, try using your tools initially. If no solution is foun
 """
 
 
-# # Initialize the agent
-zero_shot_agent_math = initialize_agent(
-    agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
-        tools=tools,
-    llm=model,
-    verbose=True,
-    max_iterations=10,
-    max_execution_time=120,
-    handle_parsing_errors=True,
-    return_intermediate_steps=True,
-    agent_kwargs={ 'prefix':PREFIX})
-
-# Prompt template for Zeroshot agent
+# Agent executors are pre-built and each one runs a single question at a time. A burst above
+# the pool size builds extra executors rather than waiting, so concurrent questions never serialize
+AGENT_POOL_SIZE = int(os.getenv("MATH_AGENT_POOL_SIZE", "4"))
 
-async def stream_agent_responses(question):
-    zero_shot_agent_math = initialize_agent(
-        agent="zero-shot-react-description",
+def build_agent():
+    return initialize_agent(
+        agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
         tools=tools,
         llm=model,
         verbose=True,
         max_iterations=10,
         max_execution_time=120,
         handle_parsing_errors=True,
-        agent_kwargs={ 'prefix':PREFIX}
-    )
-    for chunk in zero_shot_agent_math.stream({"input": question}):
-        if "actions" in chunk:
-            for action in chunk["actions"]:
-                yield f'data: Calling Tool: `{action.tool}` with input `{action.tool_input}`\n\n'
-                yield f'data: Processing...: {action.log} \n\n'
-        elif "steps" in chunk:
-            for step in chunk["steps"]:
-                yield f'data: Tool Result: `{step.observation}` \n\n'
-        elif "output" in chunk:
-            output =   f'data: Final Output: `{chunk["output"]}`\n\n'
-            yield output
-            yield (f'event: end\ndata: Stream ended\n\n')
-            return
-        else:
-            raise ValueError()
-
+        return_intermediate_steps=True,
+        agent_kwargs={ 'prefix':PREFIX})
+
+class AgentPool:
+    """Idle agent executors, checked out for the duration of one question"""
+
+    def __init__(self, build, size):
+        self.build = build
+        self.size = size
+        self._idle = deque(build() for _ in range(size))
+        self._lock = threading.Lock()
+        self.built = size
+
+    @contextmanager
+    def checkout(self):
+        with self._lock:
+            agent = self._idle.pop() if self._idle else None
+        if agent is None:
+            agent = self.build()
+            with self._lock:
+                self.built += 1
+        try:
+            yield agent
+        finally:
+            with self._lock:
+                if len(self._idle) < self.size:
+                    self._idle.append(agent)
+
+    def stats(self):
+        with self._lock:
+            return {"size": self.size, "idle": len(self._idle), "built": self.built}
+
+agent_pool = AgentPool(build_agent, AGENT_POOL_SIZE)
+
+# Arithmetic, equations, derivatives, integrals and limits are answered locally with SymPy, the
+# agent only gets the questions the solver does not handle or does not finish in time. SymPy can
+# not be interrupted, a question over its time keeps one of the solver threads busy until it ends
+SOLVER_TIMEOUT_SECONDS = float(os.getenv("MATH_SOLVER_TIMEOUT_SECONDS", "5"))
+solver_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="math-solver")
+
+async def solve_locally(question):
+    try:
+        return await asyncio.wait_for(
+            asyncio.get_running_loop().run_in_executor(solver_executor, mathsolver.answer, question),
+            SOLVER_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        return None
 
+# Prompt template for Zeroshot agent
 
-# function to stream agent response 
-def process_agent_scratch_pad( question):
+async def stream_agent_responses(question):
+    answer = await solve_locally(question)
+    if answer is not None:
+        yield f'data: Final Output: `{answer}`\n\n'
+        yield (f'event: end\ndata: Stream ended\n\n')
+        return
+    # The async agent API runs the LLM calls without blocking the event loop, the tools
+    # without an async implementation run in the default executor
+    with agent_pool.checkout() as zero_shot_agent_math:
+        async for chunk in zero_shot_agent_math.astream({"input": question}):
+            if "actions" in chunk:
+                for action in chunk["actions"]:
+                    yield f'data: Calling Tool: `{action.tool}` with input `{action.tool_input}`\n\n'
+                    yield f'data: Processing...: {action.log} \n\n'
+            elif "steps" in chunk:
+                for step in chunk["steps"]:
+                    yield f'data: Tool Result: `{step.observation}` \n\n'
+            elif "output" in chunk:
+                output =   f'data: Final Output: `{chunk["output"]}`\n\n'
+                yield output
+                yield (f'event: end\ndata: Stream ended\n\n')
+                return
+            else:
+                raise ValueError()
+
+
+
+# function to stream agent response, through the async agent API like the other entry points
+async def process_agent_scratch_pad( question):
     messages = []
-    for chunk in zero_shot_agent_math.stream({"input": question}):
-        if "actions" in chunk:
-            for action in chunk["actions"]:
-                messages.append(f"Calling Tool: `{action.tool}` with input `{action.tool_input}`\n")
-                messages.append(f'Processing: {action.log} \n')
-        elif "steps" in chunk:
-            for step in chunk["steps"]:
-                messages.append(f"Tool Result: `{step.observation}`\n")                               
-        elif "output" in chunk:
-            messages.append(f'Final Output: {chunk["output"]}')
-        else:
-            raise ValueError()
+    with agent_pool.checkout() as zero_shot_agent_math:
+        async for chunk in zero_shot_agent_math.astream({"input": question}):
+            if "actions" in chunk:
+                for action in chunk["actions"]:
+                    messages.append(f"Calling Tool: `{action.tool}` with input `{action.tool_input}`\n")
+                    messages.append(f'Processing: {action.log} \n')
+            elif "steps" in chunk:
+                for step in chunk["steps"]:
+                    messages.append(f"Tool Result: `{step.observation}`\n")                               
+            elif "output" in chunk:
+                messages.append(f'Final Output: {chunk["output"]}')
+            else:
+                raise ValueError()
     return messages
         
 #Function to stream final output       
-def process_agent_response( question):
-    stream = zero_shot_agent_math.stream({"input": question})
-    if stream:
-        for chunk in stream:
+async def process_agent_response( question):
+    answer = await solve_locally(question)
+    if answer is not None:
+        return f'Final Output: {answer}'
+    output = None
+    with agent_pool.checkout() as zero_shot_agent_math:
+        async for chunk in zero_shot_agent_math.astream({"input": question}):
             if "output" in chunk:
                 output =    f'Final Output: {chunk["output"]}'
+    if output is None:
+        raise ValueError("The agent did not produce an answer")
     return output
   
 
-#Function to process clues
-def generate_response(question):
-    model = AzureChatOpenAI(
-    api_key= OPENAI_API_KEY,
-    azure_endpoint=OPENAI_API_BASE,
-    openai_api_version=OPENAI_API_VERSION ,
-    deployment_name=OPENAI_DEPLOYMENT_NAME)     
-    prompt_template = ChatPromptTemplate.from_template(template=prompt)
-    messages = prompt_template.format_messages(
+#Function to process clues, the chat model of the agents is reused for every question
+async def generate_response(question):
+    messages = hint_prompt_template.format_messages(
     question=question
     )
-    response = model(messages)
+    response = await model.ainvoke(messages)
     return response.content
 
 #prompt for clues
@@ -265,15 +318,4 @@ Question: {question}
 
 """
 
-
-        
-   
-        
-        
-
-        
-
-
-
-            
-   
+hint_prompt_template = ChatPromptTemplate.from_template(template=prompt)
@@ -0,0 +1,262 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+""" Local answers to the common math questions, computed with SymPy without going through the
+LLM agent: arithmetic, percentages, equations, simplification, derivatives, integrals and limits.
+A question is only answered when it matches one of the patterns in full and its expressions
+use nothing but numbers, single letter variables and the known functions, everything else
+goes to the agent """
+import math
+import re
+from typing import Optional
+
+import sympy
+from sympy.parsing.sympy_parser import (convert_xor, factorial_notation, implicit_multiplication_application,
+                                        parse_expr, standard_transformations)
+
+# Longest expression parsed, and largest exponent and factorial evaluated, so that a question
+# can not keep the solver busy
+MAX_EXPRESSION_LENGTH = 200
+MAX_EXPONENT = 1000
+MAX_FACTORIAL = 1000
+# Largest value computed, in bits, as estimated before evaluating the expression. About 4200
+# digits, under the length Python converts an integer to text
+MAX_BITS = 14000
+# Significant digits of the decimal values in the answers
+DIGITS = 10
+
+FUNCTIONS = {
+    "sqrt": sympy.sqrt, "cbrt": sympy.cbrt, "exp": sympy.exp, "log": sympy.log, "ln": sympy.log,
+    "sin": sympy.sin, "cos": sympy.cos, "tan": sympy.tan, "cot": sympy.cot, "sec": sympy.sec, "csc": sympy.csc,
+    "asin": sympy.asin, "acos": sympy.acos, "atan": sympy.atan, "arcsin": sympy.asin, "arccos": sympy.acos,
+    "arctan": sympy.atan, "sinh": sympy.sinh, "cosh": sympy.cosh, "tanh": sympy.tanh, "abs": sympy.Abs,
+}
+CONSTANTS = {"pi": sympy.pi, "e": sympy.E, "oo": sympy.oo, "infinity": sympy.oo, "inf": sympy.oo}
+TRANSFORMATIONS = standard_transformations + (convert_xor, factorial_notation, implicit_multiplication_application)
+TOKEN = re.compile(r"\s+|\d+(?:\.\d+)?|[a-z]+|\*\*|[-+*/^().,!]")
+
+LEAD = r"(?:what is |what's |what are |calculate |compute |evaluate |find |work out |tell me |give me )?(?:the )?"
+FUNCTION_OF = r"(?:[a-z] ?\( ?[a-z] ?\) ?= ?|y ?= ?)?"
+VARIABLE = r"(?:with respect to|wrt|for|in) (?P<variable>[a-z])"
+PERCENT = re.compile(rf"^{LEAD}(?P<percent>\d+(?:\.\d+)?) ?(?:%|percent) of (?P<number>\d+(?:\.\d+)?)$")
+DERIVATIVE = re.compile(rf"^{LEAD}(?:(?:first )?derivative of |differentiate |d/d(?P<dvariable>[a-z]) (?:of )?){FUNCTION_OF}(?P<expression>.+?)(?: {VARIABLE})?$")
+INTEGRAL = re.compile(rf"^{LEAD}(?:(?:indefinite |definite )?integral of |integrate |antiderivative of ){FUNCTION_OF}(?P<expression>.+?)"
+                      r"(?: d(?P<dvariable>[a-z]))?(?: (?:from|between) (?P<lower>\S+) (?:to|and) (?P<upper>\S+))?"
+                      rf"(?: d(?P<dvariable2>[a-z]))?(?: {VARIABLE})?$")
+LIMIT = re.compile(rf"^{LEAD}limit of {FUNCTION_OF}(?P<expression>.+?) as (?P<variable>[a-z]) (?:approaches|goes to|tends to|->) (?P<point>\S+)$")
+SOLVE = re.compile(rf"^(?:solve|{LEAD}(?:solutions? (?:of|to)|roots? of)|find [a-z](?: if| when| given)?)(?: the equation)?:? (?P<equation>[^=]+=[^=]+?)(?: {VARIABLE})?$")
+EQUATION = re.compile(r"^(?P<equation>[^=]+=[^=]+)$")
+REWRITE = re.compile(rf"^{LEAD}(?P<operation>simplify|factor|factorise|factorize|expand)(?: the expression)?:? (?P<expression>.+)$")
+# A percent sign right after a number with no operand after it, anything else may be a modulo
+PERCENT_SIGN = re.compile(r"(?<![\d.])(\d+(?:\.\d+)?)%(?=\s*(?:[-+*/^)]|$))")
+ARITHMETIC = re.compile(rf"^{LEAD}(?:value of |result of )?(?P<expression>[\d\s.,()+\-*/^!%a-z]+?)(?: ?= ?)?$")
+
+
+class Unsupported(ValueError):
+    """The expression uses something the solver does not evaluate"""
+
+
+def normalize(text: str) -> str:
+    """Lower case, single spaces, no trailing punctuation, the usual operator symbols in ASCII"""
+    text = text.lower().translate(str.maketrans({"×": "*", "·": "*", "÷": "/", "−": "-", "–": "-", "²": "^2", "³": "^3", "√": "sqrt"}))
+    text = re.sub(r"\s+", " ", text).strip().rstrip("?.:").strip()
+    # Exclamation marks after a number are factorials
+    return re.sub(r"(?<![\d)!])!+$", "", text).strip()
+
+
+def parse(text: str) -> sympy.Expr:
+    """Parses an expression made of numbers, single letter variables and the known functions and
+    constants. Raises Unsupported for anything else and for exponents or factorials too large
+    to evaluate."""
+    text = text.strip()
+    # A double factorial, or a factorial of a factorial, is left to the agent
+    if not text or len(text) > MAX_EXPRESSION_LENGTH or "!!" in text:
+        raise Unsupported(text)
+    names = {}
+    position = 0
+    for match in TOKEN.finditer(text):
+        if match.start() != position:
+            raise Unsupported(text)
+        position = match.end()
+        word = match.group()
+        if word.isalpha():
+            if word in FUNCTIONS:
+                names[word] = FUNCTIONS[word]
+            elif word in CONSTANTS:
+                names[word] = CONSTANTS[word]
+            elif len(word) == 1:
+                names[word] = sympy.Symbol(word)
+            else:
+                raise Unsupported(text)
+    if position != len(text):
+        raise Unsupported(text)
+    # SymPy computes the factorial of a number as soon as it is parsed
+    if any(int(number) > MAX_FACTORIAL for number in re.findall(r"(\d+)\s*!", text)):
+        raise Unsupported(text)
+    try:
+        # Unevaluated first, so the size of the powers and factorials is checked before computing them
+        expression = parse_expr(text, local_dict=names, transformations=TRANSFORMATIONS, evaluate=False)
+    except (SyntaxError, TypeError, ValueError, AttributeError, sympy.SympifyError) as e:
+        raise Unsupported(text) from e
+    if not isinstance(expression, sympy.Expr):
+        raise Unsupported(text)
+    for node in sympy.preorder_traversal(expression):
+        if isinstance(node, sympy.Pow) and node.exp.is_number and _magnitude(node.exp) > MAX_EXPONENT:
+            raise Unsupported(text)
+        if isinstance(node, sympy.factorial) and (not node.args[0].is_number or _magnitude(node.args[0]) > MAX_FACTORIAL):
+            raise Unsupported(text)
+    # Each power and factorial is small on its own, but nesting them multiplies their sizes
+    if _bits(expression) > MAX_BITS:
+        raise Unsupported(text)
+    return expression.doit()
+
+
+def _magnitude(number: sympy.Expr) -> float:
+    # Estimated in floating point, without computing the exact value
+    try:
+        return abs(complex(number.evalf(15)))
+    except (TypeError, ValueError, OverflowError):
+        return float("inf")
+
+
+def _bits(node: sympy.Expr) -> float:
+    # Size of the value in bits, estimated bottom up from the unevaluated expression: a power
+    # multiplies the size of its base by its exponent, a factorial of n takes log2(n!) bits
+    if node.is_Rational:
+        # Exactly, a factorial of a number is already computed when it is parsed
+        return (math.log2(abs(node.p)) if node.p else 0.0) + math.log2(node.q)
+    if node.is_number and not node.args:
+        magnitude = _magnitude(node)
+        return math.log2(magnitude) if magnitude > 1 else 0.0
+    args = [_bits(arg) for arg in node.args]
+    if isinstance(node, sympy.Pow):
+        exponent = _magnitude(node.exp) if node.exp.is_number else 1.0
+        return args[0] * max(exponent, 1.0) + args[1]
+    if isinstance(node, sympy.factorial):
+        count = _magnitude(node.args[0])
+        return math.lgamma(count + 1) / math.log(2) if count < float("inf") else count
+    if isinstance(node, sympy.Mul):
+        return sum(args)
+    if isinstance(node, sympy.Add):
+        return max(args) + 1
+    return max(args, default=0.0)
+
+
+def format_value(value: sympy.Expr) -> str:
+    """A number exactly, with its decimal value when it is not an integer, an expression as text"""
+    value = sympy.nsimplify(value) if isinstance(value, sympy.Float) and value == int(value) else value
+    if value.is_Integer:
+        return str(value)
+    if value.is_Float:
+        return f"{float(value):.{DIGITS}g}"
+    if value.is_number and value.is_real:
+        decimal = f"{float(value):.{DIGITS}g}"
+        exact = _text(value)
+        return decimal if exact == decimal else f"{exact} ≈ {decimal}"
+    return _text(value)
+
+
+def _text(value: sympy.Expr) -> str:
+    return str(value).replace("**", "^")
+
+
+def _variable(expression: sympy.Expr, *names: Optional[str]) -> sympy.Symbol:
+    for name in names:
+        if name:
+            return sympy.Symbol(name)
+    symbols = expression.free_symbols
+    if len(symbols) != 1:
+        raise Unsupported(str(expression))
+    return next(iter(symbols))
+
+
+def _point(text: str) -> sympy.Expr:
+    point = parse(text.replace("+", "").replace("positive ", ""))
+    if point.free_symbols:
+        raise Unsupported(text)
+    return point
+
+
+def _solve(equation: str, variable: Optional[str]) -> Optional[str]:
+    left, right = equation.split("=")
+    expression = parse(left) - parse(right)
+    variable = _variable(expression, variable)
+    # Only polynomial equations are solved here, SymPy's answers to the others may be partial
+    if expression.free_symbols - {variable} or not expression.is_polynomial(variable) or sympy.degree(expression, variable) < 1:
+        return None
+    solutions = sympy.solve(sympy.Eq(expression, 0), variable)
+    if not solutions:
+        return "The equation has no solution."
+    return " or ".join(f"{variable} = {format_value(solution)}" for solution in solutions)
+
+
+def _answer(question: str) -> Optional[str]:
+    match = PERCENT.match(question)
+    if match:
+        value = sympy.Rational(match.group("percent")) * sympy.Rational(match.group("number")) / 100
+        return f"{match.group('percent')}% of {match.group('number')} is {format_value(value)}."
+
+    match = DERIVATIVE.match(question)
+    if match:
+        expression = parse(match.group("expression"))
+        variable = _variable(expression, match.group("dvariable"), match.group("variable"))
+        return f"The derivative of {_text(expression)} with respect to {variable} is {_text(sympy.diff(expression, variable))}."
+
+    match = INTEGRAL.match(question)
+    if match:
+        expression = parse(match.group("expression"))
+        variable = _variable(expression, match.group("dvariable"), match.group("dvariable2"), match.group("variable"))
+        if match.group("lower") is None:
+            result = sympy.integrate(expression, variable)
+            if result.has(sympy.Integral):
+                return None
+            return f"The integral of {_text(expression)} with respect to {variable} is {_text(result)} + C, where C is the constant of integration."
+        lower, upper = _point(match.group("lower")), _point(match.group("upper"))
+        result = sympy.integrate(expression, (variable, lower, upper))
+        if result.has(sympy.Integral):
+            return None
+        return f"The integral of {_text(expression)} from {variable} = {_text(lower)} to {_text(upper)} is {format_value(result)}."
+
+    match = LIMIT.match(question)
+    if match:
+        expression = parse(match.group("expression"))
+        variable = sympy.Symbol(match.group("variable"))
+        point = _point(match.group("point"))
+        result = sympy.limit(expression, variable, point)
+        if result.has(sympy.Limit):
+            return None
+        return f"The limit of {_text(expression)} as {variable} approaches {_text(point)} is {format_value(result)}."
+
+    match = REWRITE.match(question)
+    if match:
+        expression = parse(match.group("expression"))
+        operation = match.group("operation")
+        if operation.startswith("factor"):
+            return f"{_text(expression)} factors as {_text(sympy.factor(expression))}."
+        if operation == "expand":
+            return f"{_text(expression)} expands to {_text(sympy.expand(expression))}."
+        return f"{_text(expression)} simplifies to {_text(sympy.simplify(expression))}."
+
+    match = SOLVE.match(question) or EQUATION.match(question)
+    if match:
+        return _solve(match.group("equation"), match.groupdict().get("variable"))
+
+    match = ARITHMETIC.match(question)
+    if match:
+        expression = parse(PERCENT_SIGN.sub(r"(\1/100)", match.group("expression")))
+        # Only numbers, an expression with variables is a question for the agent
+        if expression.free_symbols or not expression.is_number or not expression.is_finite:
+            return None
+        return f"The answer is {format_value(expression)}."
+    return None
+
+
+def answer(question: str) -> Optional[str]:
+    """Returns the answer to a question the solver handles, or None when the agent is needed"""
+    question = normalize(question)
+    if not question:
+        return None
+    try:
+        return _answer(question)
+    except (Unsupported, ArithmeticError, NotImplementedError, TypeError, ValueError, sympy.SympifyError):
+        return None
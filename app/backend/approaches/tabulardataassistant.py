@@ -1,22 +1,21 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 
-import base64
 import os
-import glob
 import re
 import warnings
-from PIL import Image
-import io
+from contextlib import nullcontext
 import pandas as pd
 from langchain_experimental.agents.agent_toolkits import create_pandas_dataframe_agent
+from langchain_experimental.agents.agent_toolkits.pandas.prompt import PREFIX_FUNCTIONS
 from langchain.agents.agent_types import AgentType
 from langchain_openai import AzureChatOpenAI
 from langchain.agents import load_tools
 import matplotlib.pyplot as plt
-import tempfile
 warnings.filterwarnings('ignore')
 from dotenv import load_dotenv
+from approaches import tabularfastpath
+from core.dataframeprofile import format_profile
 
 
 
@@ -52,26 +51,16 @@ OPENAI_API_KEY = os.environ.get("AZURE_OPENAI_SERVICE_KEY")
 # Page title
 
 
-dffinal = None
 pdagent = None
 agent_imgs = []
 
 def refreshagent():
     global pdagent
     pdagent = None
-def get_image_data(image_path):
-    with Image.open(image_path) as img:
-        img_byte_arr = io.BytesIO()
-        img.save(img_byte_arr, format='PNG')
-        img_byte_arr = img_byte_arr.getvalue()
-        img_base64 = base64.b64encode(img_byte_arr)
-    return img_base64.decode('utf-8')
-
 def save_chart(query):
-    temp_dir = tempfile.gettempdir()
     q_s = f""" you are CSV Assistant, you are a dataframe ally. you analyze every row, addressing all queries with unwavering precision. 
     You DO NOT answer based on subset of dataframe or top 5 or based on head() output. You need to look at all rows and then answer questions. data is case insensitive.
-    If any charts or graphs or plots were created save them in the {temp_dir} directory
+    If any charts or graphs or plots were created save them with plt.savefig()
     
     Remember, you can handle both singular and plural forms of queries. For example:
     - If you ask "How many thinkpads do we have?" or "How many thinkpad do we have?", you will address both forms in the same manner.
@@ -82,23 +71,28 @@ def save_chart(query):
     query += ' . '+ q_s
     return query
 
-def get_images_in_temp():
-    temp_dir = tempfile.gettempdir()
-    image_files = glob.glob(os.path.join(temp_dir, '*.[pjJ][npNP][gG]*'))
-    image_data = [get_image_data(file) for file in image_files]
-
-    # Delete the files after reading them
-    for file in image_files:
-        os.remove(file)
-        
-    return image_data
- 
-def save_df(dff):
-    global dffinal
-    dffinal = dff
- 
+# The dataframe store keeps text columns with few distinct values as categoricals (core.dataframestore.downcast)
+CATEGORICAL_NOTE = """Text columns with few distinct values are pandas Categoricals: pass observed=True to groupby, \
+and convert the column with .astype(str) before assigning a value that is not one of its categories."""
+
+def agent_prefix(profile):
+    # The profile saves the agent the tool calls it would otherwise spend inspecting the dataframe
+    if profile is None:
+        return PREFIX_FUNCTIONS + "\n\n" + CATEGORICAL_NOTE
+    return PREFIX_FUNCTIONS + "\n\n" + CATEGORICAL_NOTE + "\n\n" + format_profile(profile)
+
 # function to stream agent response 
-def process_agent_scratch_pad(question, df):
+# capture returns the context in which the agent runs the code it writes, the charts
+# saved in it are kept for the session (ChartStore.capture)
+def process_agent_scratch_pad(question, df, profile=None, capture=nullcontext):
+    # Simple questions are answered with pandas directly, without the agent loop
+    answer = tabularfastpath.answer(question, df)
+    if answer is not None:
+        output = answer.replace("\n", "<br>")
+        yield f'data: Final Output: {output}\n\n'
+        yield (f'event: end\ndata: Stream ended\n\n')
+        return
+
     chat = AzureChatOpenAI(
     api_key= OPENAI_API_KEY,
     azure_endpoint=OPENAI_API_BASE,
@@ -106,8 +100,14 @@ def process_agent_scratch_pad(question, df):
     deployment_name=OPENAI_DEPLOYMENT_NAME)  
          
     question = save_chart(question)
-    pdagent = create_pandas_dataframe_agent(chat, df, verbose=True,agent_type=AgentType.OPENAI_FUNCTIONS)
-    for chunk in pdagent.stream({"input": question}):
+    pdagent = create_pandas_dataframe_agent(chat, df, prefix=agent_prefix(profile), verbose=True,agent_type=AgentType.OPENAI_FUNCTIONS)
+    stream = pdagent.stream({"input": question})
+    while True:
+        # The stream may resume on another thread at every step, enter the capture for each one
+        with capture():
+            chunk = next(stream, None)
+        if chunk is None:
+            return
         if "actions" in chunk:
             for action in chunk["actions"]:
                 yield f'data: Calling Tool: `{action.tool}` with input `{action.tool_input}`\n'
@@ -124,7 +124,10 @@ def process_agent_scratch_pad(question, df):
             raise ValueError()
 
 #Function to stream final output       
-def process_agent_response(question):
+def process_agent_response(question, df, profile=None, capture=nullcontext):
+    answer = tabularfastpath.answer(question, df)
+    if answer is not None:
+        return f'Final Output: ```{answer}```'
     question = save_chart(question)
     
     chat = AzureChatOpenAI(
@@ -134,8 +137,9 @@ def process_agent_response(question):
     deployment_name=OPENAI_DEPLOYMENT_NAME)  
     
        
-    pdagent = create_pandas_dataframe_agent(chat, dffinal, verbose=True,handle_parsing_errors=True,agent_type=AgentType.OPENAI_FUNCTIONS)
-    for chunk in pdagent.stream({"input": question}):
-        if "output" in chunk:
-            output = f'Final Output: ```{chunk["output"]}```'
-            return output
\ No newline at end of file
+    pdagent = create_pandas_dataframe_agent(chat, df, prefix=agent_prefix(profile), verbose=True,handle_parsing_errors=True,agent_type=AgentType.OPENAI_FUNCTIONS)
+    with capture():
+        for chunk in pdagent.stream({"input": question}):
+            if "output" in chunk:
+                output = f'Final Output: ```{chunk["output"]}```'
+                return output
\ No newline at end of file
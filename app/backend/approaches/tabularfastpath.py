@@ -0,0 +1,125 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+""" Deterministic answers to the simple questions about a dataframe, computed with pandas
+without going through the LLM agent. Only questions that match one of the patterns in full,
+with unambiguous column names, are answered, everything else goes to the agent """
+import re
+from typing import Optional
+
+import pandas as pd
+
+AGGREGATIONS = {
+    "sum": "sum", "total": "sum",
+    "average": "mean", "mean": "mean", "avg": "mean",
+    "median": "median",
+    "maximum": "max", "max": "max", "highest": "max", "largest": "max",
+    "minimum": "min", "min": "min", "lowest": "min", "smallest": "min",
+}
+# Group-by answers with more groups than this are left to the agent
+MAX_GROUPS = 100
+
+LEAD = r"(?:what is |what's |what are |show (?:me )?|give me |calculate |compute |find |tell me )?(?:the )?"
+ROWS = re.compile(rf"^(?:how many rows(?: are there| does it have| in the (?:data|dataset|dataframe|file|csv))?|{LEAD}(?:number|count) of rows|{LEAD}row count)$")
+COLUMNS = re.compile(rf"^(?:how many columns(?: are there| does it have| in the (?:data|dataset|dataframe|file|csv))?|{LEAD}(?:number|count) of columns|{LEAD}column count)$")
+COLUMN_NAMES = re.compile(rf"^{LEAD}(?:names of the columns|column names|columns)(?: in the (?:data|dataset|dataframe|file|csv))?$")
+DTYPES = re.compile(rf"^{LEAD}(?:data ?types|dtypes|types) of (?:each|every|all|the) columns?$")
+MISSING = re.compile(r"^(?:are there any|how many) (?:missing|null|nan|empty) values(?: in the (?:data|dataset|dataframe|file|csv))?$")
+CATEGORICAL_SUMMARY = re.compile(rf"^{LEAD}summary statistics for (?:the )?(?:categorical|text|non-numeric) (?:data|columns)$")
+NUMERIC_SUMMARY = re.compile(rf"^{LEAD}summary statistics(?: for (?:the )?(?:numeric|numerical) (?:data|columns))?$")
+DISTINCT = re.compile(r"^how many (?:unique|distinct|different) (?P<column>.+?)(?: values)?(?: are there)?$")
+COUNT_BY = re.compile(rf"^(?:how many rows (?:are there )?|{LEAD}(?:number|count) of rows |{LEAD}row count |count rows |count )(?:by|per|for each) (?:the )?(?P<group>.+)$")
+AGGREGATE = re.compile(rf"^{LEAD}(?P<aggregation>{'|'.join(AGGREGATIONS)})(?: value)?(?: of)? (?:the )?(?P<column>.+?)"
+                       r"(?: (?:by|per|for each|grouped by) (?:the )?(?P<group>.+))?$")
+
+
+def normalize(text: str) -> str:
+    """Lower case, single spaces, no trailing punctuation, underscores and dashes as spaces"""
+    text = re.sub(r"[_\-]+", " ", text.lower())
+    return re.sub(r"\s+", " ", text).strip().rstrip("?.!").strip()
+
+
+def find_column(df: pd.DataFrame, text: str) -> Optional[object]:
+    """Returns the column named by the text, or None when no column or several columns match"""
+    text = normalize(text)
+    candidates = {text, text[:-1] if text.endswith("s") else text}
+    matches = [name for name in df.columns if normalize(str(name)) in candidates]
+    return matches[0] if len(matches) == 1 else None
+
+
+def _format(value) -> str:
+    if isinstance(value, pd.DataFrame):
+        return value.to_markdown()
+    if isinstance(value, pd.Series):
+        return value.to_frame().to_markdown()
+    if isinstance(value, float):
+        return f"{round(value, 4)}"
+    return f"{value}"
+
+
+def _is_numeric(column: pd.Series) -> bool:
+    return pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_bool_dtype(column)
+
+
+def answer(question: str, df: pd.DataFrame) -> Optional[str]:
+    """Returns the answer to a simple question about the frame, or None when the agent is needed"""
+    if df is None or not df.columns.is_unique:
+        return None
+    question = normalize(question)
+    if ROWS.match(question):
+        return f"There are {len(df)} rows."
+    if COLUMNS.match(question):
+        return f"There are {len(df.columns)} columns."
+    if COLUMN_NAMES.match(question):
+        return "The columns are: " + ", ".join(f"`{name}`" for name in df.columns)
+    if DTYPES.match(question):
+        return _format(df.dtypes.astype(str).rename("data type"))
+    if MISSING.match(question):
+        nulls = df.isna().sum()
+        if not nulls.any():
+            return "There are no missing values."
+        return f"There are {int(nulls.sum())} missing values.\n" + _format(nulls[nulls > 0].rename("missing values"))
+    if CATEGORICAL_SUMMARY.match(question):
+        categorical = df.select_dtypes(exclude=["number", "bool", "datetime"])
+        if not len(categorical.columns):
+            return "There are no categorical columns."
+        return _format(categorical.describe())
+    if NUMERIC_SUMMARY.match(question):
+        numeric = df.select_dtypes("number")
+        if not len(numeric.columns):
+            return "There are no numeric columns."
+        return _format(numeric.describe())
+
+    match = DISTINCT.match(question)
+    if match:
+        column = find_column(df, match.group("column"))
+        if column is not None:
+            return f"There are {df[column].nunique(dropna=True)} distinct values of `{column}`."
+        return None
+
+    match = COUNT_BY.match(question)
+    if match:
+        group = find_column(df, match.group("group"))
+        if group is None:
+            return None
+        counts = df[group].value_counts(dropna=False)
+        if len(counts) > MAX_GROUPS:
+            return None
+        return _format(counts.rename("rows"))
+
+    match = AGGREGATE.match(question)
+    if match:
+        column = find_column(df, match.group("column"))
+        if column is None or not _is_numeric(df[column]):
+            return None
+        aggregation = AGGREGATIONS[match.group("aggregation")]
+        if match.group("group") is None:
+            return f"The {aggregation} of `{column}` is {_format(df[column].agg(aggregation).item())}."
+        group = find_column(df, match.group("group"))
+        if group is None or group == column:
+            return None
+        result = df.groupby(group, observed=True, dropna=False)[column].agg(aggregation)
+        if len(result) > MAX_GROUPS:
+            return None
+        return _format(result.rename(f"{aggregation} of {column}"))
+    return None
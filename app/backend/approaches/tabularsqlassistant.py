@@ -0,0 +1,109 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+""" Tabular data assistant answering with SQL run by DuckDB instead of a pandas REPL. The agent
+has a single tool running a query over the session's frame, so the aggregations run vectorized
+on several cores and spill to disk rather than in Python code written by the model """
+import os
+import warnings
+from langchain.agents import AgentExecutor, create_openai_functions_agent
+from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain.tools import Tool
+from langchain_openai import AzureChatOpenAI
+warnings.filterwarnings('ignore')
+from dotenv import load_dotenv
+from approaches import tabularfastpath
+from core.dataframeprofile import format_profile
+from core.duckdbengine import TABLE_NAME
+
+OPENAI_API_VERSION = "2024-02-01"
+os.environ["OPENAI_API_TYPE"] = "azure"
+os.environ["OPENAI_API_VERSION"] = OPENAI_API_VERSION
+
+load_dotenv()
+
+OPENAI_DEPLOYMENT_NAME = os.getenv("AZURE_OPENAI_CHATGPT_DEPLOYMENT")
+OPENAI_API_BASE = os.environ.get("AZURE_OPENAI_ENDPOINT")
+OPENAI_API_KEY = os.environ.get("AZURE_OPENAI_SERVICE_KEY")
+
+# Tool calls before the agent has to answer
+MAX_ITERATIONS = 10
+
+SYSTEM_PROMPT = f"""You are CSV Assistant, you answer questions about the data an analyst uploaded by querying it with DuckDB SQL.
+The data is the table `{TABLE_NAME}`. Use the sql_query tool to run one SELECT statement at a time and base your answer on its results only.
+Compute counts, sums, averages and rankings with SQL over all rows, never from a sample of rows. Only the first rows of a result are returned, so aggregate or use LIMIT.
+Quote column names with double quotes, they may contain spaces. Text comparisons are case sensitive, use ILIKE or lower() for the values the analyst typed.
+Handle singular and plural forms of the analyst's words the same way, e.g. "thinkpad" and "thinkpads".
+Text columns holding amounts such as "$163.97" have to be converted, e.g. CAST(replace(trim("Average Price"), '$', '') AS DOUBLE).
+Charts can not be created, answer with tables instead.
+
+Columns of `{TABLE_NAME}`:
+{{schema}}
+
+{{profile}}"""
+
+
+def build_agent(engine, connection, profile):
+    """The SQL agent for one analysis, its tool runs the queries on the connection"""
+    chat = AzureChatOpenAI(
+        api_key=OPENAI_API_KEY,
+        azure_endpoint=OPENAI_API_BASE,
+        openai_api_version=OPENAI_API_VERSION,
+        deployment_name=OPENAI_DEPLOYMENT_NAME)
+    tools = [Tool(name="sql_query",
+                  func=lambda sql: engine.run(connection, sql),
+                  description=f"Runs a DuckDB SQL query on the table {TABLE_NAME} and returns the result as a markdown table, or the error to correct")]
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", SYSTEM_PROMPT),
+        ("human", "{input}"),
+        MessagesPlaceholder(variable_name="agent_scratchpad"),
+    ]).partial(schema=engine.schema(connection),
+               profile=format_profile(profile) if profile is not None else "")
+    agent = create_openai_functions_agent(chat, tools, prompt)
+    return AgentExecutor(agent=agent, tools=tools, max_iterations=MAX_ITERATIONS, handle_parsing_errors=True, verbose=True)
+
+
+# function to stream agent response, with the same events as the pandas agent
+# engine is the DuckDbEngine the session's frame is queried with
+def process_agent_scratch_pad(question, df, profile, engine):
+    # Simple questions are answered with pandas directly, without the agent loop
+    answer = tabularfastpath.answer(question, df)
+    if answer is not None:
+        output = answer.replace("\n", "<br>")
+        yield f'data: Final Output: {output}\n\n'
+        yield (f'event: end\ndata: Stream ended\n\n')
+        return
+
+    connection = engine.connect(df)
+    try:
+        for chunk in build_agent(engine, connection, profile).stream({"input": question}):
+            if "actions" in chunk:
+                for action in chunk["actions"]:
+                    yield f'data: Calling Tool: `{action.tool}` with input `{action.tool_input}`\n'
+                    yield f'data: \nProcessing...: {action.log}\n'
+            elif "steps" in chunk:
+                for step in chunk["steps"]:
+                    yield f'data: Tool Result: `{step.observation}` \n\n'
+            elif "output" in chunk:
+                output = chunk["output"].replace("\n", "<br>")
+                yield f'data: Final Output: {output}\n\n'
+                yield (f'event: end\ndata: Stream ended\n\n')
+                return
+            else:
+                raise ValueError()
+    finally:
+        connection.close()
+
+#Function to stream final output
+def process_agent_response(question, df, profile, engine):
+    answer = tabularfastpath.answer(question, df)
+    if answer is not None:
+        return f'Final Output: ```{answer}```'
+
+    connection = engine.connect(df)
+    try:
+        for chunk in build_agent(engine, connection, profile).stream({"input": question}):
+            if "output" in chunk:
+                return f'Final Output: ```{chunk["output"]}```'
+    finally:
+        connection.close()
@@ -0,0 +1,63 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import asyncio
+import logging
+import threading
+from typing import Awaitable, Callable, Optional
+
+from approaches.approach import Approach, Approaches
+
+
+class ApproachRegistry:
+    """Chat approaches by Approaches value, constructed on first use. Only the approaches
+    registered as enabled are ever imported and constructed, and construction waits until
+    the readiness check passes since the approaches are built with the model metadata."""
+
+    def __init__(self, ready: Callable[[], Awaitable[None]]):
+        self._ready = ready
+        self._factories: dict[Approaches, Callable[[], Approach]] = {}
+        self._approaches: dict[Approaches, Approach] = {}
+        # Reentrant so a factory can build the approaches it reuses
+        self._lock = threading.RLock()
+
+    def register(self, approach: Approaches, factory: Callable[[], Approach], enabled: bool = True):
+        """Registers the factory of an approach, disabled approaches are left out entirely"""
+        if enabled:
+            self._factories[approach] = factory
+
+    def build(self, approach: Approaches) -> Approach:
+        """Returns the approach, constructing it on the first call"""
+        with self._lock:
+            if approach not in self._approaches:
+                self._approaches[approach] = self._factories[approach]()
+            return self._approaches[approach]
+
+    async def get(self, approach: Approaches) -> Optional[Approach]:
+        """Returns the approach, or None when it is not enabled"""
+        impl = self._approaches.get(approach)
+        if impl is not None:
+            return impl
+        if approach not in self._factories:
+            return None
+        await self._ready()
+        # Importing an approach module can take a while, keep it off the event loop
+        return await asyncio.to_thread(self.build, approach)
+
+    def invalidate(self):
+        """Drops the constructed approaches so they are built again with the current model
+        metadata, waiting for any construction in progress"""
+        with self._lock:
+            self._approaches.clear()
+
+    async def warm(self):
+        """Constructs every enabled approach ahead of the first request"""
+        for approach in self._factories:
+            try:
+                await self.get(approach)
+            except Exception as e:
+                logging.warning(f"Unable to construct the {approach.name} approach: {str(e)}")
+
+    def stats(self) -> dict:
+        """Returns whether each enabled approach has been constructed"""
+        return {approach.name: approach in self._approaches for approach in self._factories}
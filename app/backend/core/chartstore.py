@@ -0,0 +1,166 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import hashlib
+import io
+import threading
+import uuid
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from matplotlib.figure import Figure
+
+from shared_code.ttl_cache import TTLCache
+
+# The capture active for the code running in this context, set by ChartStore.capture
+_capture: ContextVar[Optional[tuple]] = ContextVar("chart_capture", default=None)
+_hook_lock = threading.Lock()
+_original_savefig = None
+
+
+class _ContextFigures:
+    """Stands in for pyplot's registry of open figures (Gcf.figs), which holds the current figure
+    too. Code running in a capture sees the figures of the capture's session only, so concurrent
+    sessions never draw on each other's figure. Anything else sees the process-wide registry."""
+
+    def __init__(self, shared: OrderedDict):
+        self._shared = shared
+
+    def _figures(self) -> OrderedDict:
+        capture = _capture.get()
+        return capture[3] if capture is not None else self._shared
+
+    def __getitem__(self, num):
+        return self._figures()[num]
+
+    def __setitem__(self, num, manager):
+        self._figures()[num] = manager
+
+    def __delitem__(self, num):
+        del self._figures()[num]
+
+    def __contains__(self, num):
+        return num in self._figures()
+
+    def __iter__(self):
+        return iter(self._figures())
+
+    def __len__(self):
+        return len(self._figures())
+
+    def get(self, num, default=None):
+        return self._figures().get(num, default)
+
+    def pop(self, num, *default):
+        return self._figures().pop(num, *default)
+
+    def keys(self):
+        return self._figures().keys()
+
+    def values(self):
+        return self._figures().values()
+
+    def items(self):
+        return self._figures().items()
+
+    def clear(self):
+        self._figures().clear()
+
+    def move_to_end(self, num, last=True):
+        self._figures().move_to_end(num, last)
+
+
+def _savefig(figure: Figure, fname, *args, **kwargs):
+    capture = _capture.get()
+    if capture is None:
+        return _original_savefig(figure, fname, *args, **kwargs)
+    store, session_id, figures, _ = capture
+    # Render to memory instead of the requested file, the PNG is compressed once here and served as is
+    kwargs["format"] = "png"
+    kwargs.setdefault("pil_kwargs", {"optimize": True})
+    buffer = io.BytesIO()
+    _original_savefig(figure, buffer, *args, **kwargs)
+    store.add(session_id, buffer.getvalue())
+    figures.append(figure)
+
+
+def install_savefig_hook():
+    """Routes Figure.savefig, and so pyplot.savefig, to the chart store while a capture is active,
+    and gives each capture its own pyplot figures"""
+    global _original_savefig
+    from matplotlib._pylab_helpers import Gcf
+    with _hook_lock:
+        if _original_savefig is None:
+            _original_savefig = Figure.savefig
+            Figure.savefig = _savefig
+            Gcf.figs = _ContextFigures(Gcf.figs)
+
+
+class ChartStore:
+    """Charts generated by the tabular data assistant, kept in memory as PNG bytes by session.
+    Figures saved with matplotlib while a capture is active are stored here instead of being
+    written to disk, so sessions never see each other's charts. Each session keeps its newest
+    max_charts_per_session charts, all of them together stay under max_bytes. Each capture sees
+    only the pyplot figures of its own session."""
+
+    def __init__(self, max_charts_per_session: int, max_bytes: int, ttl_seconds: float):
+        self.max_charts_per_session = int(max_charts_per_session)
+        # Chart id -> (PNG bytes, ETag)
+        self.charts = TTLCache(1000000, ttl_seconds, max_weight=max_bytes, weigher=lambda chart: len(chart[0]))
+        # Session id -> ids of the charts not handed out yet
+        self.pending = TTLCache(100000, ttl_seconds)
+        # Session id -> pyplot figures left open by its last capture, by figure number
+        self.open_figures = TTLCache(100000, ttl_seconds)
+        self._lock = threading.Lock()
+        install_savefig_hook()
+
+    @contextmanager
+    def capture(self, session_id: str):
+        """Captures the charts saved by the code run in this context for the session, and closes
+        their figures when it exits"""
+        import matplotlib.pyplot as plt
+        figures = []
+        # The figures the session left open in a previous step are current again
+        open_figures = self.open_figures.pop(session_id) or OrderedDict()
+        token = _capture.set((self, session_id, figures, open_figures))
+        try:
+            yield
+        finally:
+            for figure in figures:
+                plt.close(figure)
+            _capture.reset(token)
+            # Any other figure is kept until the next capture of the session
+            if open_figures:
+                self.open_figures.set(session_id, open_figures)
+
+    def add(self, session_id: str, png: bytes) -> str:
+        """Stores a chart of the session and returns its id"""
+        chart_id = uuid.uuid4().hex
+        self.charts.set(chart_id, (png, hashlib.sha256(png).hexdigest()))
+        with self._lock:
+            pending = self.pending.get(session_id)
+            if pending is None:
+                pending = deque()
+                self.pending.set(session_id, pending)
+            pending.append(chart_id)
+            while len(pending) > self.max_charts_per_session:
+                self.charts.pop(pending.popleft())
+        return chart_id
+
+    def take(self, session_id: str) -> list[str]:
+        """Returns the ids of the charts of the session generated since the previous call"""
+        with self._lock:
+            pending = self.pending.pop(session_id)
+        if not pending:
+            return []
+        return [chart_id for chart_id in pending if self.charts.get(chart_id) is not None]
+
+    def get(self, chart_id: str) -> Optional[tuple[bytes, str]]:
+        """Returns the PNG bytes of a chart and their ETag, or None once it has been evicted"""
+        return self.charts.get(chart_id)
+
+    def stats(self) -> dict:
+        """Returns the counters of the charts"""
+        return {**self.charts.stats(), "sessions_with_pending_charts": len(self.pending)}
@@ -0,0 +1,94 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import asyncio
+import json
+import logging
+import time
+from typing import Iterable
+
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceNotModifiedError
+from azure.storage.blob.aio import ContainerClient
+
+from shared_code.ttl_cache import TTLCache
+
+
+class CitationCache:
+    """Parsed chunk JSON of the citations, keyed by chunk path. An entry is served as is for
+    revalidate_seconds, then revalidated with a conditional download against the blob ETag so
+    unchanged chunks are never transferred again. Concurrent requests for the same chunk share
+    a single download."""
+
+    def __init__(self, container_client: ContainerClient, max_size: int, ttl_seconds: float,
+                 revalidate_seconds: float, prefetch_concurrency: int = 8):
+        self.container_client = container_client
+        self.cache = TTLCache(max_size, ttl_seconds)
+        self.revalidate_seconds = float(revalidate_seconds)
+        self._semaphore = asyncio.Semaphore(prefetch_concurrency)
+        self._inflight: dict[str, asyncio.Future] = {}
+        # Keep a reference to the background prefetches so they are not garbage collected
+        self._prefetches: set[asyncio.Task] = set()
+        self.downloads = 0
+        self.not_modified = 0
+        self.prefetched = 0
+
+    async def get(self, path: str) -> tuple[dict, str]:
+        """Returns the parsed chunk and its ETag"""
+        entry = self.cache.get(path)
+        if entry is not None and time.monotonic() - entry[2] < self.revalidate_seconds:
+            return entry[0], entry[1]
+        load = self._inflight.get(path)
+        if load is None:
+            load = asyncio.ensure_future(self._load(path, entry))
+            self._inflight[path] = load
+            load.add_done_callback(lambda _: self._inflight.pop(path, None))
+        # A cancelled request must not cancel the download other requests are waiting for
+        return await asyncio.shield(load)
+
+    async def _load(self, path: str, entry: tuple) -> tuple[dict, str]:
+        blob_client = self.container_client.get_blob_client(path)
+        if entry is not None:
+            try:
+                downloader = await blob_client.download_blob(etag=entry[1], match_condition=MatchConditions.IfModified)
+            except ResourceNotModifiedError:
+                self.not_modified += 1
+                self.cache.set(path, (entry[0], entry[1], time.monotonic()))
+                return entry[0], entry[1]
+        else:
+            downloader = await blob_client.download_blob()
+        results = json.loads((await downloader.readall()).decode())
+        etag = downloader.properties.etag
+        self.downloads += 1
+        self.cache.set(path, (results, etag, time.monotonic()))
+        return results, etag
+
+    async def get_many(self, paths: Iterable[str]) -> dict[str, dict]:
+        """Returns the parsed chunks by path, with an error entry for the chunks that could not be read"""
+        paths = list(dict.fromkeys(paths))
+        loaded = await asyncio.gather(*(self.get(path) for path in paths), return_exceptions=True)
+        return {path: {"error": str(result)} if isinstance(result, Exception) else result[0]
+                for path, result in zip(paths, loaded)}
+
+    def prefetch(self, paths: Iterable[str]):
+        """Loads the chunks that are not cached yet in the background"""
+        for path in dict.fromkeys(paths):
+            if self.cache.get(path) is None and path not in self._inflight:
+                task = asyncio.create_task(self._prefetch(path))
+                self._prefetches.add(task)
+                task.add_done_callback(self._prefetches.discard)
+
+    async def _prefetch(self, path: str):
+        async with self._semaphore:
+            try:
+                await self.get(path)
+                self.prefetched += 1
+            except Exception as e:
+                logging.warning(f"Unable to prefetch citation {path}: {str(e)}")
+
+    def stats(self) -> dict:
+        """Returns the cache counters"""
+        return {**self.cache.stats(),
+                "downloads": self.downloads,
+                "not_modified": self.not_modified,
+                "prefetched": self.prefetched}
@@ -0,0 +1,90 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import codecs
+import logging
+from typing import BinaryIO
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+# Bytes looked at to pick the encoding of an upload
+ENCODING_SAMPLE_BYTES = 64 * 1024
+# Size of the blocks Arrow parses in parallel
+ARROW_BLOCK_BYTES = 4 * 1024 * 1024
+# Encoding of the CSVs that are not valid UTF-8, mostly exports of spreadsheet applications
+FALLBACK_ENCODING = "cp1252"
+
+BOMS = [
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+
+class CsvTooLarge(ValueError):
+    """The upload is larger than the configured limit"""
+
+
+def detect_encoding(sample: bytes) -> str:
+    """Returns the encoding of a CSV from its first bytes: the one of its byte order mark, else
+    UTF-8 when the sample decodes as UTF-8, else the single byte fallback"""
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding
+    try:
+        # The sample may end in the middle of a multi-byte character
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return FALLBACK_ENCODING
+
+
+def file_size(file: BinaryIO) -> int:
+    """Returns the size of a seekable file, leaving it at its start"""
+    file.seek(0, 2)
+    size = file.tell()
+    file.seek(0)
+    return size
+
+
+def _read_arrow(file: BinaryIO, encoding: str) -> pa.Table:
+    # Arrow parses blocks on several threads and transcodes other encodings to UTF-8 as it reads
+    read_options = pacsv.ReadOptions(use_threads=True,
+                                     block_size=ARROW_BLOCK_BYTES,
+                                     encoding="utf8" if encoding == "utf-8-sig" else encoding)
+    # Text stays text here, the dataframe store decides which columns are kept as categoricals
+    return pacsv.read_csv(file, read_options=read_options)
+
+
+def _has_binary_columns(table: pa.Table) -> bool:
+    # Arrow reads text that is not valid UTF-8 as binary instead of failing
+    return any(pa.types.is_binary(field.type) or pa.types.is_large_binary(field.type) for field in table.schema)
+
+
+def read_csv_upload(file: BinaryIO, max_bytes: int) -> pd.DataFrame:
+    """Parses an uploaded CSV straight from its file object. Raises CsvTooLarge when the file is
+    larger than max_bytes, before any of it is parsed"""
+    size = file_size(file)
+    if size > max_bytes:
+        raise CsvTooLarge(f"The file is {size / 1024 / 1024:.1f} MB, the limit is {max_bytes / 1024 / 1024:.0f} MB")
+    encoding = detect_encoding(file.read(ENCODING_SAMPLE_BYTES))
+    for attempt in range(2):
+        file.seek(0)
+        try:
+            table = _read_arrow(file, encoding)
+        except (pa.ArrowInvalid, UnicodeDecodeError) as e:
+            # Rows Arrow will not parse, e.g. a varying number of columns
+            logging.warning(f"Arrow could not parse the CSV as {encoding}, falling back to pandas: {str(e)}")
+            break
+        if attempt == 0 and encoding == "utf-8" and _has_binary_columns(table):
+            # Invalid UTF-8 past the sample
+            encoding = FALLBACK_ENCODING
+            continue
+        # Convert column by column, releasing each Arrow buffer once it has been copied
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+    file.seek(0)
+    return pd.read_csv(file, encoding=encoding, encoding_errors="replace", low_memory=False)
@@ -0,0 +1,68 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import math
+
+import pandas as pd
+
+# Most frequent values listed for each non-numeric column
+TOP_VALUES = 5
+# Columns described in the agent prompt, wider frames are truncated
+MAX_PROMPT_COLUMNS = 60
+# Length of the values quoted in the prompt
+MAX_VALUE_LENGTH = 40
+
+
+def _number(value) -> float:
+    value = float(value)
+    return round(value, 4) if math.isfinite(value) else None
+
+
+def profile_frame(df: pd.DataFrame) -> dict:
+    """Returns the schema and summary of a frame, computed once over all rows: the dtype, missing
+    values and distinct values of each column, min/mean/max/std of the numeric columns and the
+    most frequent values of the others"""
+    nulls = df.isna().sum().to_numpy()
+    distinct = df.nunique(dropna=True).to_numpy()
+    numeric = [position for position, dtype in enumerate(df.dtypes)
+               if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)]
+    # Summary statistics of all numeric columns in one vectorized pass
+    stats = df.iloc[:, numeric].agg(["min", "mean", "max", "std"]) if numeric else None
+    stats_column = {position: index for index, position in enumerate(numeric)}
+    columns = []
+    for position, name in enumerate(df.columns):
+        column = df.iloc[:, position]
+        entry = {"name": str(name),
+                 "dtype": str(column.dtype),
+                 "nulls": int(nulls[position]),
+                 "distinct": int(distinct[position])}
+        if position in stats_column:
+            values = stats.iloc[:, stats_column[position]]
+            entry["stats"] = {statistic: _number(value) for statistic, value in values.items()}
+        else:
+            counts = column.value_counts(dropna=True).head(TOP_VALUES)
+            entry["top_values"] = [[str(value), int(count)] for value, count in counts.items()]
+        columns.append(entry)
+    return {"rows": int(len(df)), "columns": columns}
+
+
+def _quote(value: str) -> str:
+    return value if len(value) <= MAX_VALUE_LENGTH else value[:MAX_VALUE_LENGTH] + "..."
+
+
+def format_profile(profile: dict) -> str:
+    """Returns the profile as text for the agent prompt"""
+    columns = profile["columns"]
+    lines = [f"The dataframe has {profile['rows']} rows and {len(columns)} columns. "
+             "This profile was computed over all rows, use it instead of inspecting the dataframe "
+             "for column names, types, missing values or distinct values:"]
+    for entry in columns[:MAX_PROMPT_COLUMNS]:
+        line = f"- `{entry['name']}` ({entry['dtype']}): {entry['nulls']} missing, {entry['distinct']} distinct"
+        if "stats" in entry:
+            line += "; " + ", ".join(f"{statistic}={value}" for statistic, value in entry["stats"].items() if value is not None)
+        elif entry.get("top_values"):
+            line += "; most frequent: " + ", ".join(f"{_quote(value)} ({count})" for value, count in entry["top_values"])
+        lines.append(line)
+    if len(columns) > MAX_PROMPT_COLUMNS:
+        lines.append(f"- ... and {len(columns) - MAX_PROMPT_COLUMNS} more columns")
+    return "\n".join(lines)
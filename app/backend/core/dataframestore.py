@@ -0,0 +1,246 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable
+
+import pandas as pd
+
+# Text columns with fewer distinct values than this share of their rows are stored as categoricals
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+# Form of the session ids the store issues
+SESSION_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+def downcast(df: pd.DataFrame) -> pd.DataFrame:
+    """Returns the frame with its text columns of few distinct values as categoricals. Numeric
+    columns keep their dtypes: the pandas code the agent writes would silently wrap around in a
+    smaller integer type, and accumulate sums and means in a smaller float type"""
+    columns = {}
+    for position, (name, column) in enumerate(df.items()):
+        if pd.api.types.is_object_dtype(column) or pd.api.types.is_string_dtype(column):
+            if len(column) and column.nunique(dropna=True) < len(column) * CATEGORY_MAX_UNIQUE_RATIO:
+                columns[position] = column.astype("category")
+    if not columns:
+        return df
+    df = df.copy(deep=False)
+    for position, column in columns.items():
+        df.isetitem(position, column)
+    return df
+
+
+def memory_bytes(df: pd.DataFrame) -> int:
+    """Returns the memory held by the frame, including its Python string objects"""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class DataFrameSession:
+    """A frame uploaded by one analyst, held in memory and/or spilled to a Parquet file"""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        # Names the spill file, never derived from the session id the client sends
+        self.spill_token = uuid.uuid4().hex
+        self.df = None
+        # The frame while it is written to its spill file, still served from memory
+        self.spilling = None
+        self.memory_bytes = 0
+        self.spill_path = None
+        self.rows = 0
+        self.columns = 0
+        # Computed once when the frame is stored, kept in memory when the frame is spilled
+        self.profile = None
+        self.last_access = time.monotonic()
+
+
+class DataFrameStore:
+    """Uploaded CSV frames by session id, so every analyst works on their own data. Frames are
+    downcast when stored and kept in memory up to max_total_bytes, the least recently used ones
+    beyond that are spilled to Parquet files and read back when their session is used again.
+    Sessions idle for longer than ttl_seconds are dropped together with their spill file.
+    When a profiler is given, its summary of each frame is kept with the session."""
+
+    def __init__(self, spill_dir: str, max_session_bytes: int, max_total_bytes: int, ttl_seconds: float,
+                 profiler: Callable[[pd.DataFrame], dict] = None):
+        self.spill_dir = spill_dir
+        self.profiler = profiler
+        self.max_session_bytes = int(max_session_bytes)
+        self.max_total_bytes = int(max_total_bytes)
+        self.ttl_seconds = float(ttl_seconds)
+        self.total_bytes = 0
+        self._sessions: OrderedDict[str, DataFrameSession] = OrderedDict()
+        self._lock = threading.RLock()
+        self.spills = 0
+        self.reloads = 0
+        self.expirations = 0
+        os.makedirs(self.spill_dir, exist_ok=True)
+
+    def put(self, df: pd.DataFrame, session_id: str = None) -> DataFrameSession:
+        """Stores the frame in a new session, or replaces the frame of an existing one. A session
+        id not of the form the store issues is replaced by a new one. Raises
+        ValueError when the frame is larger than the per-session limit once downcast"""
+        df = downcast(df)
+        size = memory_bytes(df)
+        if size > self.max_session_bytes:
+            raise ValueError(f"The data takes {size / 1024 / 1024:.0f} MB in memory, "
+                             f"the limit per session is {self.max_session_bytes / 1024 / 1024:.0f} MB")
+        profile = self.profiler(df) if self.profiler is not None else None
+        with self._lock:
+            self._expire()
+            # Every session the store issued has this form, anything else is not used as a key
+            if session_id is not None and not SESSION_ID.match(session_id):
+                session_id = None
+            if session_id is not None:
+                self._drop(session_id)
+            session = DataFrameSession(session_id or uuid.uuid4().hex)
+            session.rows, session.columns = df.shape
+            session.profile = profile
+            self._sessions[session.session_id] = session
+            spills = self._hold(session, df, size)
+        self._write_spills(spills)
+        return session
+
+    def get(self, session_id: str) -> pd.DataFrame:
+        """Returns the frame of a session, reading it back if it was spilled. Raises KeyError
+        for unknown or expired sessions"""
+        while True:
+            with self._lock:
+                self._expire()
+                session = self._sessions[session_id]
+                session.last_access = time.monotonic()
+                self._sessions.move_to_end(session_id)
+                if session.df is not None:
+                    return session.df
+                if session.spilling is not None:
+                    # Still in memory while its spill file is written
+                    df, session.spilling = session.spilling, None
+                    spills = self._hold(session, df, session.memory_bytes)
+                    break
+                spill_path = session.spill_path
+            # Read outside the lock so the other sessions are not held up by a large frame
+            try:
+                df, error = pd.read_parquet(spill_path), None
+            except Exception as e:
+                df, error = None, e
+            with self._lock:
+                if self._sessions.get(session_id) is not session:
+                    # Replaced or dropped together with its spill file meanwhile, look it up again
+                    continue
+                if session.df is not None:
+                    return session.df
+                if error is not None:
+                    raise error
+                self.reloads += 1
+                spills = self._hold(session, df, memory_bytes(df))
+                break
+        self._write_spills(spills)
+        return df
+
+    def profile(self, session_id: str) -> dict:
+        """Returns the profile of the frame of a session. Raises KeyError for unknown or expired sessions"""
+        with self._lock:
+            return self._sessions[session_id].profile
+
+    def info(self, session_id: str) -> dict:
+        """Returns the shape and residency of a session. Raises KeyError for unknown or expired sessions"""
+        with self._lock:
+            self._expire()
+            session = self._sessions[session_id]
+            return {"session_id": session.session_id,
+                    "rows": session.rows,
+                    "columns": session.columns,
+                    "memory_bytes": session.memory_bytes,
+                    "in_memory": session.df is not None}
+
+    def delete(self, session_id: str):
+        """Drops a session and its spill file"""
+        with self._lock:
+            self._drop(session_id)
+
+    def _hold(self, session: DataFrameSession, df: pd.DataFrame, size: int) -> list:
+        # Called with the lock held, returns the frames to write to their spill files once it is released
+        session.df = df
+        session.memory_bytes = size
+        self.total_bytes += size
+        spills = []
+        # Spill the least recently used frames, never the one just stored
+        for other in list(self._sessions.values()):
+            if self.total_bytes <= self.max_total_bytes:
+                break
+            if other is not session and other.df is not None:
+                if other.spill_path is None:
+                    other.spilling = other.df
+                    spills.append((other, other.df))
+                self.total_bytes -= other.memory_bytes
+                other.df = None
+        return spills
+
+    def _write_spills(self, spills: list):
+        # Written without the lock so the other sessions are not held up by a large frame
+        for session, df in spills:
+            path = os.path.join(self.spill_dir, f"{session.spill_token}.parquet")
+            try:
+                df.to_parquet(path, index=True)
+                error = None
+            except Exception as e:
+                error = e
+            with self._lock:
+                stored = self._sessions.get(session.session_id) is session
+                if error is not None:
+                    logging.warning(f"Unable to spill session {session.session_id}: {str(error)}")
+                    if stored and session.spilling is df:
+                        # Keep the frame in memory rather than losing the session
+                        session.spilling = None
+                        session.df = df
+                        self.total_bytes += session.memory_bytes
+                    continue
+                if not stored:
+                    # Dropped or replaced meanwhile
+                    self._remove_file(path)
+                    continue
+                session.spill_path = path
+                self.spills += 1
+                if session.spilling is df:
+                    session.spilling = None
+
+    def _drop(self, session_id: str):
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return
+        if session.df is not None:
+            self.total_bytes -= session.memory_bytes
+        if session.spill_path is not None:
+            self._remove_file(session.spill_path)
+
+    @staticmethod
+    def _remove_file(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _expire(self):
+        deadline = time.monotonic() - self.ttl_seconds
+        # Sessions are kept in order of last use, the idle ones are at the front
+        for session_id, session in list(self._sessions.items()):
+            if session.last_access >= deadline:
+                break
+            self._drop(session_id)
+            self.expirations += 1
+
+    def stats(self) -> dict:
+        """Returns the number of sessions, the memory they hold and the spill counters"""
+        with self._lock:
+            return {"sessions": len(self._sessions),
+                    "in_memory": sum(1 for session in self._sessions.values() if session.df is not None),
+                    "memory_bytes": self.total_bytes,
+                    "max_total_bytes": self.max_total_bytes,
+                    "spills": self.spills,
+                    "reloads": self.reloads,
+                    "expirations": self.expirations}
@@ -0,0 +1,114 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import os
+import threading
+import time
+
+import duckdb
+import pandas as pd
+
+# Name of the view the session's frame is queried as
+TABLE_NAME = "data"
+
+
+class DuckDbEngine:
+    """Runs SQL over the frames of the tabular data sessions in an embedded DuckDB database.
+    Every analysis gets its own cursor on one in-memory database, so the limits hold for the
+    process however many sessions run at once: DuckDB runs the aggregations vectorized on up to
+    threads cores (0 for all of them) and spills the intermediate results beyond
+    memory_limit_bytes to temp_dir. The frame of a session is scanned in place rather than
+    copied and is only visible to its own cursor. The database can not read or write files, and
+    queries running longer than query_timeout_seconds are interrupted."""
+
+    def __init__(self, temp_dir: str, memory_limit_bytes: int, threads: int = 0,
+                 max_result_rows: int = 50, query_timeout_seconds: float = 60):
+        self.temp_dir = temp_dir
+        self.memory_limit_bytes = int(memory_limit_bytes)
+        self.threads = int(threads) or os.cpu_count() or 1
+        self.max_result_rows = int(max_result_rows)
+        self.query_timeout_seconds = float(query_timeout_seconds)
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.query_seconds = 0.0
+        os.makedirs(self.temp_dir, exist_ok=True)
+        self._database = duckdb.connect(config={"threads": self.threads,
+                                                "memory_limit": f"{self.memory_limit_bytes // (1024 * 1024)}MB",
+                                                "temp_directory": self.temp_dir})
+        # The SQL comes from the model, keep it away from the server's files and settings
+        self._database.execute("SET enable_external_access = false")
+        self._database.execute("SET lock_configuration = true")
+
+    def connect(self, df: pd.DataFrame) -> duckdb.DuckDBPyConnection:
+        """Returns a new cursor on which the frame is the view named TABLE_NAME"""
+        connection = self._database.cursor()
+        try:
+            # Registered views are local to the cursor, sessions never see each other's frame
+            connection.register(TABLE_NAME, df)
+        except Exception:
+            connection.close()
+            raise
+        return connection
+
+    def schema(self, connection: duckdb.DuckDBPyConnection) -> str:
+        """Returns the SQL column names and types of the view, one per line"""
+        columns = connection.execute(f"DESCRIBE {TABLE_NAME}").fetchall()
+        return "\n".join(f'- "{name}" {sql_type}' for name, sql_type, *_ in columns)
+
+    def query(self, connection: duckdb.DuckDBPyConnection, sql: str) -> pd.DataFrame:
+        """Runs a statement and returns up to max_result_rows + 1 rows of its result, the extra
+        row telling the caller that the result was truncated. Raises duckdb.Error for invalid
+        or interrupted statements."""
+        timer = threading.Timer(self.query_timeout_seconds, connection.interrupt)
+        start = time.perf_counter()
+        timer.start()
+        try:
+            cursor = connection.execute(sql)
+            if cursor.description is None:
+                return pd.DataFrame()
+            rows = cursor.fetchmany(self.max_result_rows + 1)
+            return pd.DataFrame(rows, columns=[column[0] for column in cursor.description])
+        except duckdb.InterruptException:
+            with self._lock:
+                self.timeouts += 1
+            raise
+        except duckdb.Error:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            timer.cancel()
+            with self._lock:
+                self.queries += 1
+                self.query_seconds += time.perf_counter() - start
+
+    def run(self, connection: duckdb.DuckDBPyConnection, sql: str) -> str:
+        """Runs a statement for the agent and returns its result as a markdown table, or the
+        error for the agent to correct its query"""
+        try:
+            result = self.query(connection, sql)
+        except duckdb.InterruptException:
+            return (f"Error: the query was stopped after {self.query_timeout_seconds:.0f} seconds, "
+                    "aggregate the data instead of selecting rows")
+        except duckdb.Error as e:
+            return f"Error: {str(e)}"
+        if result.columns.empty:
+            return "The statement returned no result."
+        if result.empty:
+            return "The query returned no rows."
+        if len(result) > self.max_result_rows:
+            return (result.head(self.max_result_rows).to_markdown(index=False) +
+                    f"\n\nOnly the first {self.max_result_rows} rows are shown, aggregate or use LIMIT.")
+        return result.to_markdown(index=False)
+
+    def stats(self) -> dict:
+        """Returns the query counters"""
+        with self._lock:
+            return {"queries": self.queries,
+                    "errors": self.errors,
+                    "timeouts": self.timeouts,
+                    "query_seconds": round(self.query_seconds, 3),
+                    "threads": self.threads,
+                    "memory_limit_bytes": self.memory_limit_bytes}
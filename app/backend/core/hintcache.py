@@ -0,0 +1,165 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import time
+from decimal import Decimal, InvalidOperation
+from typing import Awaitable, Callable, Optional
+
+from shared_code.ttl_cache import TTLCache
+
+NUMBER = re.compile(r"\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?|\.\d+")
+OPERATOR_SPACING = re.compile(r"\s*([-+*/^=<>(),:;%])\s*")
+
+
+def _canonical_number(match: re.Match) -> str:
+    text = match.group().replace(",", "")
+    try:
+        number = Decimal(text)
+    except InvalidOperation:
+        return text
+    if number == number.to_integral_value():
+        return str(int(number))
+    return format(number.normalize(), "f")
+
+
+def normalize_question(question: str) -> str:
+    """Lower case, single spaces, no spaces around operators and no trailing question mark or
+    period, numbers without thousands separators, leading zeros or trailing decimal zeros"""
+    text = re.sub(r"\s+", " ", question.lower()).strip().rstrip("?.").strip()
+    text = NUMBER.sub(_canonical_number, text)
+    return OPERATOR_SPACING.sub(r"\1", text)
+
+
+class HintCache:
+    """Hints of the math tutor by question. A question is looked up as it was typed, then in its
+    normalized form so that the same homework question with other spacing, case or number
+    formatting is a hit too. Entries are evicted least recently used and expire after
+    ttl_seconds. When a cache_file is given, hints are appended to it as JSON lines and loaded
+    back on the next start, as long as the file was written for the same key (deployment and
+    prompt). Concurrent misses for the same question share a single completion."""
+
+    def __init__(self, max_size: int, ttl_seconds: float, cache_file: Optional[str] = None, key: Optional[dict] = None):
+        self.max_size = int(max_size)
+        self.ttl_seconds = float(ttl_seconds)
+        # Question, as typed and normalized -> (hint, time.time() it was generated)
+        self.cache = TTLCache(2 * self.max_size, ttl_seconds)
+        self.cache_file = cache_file or None
+        self.key = key or {}
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._file_lock = threading.Lock()
+        self.exact_hits = 0
+        self.normalized_hits = 0
+        self.generated = 0
+        self.loaded = 0
+        if self.cache_file and self.max_size > 0:
+            self._load()
+
+    def get(self, question: str) -> Optional[str]:
+        """Returns the cached hint for the question, or None"""
+        hint = self._lookup(question.strip())
+        if hint is not None:
+            self.exact_hits += 1
+            return hint
+        hint = self._lookup(normalize_question(question))
+        if hint is not None:
+            self.normalized_hits += 1
+        return hint
+
+    def _lookup(self, key: str) -> Optional[str]:
+        entry = self.cache.get(key)
+        # Entries loaded from the file keep the age they had when it was written
+        if entry is None or time.time() - entry[1] > self.ttl_seconds:
+            return None
+        return entry[0]
+
+    def set(self, question: str, hint: str, created: float = None):
+        """Stores the hint under the question as typed and normalized"""
+        entry = (hint, created or time.time())
+        self.cache.set(question.strip(), entry)
+        self.cache.set(normalize_question(question), entry)
+
+    async def get_or_generate(self, question: str, generate: Callable[[str], Awaitable[str]]) -> str:
+        """Returns the cached hint for the question, generating and storing it on a miss"""
+        hint = self.get(question)
+        if hint is not None:
+            return hint
+        normalized = normalize_question(question)
+        generation = self._inflight.get(normalized)
+        if generation is None:
+            generation = asyncio.ensure_future(self._generate(question, generate))
+            self._inflight[normalized] = generation
+            generation.add_done_callback(lambda _: self._inflight.pop(normalized, None))
+        # A cancelled request must not cancel the completion other requests are waiting for
+        return await asyncio.shield(generation)
+
+    async def _generate(self, question: str, generate: Callable[[str], Awaitable[str]]) -> str:
+        hint = await generate(question)
+        self.generated += 1
+        created = time.time()
+        self.set(question, hint, created)
+        if self.cache_file and self.max_size > 0:
+            await asyncio.to_thread(self._append, normalize_question(question), hint, created)
+        return hint
+
+    def _load(self):
+        try:
+            with open(self.cache_file, encoding="utf-8") as cache:
+                header = json.loads(cache.readline() or "{}")
+                if header.get("key") != self.key:
+                    # Hints of another deployment or prompt
+                    entries = []
+                else:
+                    entries = [json.loads(line) for line in cache if line.strip()]
+        except FileNotFoundError:
+            entries = []
+        except Exception as e:
+            logging.warning(f"Unable to read the hint cache {self.cache_file}: {str(e)}")
+            entries = []
+        deadline = time.time() - self.ttl_seconds
+        live = {}
+        # Later lines replace earlier ones for the same question
+        for entry in entries:
+            if entry.get("created", 0) >= deadline:
+                live[entry["question"]] = entry
+        live = list(live.values())[-self.max_size:]
+        for entry in live:
+            self.cache.set(entry["question"], (entry["hint"], entry["created"]))
+        self.loaded = len(live)
+        self._rewrite(live)
+
+    def _rewrite(self, entries: list):
+        # Start from the live entries only, so the file does not grow with expired or replaced hints
+        try:
+            os.makedirs(os.path.dirname(self.cache_file) or ".", exist_ok=True)
+            temp_file = f"{self.cache_file}.{os.getpid()}.tmp"
+            with open(temp_file, "w", encoding="utf-8") as cache:
+                cache.write(json.dumps({"key": self.key}) + "\n")
+                for entry in entries:
+                    cache.write(json.dumps(entry) + "\n")
+            os.replace(temp_file, self.cache_file)
+        except OSError as e:
+            logging.warning(f"Unable to write the hint cache {self.cache_file}: {str(e)}")
+            self.cache_file = None
+
+    def _append(self, question: str, hint: str, created: float):
+        line = json.dumps({"question": question, "hint": hint, "created": created}) + "\n"
+        try:
+            with self._file_lock, open(self.cache_file, "a", encoding="utf-8") as cache:
+                cache.write(line)
+        except OSError as e:
+            logging.warning(f"Unable to write the hint cache {self.cache_file}: {str(e)}")
+
+    def stats(self) -> dict:
+        """Returns the cache counters"""
+        return {**self.cache.stats(),
+                "exact_hits": self.exact_hits,
+                "normalized_hits": self.normalized_hits,
+                "generated": self.generated,
+                "loaded": self.loaded,
+                "persisted": self.cache_file is not None}
@@ -0,0 +1,89 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import asyncio
+import importlib.util
+import logging
+
+import httpx
+
+# HTTP/2 is negotiated with ALPN when the h2 package is installed, servers that only speak
+# HTTP/1.1 keep working over the same pool
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class HttpTransport:
+    """Keep-alive connection pools for the outbound calls of the backend, one per upstream service.
+    The pools are built once at startup and shared by every approach, so steady-state traffic
+    reuses open TCP/TLS connections instead of paying a handshake on each call."""
+
+    def __init__(self, timeout: float = 60, keepalive_seconds: float = 120):
+        self.timeout = timeout
+        self.keepalive_seconds = keepalive_seconds
+        self.pools: dict[str, dict] = {}
+
+    def add(self, name: str, base_url: str, max_connections: int, warm_connections: int = 0) -> httpx.AsyncClient:
+        """Creates the connection pool of an upstream and returns its client"""
+        limits = httpx.Limits(max_connections=max_connections,
+                              max_keepalive_connections=max_connections,
+                              keepalive_expiry=self.keepalive_seconds)
+        transport = httpx.AsyncHTTPTransport(http2=HTTP2_AVAILABLE, limits=limits, retries=1)
+        pool = {
+            "base_url": base_url,
+            "max_connections": max_connections,
+            "warm_connections": min(warm_connections, max_connections),
+            "requests": 0,
+            "errors": 0,
+            "transport": transport,
+        }
+
+        async def on_request(request: httpx.Request):
+            pool["requests"] += 1
+
+        async def on_response(response: httpx.Response):
+            if response.status_code >= 500:
+                pool["errors"] += 1
+
+        pool["client"] = httpx.AsyncClient(transport=transport,
+                                           timeout=self.timeout,
+                                           event_hooks={"request": [on_request], "response": [on_response]})
+        self.pools[name] = pool
+        return pool["client"]
+
+    def client(self, name: str) -> httpx.AsyncClient:
+        """Returns the client of an upstream"""
+        return self.pools[name]["client"]
+
+    async def warm(self):
+        """Opens the configured number of connections to every upstream ahead of the first request.
+        Any response, even an error status, leaves an open connection in the pool"""
+        async def open_connection(name: str, pool: dict):
+            try:
+                await pool["client"].head(pool["base_url"], timeout=10)
+            except Exception as e:
+                logging.warning(f"Unable to pre-warm the {name} connection pool: {str(e)}")
+
+        await asyncio.gather(*(open_connection(name, pool)
+                               for name, pool in self.pools.items() if pool["base_url"].startswith("http")
+                               for _ in range(pool["warm_connections"])))
+
+    async def aclose(self):
+        """Closes every connection pool"""
+        for pool in self.pools.values():
+            await pool["client"].aclose()
+
+    def stats(self) -> dict:
+        """Returns the request counters and the connection pool state of every upstream"""
+        stats = {"http2_available": HTTP2_AVAILABLE}
+        for name, pool in self.pools.items():
+            # httpx does not expose its pool, read the httpcore one when it is reachable
+            connections = getattr(getattr(pool["transport"], "_pool", None), "connections", [])
+            stats[name] = {
+                "requests": pool["requests"],
+                "errors": pool["errors"],
+                "max_connections": pool["max_connections"],
+                "connections": len(connections),
+                "idle_connections": sum(1 for connection in connections if connection.is_idle()),
+                "http2_connections": sum(1 for connection in connections if "HTTP/2" in connection.info()),
+            }
+        return stats
@@ -0,0 +1,41 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import asyncio
+import logging
+import time
+from typing import Callable
+
+from shared_code.status_log import StatusLog
+
+
+class IndexGeneration:
+    """Tracks the search index generation counter kept in the status log. The enrichment service and
+    the upload/deletion functions bump it whenever indexed content changes. The counter is re-read at
+    most every refresh_seconds, and on_change is called when a new generation is seen."""
+
+    def __init__(self, status_log: StatusLog, refresh_seconds: float, on_change: Callable[[], None] = None):
+        self.status_log = status_log
+        self.refresh_seconds = float(refresh_seconds)
+        self.on_change = on_change
+        self.generation = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def current(self) -> int:
+        """Returns the current index generation, reading it from Cosmos DB when the local copy is stale"""
+        if self.generation is not None and time.monotonic() - self._checked_at < self.refresh_seconds:
+            return self.generation
+        async with self._lock:
+            if self.generation is None or time.monotonic() - self._checked_at >= self.refresh_seconds:
+                try:
+                    generation = await asyncio.to_thread(self.status_log.read_index_generation)
+                except Exception as e:
+                    # Keep serving with the last known generation rather than failing the search
+                    logging.warning(f"Unable to read the index generation: {str(e)}")
+                    generation = self.generation if self.generation is not None else 0
+                if self.generation is not None and generation != self.generation and self.on_change is not None:
+                    self.on_change()
+                self.generation = generation
+                self._checked_at = time.monotonic()
+        return self.generation
@@ -0,0 +1,37 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import threading
+
+from langid.langid import LanguageIdentifier, model
+
+
+class LanguageDetector:
+    """Local n-gram language identification (langid.py) used before falling back to the Translator API.
+    Only detections at or above the confidence threshold are returned, otherwise the caller should
+    ask the remote service."""
+
+    def __init__(self, confidence_threshold: float):
+        self.confidence_threshold = float(confidence_threshold)
+        self.identifier = LanguageIdentifier.from_modelstring(model, norm_probs=True)
+        self._lock = threading.Lock()
+        self.local_detections = 0
+        self.low_confidence = 0
+
+    def detect(self, text: str) -> str:
+        """Returns the ISO 639-1 code of the language of the text, or None if the model is not confident enough"""
+        language, confidence = self.identifier.classify(text)
+        with self._lock:
+            if confidence < self.confidence_threshold:
+                self.low_confidence += 1
+                return None
+            self.local_detections += 1
+        return language
+
+    def stats(self) -> dict:
+        """Returns how many detections were answered locally and how many needed the remote service"""
+        return {
+            "confidence_threshold": self.confidence_threshold,
+            "local_detections": self.local_detections,
+            "low_confidence": self.low_confidence
+        }
@@ -4,22 +4,41 @@ from .modelhelper import num_tokens_from_messages
 class MessageBuilder:
     """
       A class for building and managing messages in a chat conversation.
+      Messages are only ever appended, earlier turns of the conversation are collected most recent
+      first and reversed once when the messages are read, so building is linear in the history length.
       Attributes:
-          message (list): A list of dictionaries representing chat messages.
+          messages (list): A list of dictionaries representing chat messages.
           model (str): The name of the ChatGPT model.
-          token_count (int): The total number of tokens in the conversation.
+          token_length (int): The total number of tokens in the conversation.
       Methods:
           __init__(self, system_content: str, chatgpt_model: str): Initializes the MessageBuilder instance.
-          append_message(self, role: str, content: str, index: int = 1): Appends a new message to the conversation.
+          append_message(self, role: str, content: str): Appends a new message to the conversation.
+          append_history_message(self, role: str, content: str, token_count: int): Adds an earlier message, most recent first.
+          count_tokens(self, role: str, content: str): Number of tokens a message would add.
       """
 
     def __init__(self, system_content: str, chatgpt_model: str):
-        self.messages = [{'role': 'system', 'content': system_content}]
         self.model = chatgpt_model
+        self._messages = [{'role': 'system', 'content': system_content}]
+        self._history = []
         self.token_length = num_tokens_from_messages(
-            self.messages[-1], self.model)
+            self._messages[-1], self.model)
 
-    def append_message(self, role: str, content: str, index: int = 1):
-        self.messages.insert(index, {'role': role, 'content': content})
-        self.token_length += num_tokens_from_messages(
-            self.messages[index], self.model)
\ No newline at end of file
+    @property
+    def messages(self) -> list[dict[str, str]]:
+        """The conversation, with the earlier turns placed in order before the last appended message"""
+        if not self._history:
+            return list(self._messages)
+        return self._messages[:-1] + self._history[::-1] + self._messages[-1:]
+
+    def count_tokens(self, role: str, content: str) -> int:
+        return num_tokens_from_messages({'role': role, 'content': content}, self.model)
+
+    def append_message(self, role: str, content: str):
+        self._messages.append({'role': role, 'content': content})
+        self.token_length += self.count_tokens(role, content)
+
+    def append_history_message(self, role: str, content: str, token_count: int = None):
+        """token_count may be given when the size of the message is already known (or bounded)"""
+        self._history.append({'role': role, 'content': content})
+        self.token_length += token_count if token_count is not None else self.count_tokens(role, content)
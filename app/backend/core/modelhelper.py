@@ -1,4 +1,8 @@
+import hashlib
+
 import tiktoken
+from shared_code import tokenizer
+from shared_code.ttl_cache import TTLCache
 
 #Values from https://platform.openai.com/docs/models/gpt-3-5
 
@@ -39,13 +43,37 @@ def num_tokens_from_messages(message: dict[str, str], model: str) -> int:
         num_tokens_from_messages(message, model)
         output: 11
     """
-    encoding = tiktoken.encoding_for_model(get_oai_chatmodel_tiktok(model))
     num_tokens = 2  # For "role" and "content" keys
     for key, value in message.items():
-        num_tokens += len(encoding.encode(value))
+        num_tokens += num_tokens_from_string(value, model)
     return num_tokens
 
 
+# Token counts by digest of the text and model. The texts are not kept, the prompts carrying
+# the sources can be tens of KB each and are rarely counted twice
+TOKEN_COUNTS = TTLCache(4096, 24 * 3600)
+
+
+def num_tokens_from_string(text: str, model: str) -> int:
+    """
+    Number of tokens of a string for a model. Memoized, so the messages of a conversation
+    are only encoded once across its turns.
+    """
+    key = (hashlib.blake2b(text.encode(), digest_size=16).digest(), model)
+    count = TOKEN_COUNTS.get(key)
+    if count is None:
+        count = tokenizer.count(text, get_encoding(model))
+        TOKEN_COUNTS.set(key, count)
+    return count
+
+
+def get_encoding(model: str) -> tiktoken.Encoding:
+    """
+    The tiktoken encoding of an Azure OpenAI model, resolved once per model.
+    """
+    return tokenizer.get_model_encoding(get_oai_chatmodel_tiktok(model))
+
+
 def get_oai_chatmodel_tiktok(aoaimodel: str) -> str:
     message = "Expected Azure OpenAI ChatGPT model name"
     if aoaimodel == "" or aoaimodel is None:
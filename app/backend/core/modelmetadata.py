@@ -0,0 +1,93 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import asyncio
+import json
+import logging
+import os
+from typing import Callable, Optional
+
+
+class ModelMetadata:
+    """Names and versions of the models behind the Azure OpenAI deployments. Resolving them
+    goes through the ARM management API, which is slow on a cold start, so the last values are
+    kept in a file and served right away on the next start while they are refreshed in the
+    background. The file is only trusted for the same service and deployments."""
+
+    def __init__(self, cache_file: str, key: dict, resolve: Callable[[], dict]):
+        self.cache_file = cache_file
+        self.key = key
+        self.resolve = resolve
+        self.values: Optional[dict] = None
+        self.source = None
+        self.error = None
+        self.ready = asyncio.Event()
+        self._refreshing: Optional[asyncio.Task] = None
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.cache_file, encoding="utf-8") as cache:
+                cached = json.load(cache)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logging.warning(f"Unable to read the model metadata cache {self.cache_file}: {str(e)}")
+            return
+        if cached.get("key") == self.key and isinstance(cached.get("values"), dict):
+            self.values = cached["values"]
+            self.source = "cache"
+            self.ready.set()
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_file) or ".", exist_ok=True)
+            # Write to a temporary file and rename it so a crash never leaves a truncated cache
+            temp_file = f"{self.cache_file}.{os.getpid()}.tmp"
+            with open(temp_file, "w", encoding="utf-8") as cache:
+                json.dump({"key": self.key, "values": self.values}, cache)
+            os.replace(temp_file, self.cache_file)
+        except OSError as e:
+            logging.warning(f"Unable to write the model metadata cache {self.cache_file}: {str(e)}")
+
+    def get(self, field: str) -> str:
+        """Returns a resolved value, empty while the metadata is not available"""
+        return (self.values or {}).get(field, "")
+
+    def refresh(self) -> asyncio.Task:
+        """Resolves the metadata from the management API in a worker thread, concurrent calls
+        share the same resolution. The task returns True when it replaced values that were
+        already served, such as the cached ones, with different ones"""
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.create_task(self._refresh())
+        return self._refreshing
+
+    async def _refresh(self) -> bool:
+        try:
+            values = await asyncio.to_thread(self.resolve)
+        except Exception as e:
+            self.error = str(e)
+            logging.error(f"Unable to resolve the model metadata: {str(e)}")
+            return False
+        replaced = self.values is not None and values != self.values
+        changed = values != self.values
+        self.values = values
+        self.source = "management_api"
+        self.error = None
+        self.ready.set()
+        if changed:
+            await asyncio.to_thread(self._save)
+        return replaced
+
+    async def wait(self):
+        """Waits until the metadata is available, resolving it again if the last attempt failed"""
+        if self.ready.is_set():
+            return
+        # A cancelled request must not cancel the resolution other requests are waiting for
+        await asyncio.shield(self.refresh())
+        if not self.ready.is_set():
+            raise RuntimeError(f"Model metadata is not available: {self.error}")
+
+    def stats(self) -> dict:
+        """Returns where the metadata came from and the last resolution error"""
+        return {"ready": self.ready.is_set(), "source": self.source, "error": self.error}
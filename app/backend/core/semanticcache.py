@@ -0,0 +1,153 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+import numpy as np
+
+
+def cosine_similarity(a: list[float], b: list[float]) -> float:
+    """Returns the cosine similarity of two embedding vectors"""
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class CachedAnswer:
+    """A final answer stored in the semantic cache together with what is needed to replay it"""
+
+    def __init__(self, scope: Hashable, query_vector: list[float], answer: str, thoughts: str,
+                 citation_lookup: dict[str, Any], source_files: dict[str, str], cited_chunks: dict[str, str]):
+        self.scope = scope
+        self.query_vector = query_vector
+        self.answer = answer
+        self.thoughts = thoughts
+        # citation lookup without SAS tokens, source_files maps each "FileX" moniker to the unsigned source file
+        self.citation_lookup = citation_lookup
+        self.source_files = source_files
+        # index document id -> processed_datetime of every chunk cited in the answer
+        self.cited_chunks = cited_chunks
+        self.expires_at = 0.0
+
+
+class _ScopeEntries:
+    """The answers of one scope, with their unit query vectors stacked in a matrix so a lookup
+    compares the query with all of them in one vectorized product"""
+
+    def __init__(self):
+        self.entries: dict[int, CachedAnswer] = {}
+        self.matrix = None
+        self.keys: list[int] = []
+
+    def vectors(self) -> tuple[np.ndarray, list[int]]:
+        # Rebuilt on the first lookup after the answers of the scope changed
+        if self.matrix is None:
+            self.keys = list(self.entries)
+            self.matrix = np.stack([_unit(self.entries[key].query_vector) for key in self.keys])
+        return self.matrix, self.keys
+
+
+def _unit(vector: list[float]) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticCache:
+    """Bounded, in-process cache of final answers looked up by the similarity of the search query embedding.
+    Answers are only shared between requests with the same scope (filters, persona, response length...),
+    so they are bucketed by scope and a lookup only compares the query with the answers of its scope."""
+
+    def __init__(self, max_size: int, ttl_seconds: float, similarity_threshold: float):
+        self.max_size = int(max_size)
+        self.ttl_seconds = float(ttl_seconds)
+        self.similarity_threshold = float(similarity_threshold)
+        # Least recently used first, across all scopes
+        self._entries = OrderedDict()
+        self._scopes: dict[Hashable, _ScopeEntries] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def lookup(self, scope: Hashable, query_vector: list[float]) -> CachedAnswer:
+        """Returns the most similar live answer in the scope above the similarity threshold, or None"""
+        now = time.monotonic()
+        query = _unit(query_vector)
+        with self._lock:
+            bucket = self._scopes.get(scope)
+            if bucket is not None:
+                for key, entry in list(bucket.entries.items()):
+                    if entry.expires_at < now:
+                        self._remove(key)
+            bucket = self._scopes.get(scope)
+            best_entry = None
+            if bucket is not None:
+                matrix, keys = bucket.vectors()
+                similarities = matrix @ query
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.similarity_threshold:
+                    best_entry = bucket.entries[keys[best]]
+            if best_entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(id(best_entry))
+            self.hits += 1
+            return best_entry
+
+    def store(self, entry: CachedAnswer) -> None:
+        """Stores an answer, evicting the least recently used answers when the cache is full"""
+        if self.max_size <= 0:
+            return
+        entry.expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._entries[id(entry)] = entry
+            bucket = self._scopes.setdefault(entry.scope, _ScopeEntries())
+            bucket.entries[id(entry)] = entry
+            bucket.matrix = None
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: int) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        bucket = self._scopes[entry.scope]
+        del bucket.entries[key]
+        bucket.matrix = None
+        if not bucket.entries:
+            del self._scopes[entry.scope]
+        return True
+
+    def invalidate(self, entry: CachedAnswer) -> None:
+        """Removes an answer whose cited chunks are no longer current"""
+        with self._lock:
+            if self._remove(id(entry)):
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        """Removes all answers from the cache"""
+        with self._lock:
+            self._entries.clear()
+            self._scopes.clear()
+
+    def stats(self) -> dict:
+        """Returns the size and hit/miss counters of the cache"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "similarity_threshold": self.similarity_threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,11 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import os
+import sys
+
+# The backend modules are imported the way app.py imports them, shared_code from the functions
+# when it has not been copied into the backend by the build
+BACKEND = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, BACKEND)
+sys.path.append(os.path.join(BACKEND, "..", "..", "functions"))
@@ -0,0 +1,43 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import codecs
+import io
+
+import pytest
+
+from core.csvingest import CsvTooLarge, detect_encoding, read_csv_upload
+
+
+@pytest.mark.parametrize("bom, encoding", [
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+])
+def test_detect_encoding_from_byte_order_mark(bom, encoding):
+    assert detect_encoding(bom + "a,b\n".encode(encoding)) == encoding
+
+
+def test_detect_encoding_of_utf8():
+    assert detect_encoding(b"name,city\n") == "utf-8"
+    assert detect_encoding("name,city\nZoë,Zürich\n".encode("utf-8")) == "utf-8"
+    # The sample ends in the middle of a multi-byte character
+    assert detect_encoding("Zürich".encode("utf-8")[:2]) == "utf-8"
+
+
+def test_detect_encoding_falls_back_for_invalid_utf8():
+    assert detect_encoding(b"name\ncaf\xe9\n") == "cp1252"
+
+
+def test_read_csv_upload():
+    df = read_csv_upload(io.BytesIO("name,stock\ncafé,3\nthé,4\n".encode("cp1252")), 1024)
+    assert df["name"].tolist() == ["café", "thé"]
+    assert df["name"].dtype == object
+    assert df["stock"].sum() == 7
+
+
+def test_read_csv_upload_rejects_large_files():
+    with pytest.raises(CsvTooLarge):
+        read_csv_upload(io.BytesIO(b"a\n" * 100), 10)
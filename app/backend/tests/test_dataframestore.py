@@ -0,0 +1,59 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import os
+
+import pandas as pd
+import pytest
+
+from core.dataframestore import DataFrameStore, downcast
+
+
+def test_downcast_keeps_numeric_dtypes():
+    df = downcast(pd.DataFrame({"a": [5, 6, 7], "b": [10, 20, 30], "c": [100, 120, 127], "f": [0.1, 0.2, 0.3]}))
+    assert list(df.dtypes) == ["int64", "int64", "int64", "float64"]
+    # Arithmetic on the stored frame must not wrap around
+    assert (df["a"] - df["b"]).tolist() == [-5, -14, -23]
+    assert (df["c"] + df["c"]).tolist() == [200, 240, 254]
+
+
+def test_downcast_stores_repeated_text_as_categoricals():
+    df = pd.DataFrame({"location": ["north", "south"] * 50, "id": [f"part {i}" for i in range(100)]})
+    result = downcast(df)
+    assert isinstance(result["location"].dtype, pd.CategoricalDtype)
+    assert result["id"].dtype == object
+    assert df["location"].dtype == object
+    pd.testing.assert_frame_equal(result.astype(object), df.astype(object))
+
+
+@pytest.fixture
+def store(tmp_path):
+    # Room for a single frame in memory, the others are spilled
+    return DataFrameStore(str(tmp_path), 10**9, 1, 3600)
+
+
+def test_frames_are_spilled_and_read_back(store, tmp_path):
+    first = store.put(pd.DataFrame({"x": range(1000)}))
+    second = store.put(pd.DataFrame({"y": range(1000)}))
+    assert store.info(first.session_id)["in_memory"] is False
+    assert len(os.listdir(tmp_path)) == 1
+    assert store.get(first.session_id)["x"].sum() == sum(range(1000))
+    assert store.get(second.session_id)["y"].sum() == sum(range(1000))
+    assert store.stats()["reloads"] == 2
+
+
+def test_session_ids_are_not_used_as_file_names(store, tmp_path):
+    session = store.put(pd.DataFrame({"x": range(10)}), "../../outside")
+    assert session.session_id != "../../outside"
+    store.put(pd.DataFrame({"y": range(10)}))
+    assert all(name.endswith(".parquet") and "/" not in name for name in os.listdir(tmp_path))
+    assert store.put(pd.DataFrame({"z": range(10)}), session.session_id).session_id == session.session_id
+
+
+def test_deleted_sessions_are_gone(store, tmp_path):
+    session = store.put(pd.DataFrame({"x": range(10)}))
+    store.put(pd.DataFrame({"y": range(10)}))
+    store.delete(session.session_id)
+    with pytest.raises(KeyError):
+        store.get(session.session_id)
+    assert os.listdir(tmp_path) == []
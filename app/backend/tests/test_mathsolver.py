@@ -0,0 +1,44 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import pytest
+
+from approaches import mathsolver
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("What is 17% of 2340?", "17% of 2340 is 1989/5 ≈ 397.8."),
+    ("What is 50%?", "The answer is 1/2 ≈ 0.5."),
+    ("50% * 80", "The answer is 40."),
+    ("What is (125 * 4) / 8 + 3^4?", "The answer is 287/2 ≈ 143.5."),
+    ("Solve 2x + 3 = 11", "x = 4"),
+    ("Integrate x^2 from 0 to 3", "The integral of x^2 from x = 0 to 3 is 9."),
+])
+def test_answers(question, expected):
+    assert mathsolver.answer(question) == expected
+
+
+@pytest.mark.parametrize("question", ["10 % 3", "10%3", "what is 7 % 2?", "20% 5"])
+def test_modulo_is_left_to_the_agent(question):
+    assert mathsolver.answer(question) is None
+
+
+def test_factorial():
+    assert mathsolver.answer("5!") == "The answer is 120."
+    assert mathsolver.answer("What is 5!?") == "The answer is 120."
+
+
+@pytest.mark.parametrize("question", ["9!!", "what is 5!!", "3!!!"])
+def test_double_factorial_is_left_to_the_agent(question):
+    assert mathsolver.answer(question) is None
+
+
+@pytest.mark.parametrize("question", ["(10^999)^999", "((2^1000)^1000)^1000", "999!^999", "(2^1000)^14", "1001!"])
+def test_values_over_the_bit_budget_are_not_computed(question):
+    with pytest.raises(mathsolver.Unsupported):
+        mathsolver.parse(mathsolver.normalize(question))
+
+
+@pytest.mark.parametrize("question", ["1000!", "(2^1000)^13", "100!^2", "(3/2)^1000"])
+def test_values_within_the_bit_budget_are_computed(question):
+    assert mathsolver.answer(question).startswith("The answer is ")
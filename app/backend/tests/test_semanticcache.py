@@ -0,0 +1,52 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+from core.semanticcache import CachedAnswer, SemanticCache
+
+
+def answer(scope, vector, text="answer"):
+    return CachedAnswer(scope, vector, text, "thoughts", {}, {}, {})
+
+
+def test_lookup_is_limited_to_the_scope():
+    cache = SemanticCache(10, 60, 0.9)
+    cache.store(answer("finance", [1.0, 0.0], "finance answer"))
+    cache.store(answer("hr", [1.0, 0.0], "hr answer"))
+    assert cache.lookup("finance", [1.0, 0.01]).answer == "finance answer"
+    assert cache.lookup("hr", [1.0, 0.01]).answer == "hr answer"
+    assert cache.lookup("legal", [1.0, 0.0]) is None
+
+
+def test_most_similar_answer_above_the_threshold():
+    cache = SemanticCache(10, 60, 0.9)
+    cache.store(answer("scope", [1.0, 0.0, 0.0], "x"))
+    cache.store(answer("scope", [0.0, 1.0, 0.0], "y"))
+    assert cache.lookup("scope", [0.1, 2.0, 0.0]).answer == "y"
+    assert cache.lookup("scope", [0.0, 0.0, 1.0]) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_eviction_and_invalidation_update_the_scope():
+    cache = SemanticCache(2, 60, 0.9)
+    first = answer("scope", [1.0, 0.0], "first")
+    cache.store(first)
+    cache.store(answer("other", [0.0, 1.0]))
+    # The lookup builds the matrix of the scope, the eviction below must drop it
+    assert cache.lookup("scope", [1.0, 0.0]) is first
+    cache.store(answer("scope", [0.0, 1.0], "second"))
+    cache.store(answer("scope", [0.7, 0.7], "third"))
+    assert cache.evictions == 2
+    assert cache.lookup("other", [0.0, 1.0]) is None
+    assert cache.lookup("scope", [1.0, 0.0]) is None
+    third = cache.lookup("scope", [0.7, 0.7])
+    cache.invalidate(third)
+    assert cache.lookup("scope", [0.7, 0.7]) is None
+    assert cache.lookup("scope", [0.0, 1.0]).answer == "second"
+    assert cache.invalidations == 1
+
+
+def test_expired_answers_are_not_returned():
+    cache = SemanticCache(10, 0, 0.9)
+    cache.store(answer("scope", [1.0, 0.0]))
+    assert cache.lookup("scope", [1.0, 0.0]) is None
+    assert cache.stats()["size"] == 0
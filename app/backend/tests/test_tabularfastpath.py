@@ -0,0 +1,53 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import pandas as pd
+import pytest
+
+from approaches import tabularfastpath
+from core.dataframeprofile import format_profile, profile_frame
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({"Location": ["north", "south", "north", "east"],
+                         "Stock Level": [10, 20, 30, 40],
+                         "stock_level_target": [15, 15, 35, 35],
+                         "Name": ["bolt", "nut", "screw", "washer"]})
+
+
+def test_shape(df):
+    assert tabularfastpath.answer("How many rows?", df) == "There are 4 rows."
+    assert tabularfastpath.answer("how many columns", df) == "There are 4 columns."
+
+
+def test_aggregate(df):
+    assert tabularfastpath.answer("What is the total stock level?", df) == "The sum of `Stock Level` is 100."
+    assert tabularfastpath.answer("average stock-level", df) == "The mean of `Stock Level` is 25.0."
+    assert tabularfastpath.answer("How many distinct locations?", df) == "There are 3 distinct values of `Location`."
+
+
+def test_group_by(df):
+    pytest.importorskip("tabulate")
+    result = tabularfastpath.answer("sum of stock level by location", df)
+    assert "north" in result and "40" in result
+    assert "south" in result and "20" in result
+
+
+def test_questions_left_to_the_agent(df):
+    # Unknown column, non-numeric column, unrelated question
+    assert tabularfastpath.answer("total revenue", df) is None
+    assert tabularfastpath.answer("average name", df) is None
+    assert tabularfastpath.answer("Which location should we restock first?", df) is None
+    # Two columns with the same normalized name
+    ambiguous = pd.DataFrame({"Stock Level": [1], "stock_level": [2]})
+    assert tabularfastpath.answer("total stock level", ambiguous) is None
+
+
+def test_profile(df):
+    profile = profile_frame(df)
+    assert profile["rows"] == 4
+    columns = {entry["name"]: entry for entry in profile["columns"]}
+    assert columns["Stock Level"]["stats"]["max"] == 40
+    assert columns["Location"]["top_values"][0] == ["north", 2]
+    assert "`Location` (object): 0 missing, 3 distinct" in format_profile(profile)
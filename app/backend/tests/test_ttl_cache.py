@@ -0,0 +1,66 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import time
+
+from shared_code.ttl_cache import TTLCache
+
+
+def test_get_set_and_counters():
+    cache = TTLCache(10, 60)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.get("b", "default") == "default"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 2, 1)
+
+
+def test_least_recently_used_is_evicted():
+    cache = TTLCache(2, 60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_items_expire():
+    cache = TTLCache(10, 0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.expirations == 1
+    assert len(cache) == 0
+
+
+def test_weight_is_bounded():
+    cache = TTLCache(10, 60, max_weight=10, weigher=len)
+    cache.set("a", "x" * 6)
+    cache.set("b", "x" * 6)
+    assert cache.get("a") is None
+    assert cache.weight == 6
+    # Items heavier than the whole cache are not stored
+    cache.set("c", "x" * 11)
+    assert cache.get("c") is None
+    cache.set("b", "x" * 2)
+    assert cache.weight == 2
+
+
+def test_pop_and_clear():
+    cache = TTLCache(10, 60, max_weight=100, weigher=len)
+    cache.set("a", "xyz")
+    assert cache.pop("a") == "xyz"
+    assert cache.pop("a", "gone") == "gone"
+    cache.set("b", "xyz")
+    cache.clear()
+    assert len(cache) == 0 and cache.weight == 0
+
+
+def test_zero_size_disables_the_cache():
+    cache = TTLCache(0, 60)
+    cache.set("a", 1)
+    assert cache.get("a") is None
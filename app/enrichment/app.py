@@ -27,6 +27,7 @@ from tenacity import retry, wait_random_exponential, stop_after_attempt
 from sentence_transformers import SentenceTransformer
 from shared_code.utilities_helper import UtilitiesHelper
 from shared_code.status_log import State, StatusClassification, StatusLog
+from shared_code.ttl_cache import TTLCache
 from azure.storage.blob import BlobServiceClient
 from urllib.parse import unquote
 
@@ -58,7 +59,9 @@ ENV = {
     "TARGET_EMBEDDINGS_MODEL": None,
     "EMBEDDING_VECTOR_SIZE": None,
     "AZURE_SEARCH_SERVICE_ENDPOINT": None,
-    "AZURE_BLOB_STORAGE_ENDPOINT": None
+    "AZURE_BLOB_STORAGE_ENDPOINT": None,
+    "EMBEDDING_CACHE_SIZE": 0, # 0 disables caching of /embed responses
+    "EMBEDDING_CACHE_TTL_SECONDS": 3600
 }
 
 for key, value in ENV.items():
@@ -123,6 +126,9 @@ utilities_helper = UtilitiesHelper(
 )
 
 statusLog = StatusLog(ENV["COSMOSDB_URL"], ENV["COSMOSDB_KEY"], ENV["COSMOSDB_LOG_DATABASE_NAME"], ENV["COSMOSDB_LOG_CONTAINER_NAME"])
+
+# Cache of /embed responses for repeated query texts, chunks embedded by the queue poller bypass it
+embedding_cache = TTLCache(int(ENV["EMBEDDING_CACHE_SIZE"]), float(ENV["EMBEDDING_CACHE_TTL_SECONDS"]))
 # === API Setup ===
 
 start_time = datetime.now()
@@ -186,6 +192,19 @@ def health():
     return output
 
 
+@app.get("/cache", tags=["health"])
+def cache_stats():
+    """Returns the size and hit/miss counters of the embedding cache and the SAS token cache
+
+    Returns:
+        dict: The cache statistics
+    """
+    return {
+        "embedding_cache": embedding_cache.stats(),
+        "sas_tokens": utilities_helper.sas_provider.stats()
+    }
+
+
 # Models and Embeddings
 @app.get("/models", response_model=ModelListResponse, tags=["models"])
 def get_models():
@@ -224,6 +243,25 @@ def embed_texts(model: str, texts: List[str]):
         EmbeddingResponse: The embeddings of the texts
     """
 
+    cache_key = (model, tuple(texts))
+    output = embedding_cache.get(cache_key)
+    if output is None:
+        output = encode_texts(model, texts)
+        if "data" in output:
+            embedding_cache.set(cache_key, output)
+    return output
+
+
+def encode_texts(model: str, texts: List[str]):
+    """Embeds a list of texts using a given model, without going through the embedding cache
+    Args:
+        model (str): The name of the model
+        texts (List[str]): A list of texts
+
+    Returns:
+        dict: The embeddings of the texts
+    """
+
     output = {}
     if model not in models:
         return {"message": f"Model {model} not found"}
@@ -262,6 +300,9 @@ def index_sections(chunks):
     results = search_client.upload_documents(documents=chunks)
     succeeded = sum([1 for r in results if r.succeeded])
     log.debug(f"\tIndexed {len(results)} chunks, {succeeded} succeeded")
+    if succeeded > 0:
+        # invalidate search results cached by the webapp
+        statusLog.bump_index_generation()
 
 @app.on_event("startup") 
 def startup_event():
@@ -380,7 +421,7 @@ def poll_queue() -> None:
                     embedding_data = chunk_dict['contentVector']
                 except KeyError:      
                     # create embedding
-                    embedding = embed_texts(target_embeddings_model, [text])
+                    embedding = encode_texts(target_embeddings_model, [text])
                     embedding_data = embedding['data']      
 
                 # Prepare the index schema based representation of the chunk with the embedding
@@ -397,6 +438,7 @@ def poll_queue() -> None:
                 index_chunk['pages'] = chunk_dict["pages"]
                 index_chunk['translated_title'] = chunk_dict["translated_title"]
                 index_chunk['content'] = text
+                index_chunk['token_count'] = chunk_dict.get("token_count", 0)
                 index_chunk['contentVector'] = embedding_data
                 index_chunk['entities'] = chunk_dict["entities"]
                 index_chunk['key_phrases'] = chunk_dict["key_phrases"]
@@ -5,6 +5,7 @@ import { ChatResponse,
     ChatRequest, 
     BlobClientUrlResponse, 
     AllFilesUploadStatus, 
+    StatusUpdates, 
     GetUploadStatusRequest, 
     GetInfoResponse, 
     ActiveCitation, 
@@ -17,6 +18,7 @@ import { ChatResponse,
     ResubmitItemRequest,
     GetFeatureFlagsResponse,
     getMaxCSVFileSizeType,
+    TdSession,
     } from "./models";
 
 export async function chatApi(options: ChatRequest, signal: AbortSignal): Promise<Response> {
@@ -90,7 +92,10 @@ export async function getAllUploadStatus(options: GetUploadStatusRequest): Promi
             timeframe: options.timeframe,
             state: options.state as string,
             folder: options.folder as string,
-            tag: options.tag as string
+            tag: options.tag as string,
+            concise: options.concise,
+            page_size: options.page_size,
+            continuation_token: options.continuation_token
             })
         });
     
@@ -98,10 +103,32 @@ export async function getAllUploadStatus(options: GetUploadStatusRequest): Promi
     if (response.status > 299 || !response.ok) {
         throw Error(parsedResponse.error || "Unknown error");
     }
-    const results: AllFilesUploadStatus = {statuses: parsedResponse};
+    // A page of statuses when page_size is set, otherwise the whole list
+    if (Array.isArray(parsedResponse)) {
+        return {statuses: parsedResponse};
+    }
+    const results: AllFilesUploadStatus = {statuses: parsedResponse.statuses, continuation_token: parsedResponse.continuation_token};
     return results;
 }
 
+export async function getFileStatus(path: string): Promise<StatusUpdates[]> {
+    const response = await fetch("/getfilestatus", {
+        method: "POST",
+        headers: {
+            "Content-Type": "application/json"
+        },
+        body: JSON.stringify({
+            path: path
+            })
+        });
+
+    const parsedResponse: any = await response.json();
+    if (response.status > 299 || !response.ok) {
+        throw Error(parsedResponse.error || "Unknown error");
+    }
+    return parsedResponse;
+}
+
 export async function deleteItem(options: DeleteItemRequest): Promise<boolean> {
     try {
         const response = await fetch("/deleteItems", {
@@ -153,13 +180,9 @@ export async function resubmitItem(options: ResubmitItemRequest): Promise<boolea
 
 
 export async function getFolders(): Promise<string[]> {
+    // GET so the browser cache revalidates the list with its ETag
     const response = await fetch("/getfolders", {
-        method: "POST",
-        headers: {
-            "Content-Type": "application/json"
-        },
-        body: JSON.stringify({
-            })
+        method: "GET"
         });
     
     const parsedResponse: any = await response.json();
@@ -224,23 +247,24 @@ export function streamData(question: string): EventSource {
 }
 
 
-export async function streamTdData(question: string, file: File): Promise<EventSource> {
-    let lastError;
-    const formData = new FormData();
-    formData.append('csv', file);
-
-    const response = await fetch('/posttd', {
-        method: 'POST',
-        body: formData,
-    });
-
-    const parsedResponse: String = await response.text();
-    if (response.status > 299 || !response.ok) {
-        throw Error("Unknown error");
+// The backend keeps the uploaded CSV by session, upload it again only when the session has expired
+async function ensureTdSession(file: File, sessionId: string | null): Promise<string> {
+    if (sessionId) {
+        const response = await fetch(`/tdsession?session_id=${encodeURIComponent(sessionId)}`, {
+            method: "GET"
+        });
+        if (response.ok) {
+            return sessionId;
+        }
     }
-    
+    const session = await postTd(file, sessionId);
+    return session.session_id;
+}
+
+export async function streamTdData(question: string, file: File, sessionId: string | null): Promise<EventSource> {
+    const activeSessionId = await ensureTdSession(file, sessionId);
     const encodedQuestion = encodeURIComponent(question);
-    const eventSource = new EventSource(`/tdstream?question=${encodedQuestion}`);
+    const eventSource = new EventSource(`/tdstream?question=${encodedQuestion}&session_id=${encodeURIComponent(activeSessionId)}`);
 
     return eventSource;
 }
@@ -261,32 +285,34 @@ export async function refresh(): Promise<String[]> {
     return parsedResponse;
 }
 
-export async function getTempImages(): Promise<string[]> {
-    const response = await fetch(`/getTempImages`, {
+export async function getCharts(sessionId: string): Promise<string[]> {
+    const response = await fetch(`/getCharts?session_id=${encodeURIComponent(sessionId)}`, {
         method: "GET",
         headers: {
             "Content-Type": "application/json"
         }
     });
     
-    const parsedResponse: { images: string[] } = await response.json();
+    const parsedResponse: { charts: string[] } = await response.json();
     if (response.status > 299 || !response.ok) {
         throw Error("Unknown error");
     }
-    const imgs = parsedResponse.images;
-    return imgs;
+    return parsedResponse.charts;
 }
 
-export async function postTd(file: File): Promise<String> {
+export async function postTd(file: File, sessionId: string | null = null): Promise<TdSession> {
     const formData = new FormData();
     formData.append('csv', file);
+    if (sessionId) {
+        formData.append('session_id', sessionId);
+    }
 
     const response = await fetch('/posttd', {
         method: 'POST',
         body: formData,
     });
 
-    const parsedResponse: String = await response.text();
+    const parsedResponse: TdSession = await response.json();
     if (response.status > 299 || !response.ok) {
         throw Error("Unknown error");
     }
@@ -294,24 +320,13 @@ export async function postTd(file: File): Promise<String> {
     return parsedResponse;
 }
 
-export async function processCsvAgentResponse(question: string, file: File, retries: number = 3): Promise<String> {
+export async function processCsvAgentResponse(question: string, file: File, sessionId: string | null, retries: number = 3): Promise<String> {
     let lastError;
 
-    const formData = new FormData();
-    formData.append('csv', file);
-
-    const response = await fetch('/posttd', {
-        method: 'POST',
-        body: formData,
-    });
-
-    const parsedResponse: String = await response.text();
-    if (response.status > 299 || !response.ok) {
-        throw Error("Unknown error");
-    }
+    const activeSessionId = await ensureTdSession(file, sessionId);
     for (let i = 0; i < retries; i++) {
         try {
-            const response = await fetch(`/process_td_agent_response?question=${encodeURIComponent(question)}`, {
+            const response = await fetch(`/process_td_agent_response?question=${encodeURIComponent(question)}&session_id=${encodeURIComponent(activeSessionId)}`, {
                 method: "GET",
                 headers: {
                     "Content-Type": "application/json"
@@ -419,22 +434,66 @@ export async function getMaxCSVFileSize(): Promise<getMaxCSVFileSizeType> {
     return parsedResponse;
 }
 
+// Citations of the latest answers, requested in one batch as soon as the answer arrives
+const CITATION_OBJ_CACHE_SIZE = 200;
+const citationObjCache = new Map<string, Promise<ActiveCitation>>();
+
 export async function getCitationObj(citation: string): Promise<ActiveCitation> {
-    const response = await fetch(`/getcitation`, {
+    const cached = citationObjCache.get(citation);
+    if (cached) {
+        try {
+            return await cached;
+        } catch (e) {
+            citationObjCache.delete(citation);
+        }
+    }
+    // GET so that the browser can reuse the response, the backend sends an ETag
+    const response = await fetch(`/getcitation?citation=${encodeURIComponent(citation)}`, {
+        method: "GET"
+    });
+    const parsedResponse: ActiveCitation = await response.json();
+    if (response.status > 299 || !response.ok) {
+        console.log(response);
+        throw Error(parsedResponse.error || "Unknown error");
+    }
+    return parsedResponse;
+}
+
+export function prefetchCitationObjs(citations: string[]): void {
+    const missing = citations.filter(citation => !citationObjCache.has(citation));
+    if (missing.length == 0) {
+        return;
+    }
+    if (citationObjCache.size + missing.length > CITATION_OBJ_CACHE_SIZE) {
+        citationObjCache.clear();
+    }
+    const batch = fetch("/getcitations", {
         method: "POST",
         headers: {
             "Content-Type": "application/json"
         },
         body: JSON.stringify({
-            citation: citation
+            citations: missing
         })
+    }).then(async response => {
+        const parsedResponse: any = await response.json();
+        if (response.status > 299 || !response.ok) {
+            throw Error(parsedResponse.error || "Unknown error");
+        }
+        return parsedResponse;
     });
-    const parsedResponse: ActiveCitation = await response.json();
-    if (response.status > 299 || !response.ok) {
-        console.log(response);
-        throw Error(parsedResponse.error || "Unknown error");
+    for (const citation of missing) {
+        const citationObj = batch.then(results => {
+            const result = results[citation];
+            if (!result || result.error) {
+                throw Error(result?.error || "Unknown error");
+            }
+            return result as ActiveCitation;
+        });
+        // A failed prefetch is forgotten, getCitationObj then asks for the citation on its own
+        citationObj.catch(() => citationObjCache.delete(citation));
+        citationObjCache.set(citation, citationObj);
     }
-    return parsedResponse;
 }
 
 export async function getApplicationTitle(): Promise<ApplicationTitle> {
@@ -80,7 +80,8 @@ export type FileUploadBasicStatus = {
     start_timestamp: string;
     state_description: string;
     state_timestamp: string;
-    status_updates: StatusUpdates[];
+    // Left out when the statuses are fetched in concise mode
+    status_updates?: StatusUpdates[];
     tags: string;
 }
 
@@ -92,6 +93,8 @@ export type StatusUpdates = {
 
 export type AllFilesUploadStatus = {
     statuses: FileUploadBasicStatus[];
+    // Token of the next page, null on the last page
+    continuation_token?: string | null;
 }
 
 export type AllFolders = {
@@ -102,7 +105,10 @@ export type GetUploadStatusRequest = {
     timeframe: number;
     state: FileState;
     folder: string;
-    tag: string
+    tag: string;
+    concise?: boolean;
+    page_size?: number;
+    continuation_token?: string | null;
 }
 
 export type DeleteItemRequest = {
@@ -165,6 +171,14 @@ export type getMaxCSVFileSizeType = {
     error?: string;
 };
 
+export type TdSession = {
+    session_id: string;
+    rows: number;
+    columns: number;
+    memory_bytes: number;
+    in_memory: boolean;
+};
+
 // These keys need to match case with the defined Enum in the 
 // shared code (functions/shared_code/status_log.py)
 export const enum StatusLogClassification {
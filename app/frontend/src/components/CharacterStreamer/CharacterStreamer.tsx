@@ -1,6 +1,6 @@
 import React, { useState, useEffect, useRef } from 'react';
 import ReactMarkdown from 'react-markdown';
-import { Approaches, ChatResponse } from '../../api';
+import { Approaches, ChatResponse, getCitationFilePath, prefetchCitationObjs } from '../../api';
 import readNDJSONStream from "ndjson-readablestream";
 import rehypeRaw from 'rehype-raw';
 import rehypeSanitize from 'rehype-sanitize';
@@ -32,6 +32,8 @@ const CharacterStreamer = ({ eventSource, nonEventString, onStreamingComplete, c
                     work_citation_lookup: event["work_citation_lookup"],
                     web_citation_lookup: event["web_citation_lookup"]
                 }
+                // Fetch the cited chunks while the answer streams so that opening a citation is instant
+                prefetchCitationObjs(Object.values(event["work_citation_lookup"] ?? {}).map((entry: any) => getCitationFilePath(entry.citation)));
             }
             else if (event["content"]) {
                 response.answer += event["content"]
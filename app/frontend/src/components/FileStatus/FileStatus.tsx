@@ -1,7 +1,7 @@
 // Copyright (c) Microsoft Corporation.
 // Licensed under the MIT license.
 
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import { Dropdown, DropdownMenuItemType, IDropdownOption, IDropdownStyles } from '@fluentui/react/lib/Dropdown';
 import { Stack } from "@fluentui/react";
 import { DocumentsDetailList, IDocument } from "./DocumentsDetailList";
@@ -42,6 +42,8 @@ const dropdownFileStateOptions = [
   ];
 
 
+const STATUS_PAGE_SIZE = 100;
+
 interface Props {
     className?: string;
 }
@@ -56,6 +58,7 @@ export const FileStatus = ({ className }: Props) => {
     const [tagOptions, setTagOptions] = useState<IDropdownOption[]>([]);
     const [files, setFiles] = useState<IDocument[]>();
     const [isLoading, setIsLoading] = useState<boolean>(false);
+    const statusRequestId = useRef<number>(0);
 
     const onTimeSpanChange = (event: React.FormEvent<HTMLDivElement>, item: IDropdownOption<any> | undefined): void => {
         setSelectedTimeFrameItem(item);
@@ -108,12 +111,25 @@ export const FileStatus = ({ className }: Props) => {
             timeframe: timeframe,
             state: selectedFileStateItem?.key == undefined ? FileState.All : selectedFileStateItem?.key as FileState,
             folder: SelectedFolderItem?.key == undefined ? 'Root' : SelectedFolderItem?.key as string,
-            tag: SelectedTagItem?.key == undefined ? 'All' : SelectedTagItem?.key as string
+            tag: SelectedTagItem?.key == undefined ? 'All' : SelectedTagItem?.key as string,
+            // Status updates are fetched per file when its details are opened
+            concise: true,
+            page_size: STATUS_PAGE_SIZE
         }
-        const response = await getAllUploadStatus(request);
-        const list = convertStatusToItems(response.statuses);
-        setIsLoading(false);
-        setFiles(list);
+        // Show the first page as soon as it arrives and append the next ones,
+        // dropping them if a newer request was started in the meantime
+        const requestId = ++statusRequestId.current;
+        let list: IDocument[] = [];
+        do {
+            const response = await getAllUploadStatus(request);
+            if (requestId != statusRequestId.current) {
+                return;
+            }
+            list = list.concat(convertStatusToItems(response.statuses));
+            setIsLoading(false);
+            setFiles(list);
+            request.continuation_token = response.continuation_token;
+        } while (request.continuation_token);
     }
 
     // fetch unique folder names from Azure Blob Storage
@@ -167,7 +183,7 @@ export const FileStatus = ({ className }: Props) => {
                     state_description: fileList[i].state_description,
                     upload_timestamp: fileList[i].start_timestamp,
                     modified_timestamp: fileList[i].state_timestamp,
-                    status_updates: fileList[i].status_updates.map(su => ({
+                    status_updates: (fileList[i].status_updates ?? []).map(su => ({
                         status: su.status,
                         status_timestamp: su.status_timestamp,
                         status_classification: su.status_classification,
@@ -5,7 +5,7 @@ import React, { useEffect, useMemo, useState } from "react";
 import { Text } from "@fluentui/react";
 import { Label } from '@fluentui/react/lib/Label';
 import { Separator } from '@fluentui/react/lib/Separator';
-import { getInfoData, GetInfoResponse } from "../../api";
+import { getInfoData, GetInfoResponse, getFileStatus } from "../../api";
 
 interface Props {
     className?: string;
@@ -17,7 +17,16 @@ interface Stat {
     // include other properties of 'stat' here
 }
 export const StatusContent = ({ item }: Props) => {
-    const data = item.status_updates.reverse();
+    // Statuses listed in concise mode come without their updates, fetch them for this file
+    const [statusUpdates, setStatusUpdates] = useState<Stat[]>(item.status_updates ?? []);
+    useEffect(() => {
+        if (!item.status_updates?.length && item.filePath) {
+            getFileStatus(item.filePath)
+                .then(updates => setStatusUpdates(updates))
+                .catch(e => console.log(e));
+        }
+    }, [item]);
+    const data = [...statusUpdates].reverse();
     // .sort((a: any, b: any) => new Date(b.status_timestamp).getTime() - new Date(a.status_timestamp).getTime());
     const DisplayData=data.map(
         (stat: Stat)=>{
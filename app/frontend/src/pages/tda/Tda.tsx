@@ -10,7 +10,7 @@ import styles from "./file-picker.module.css";
 import { FilesList } from "./files-list";
 import cstyle from "./Tda.module.css" 
 import Papa from "papaparse";
-import {postTd, processCsvAgentResponse, refresh, getTempImages, streamTdData, getMaxCSVFileSize, getMaxCSVFileSizeType } from "../../api";
+import {postTd, processCsvAgentResponse, refresh, getCharts, streamTdData, getMaxCSVFileSize, getMaxCSVFileSizeType } from "../../api";
 import { Button } from 'react-bootstrap';
 import estyles from "../../components/Example/Example.module.css";
 import { Example } from "../../components/Example";
@@ -38,6 +38,7 @@ const Tda = ({folderPath, tags}: Props) => {
   const [renderAnswer, setRenderAnswer] = useState(false);
   const [inputValue, setInputValue] = useState("");
   const [fileu, setFile] = useState<File | null>(null);
+  const [sessionId, setSessionId] = useState<string | null>(null);
   const [images, setImages] = useState<string[]>([]);
   const eventSourceRef = useRef<EventSource | null>(null);
   const [maxCSVFileSize, setMaxCSVFileSize] = useState<getMaxCSVFileSizeType | null>(null);
@@ -60,11 +61,12 @@ interface Props {
 }
 
 const fetchImages = async () => {
-  console.log('fetchImages called');
-  const tempImages = await getTempImages();
-  console.log('tempImages:', tempImages);
-  setImages(tempImages);
-  console.log('images:', images);
+  if (!sessionId) {
+    return;
+  }
+  // The backend keeps the charts of the session in memory and serves each one by id
+  const chartIds = await getCharts(sessionId);
+  setImages(chartIds);
 };
   const setOtherQ = (selectedQuery: string) => {
     if (inputValue != "") {
@@ -84,7 +86,7 @@ const fetchImages = async () => {
           eventSourceRef.current.close();
         }
         if (fileu) {
-          eventSourceRef.current = await streamTdData(query, fileu);
+          eventSourceRef.current = await streamTdData(query, fileu, sessionId);
           console.log('EventSource opened');
           console.log(eventSourceRef.current);
           setStreamKey(prevKey => prevKey + 1);
@@ -112,7 +114,7 @@ const fetchImages = async () => {
         setOutput('');
         setRenderAnswer(true);
         if (fileu) {
-          const result = await processCsvAgentResponse(query, fileu);
+          const result = await processCsvAgentResponse(query, fileu, sessionId);
           setOutput(result.toString());
           fetchImages();
           return;
@@ -196,7 +198,8 @@ const fetchImages = async () => {
                 // You can set it in your state like this:
                 setDataFrame(results.data as object[]);
                 try {               
-                  const response = await postTd(file).then((response) => {
+                  const response = await postTd(file, sessionId).then((response) => {
+                    setSessionId(response.session_id);
                     setProgress(100);
                     setFileUploaded(true);
                     console.log('Response from server:', response);
@@ -213,7 +216,7 @@ const fetchImages = async () => {
       console.error('Error uploading files: ', error);
     }
 
-  }, [files]);
+  }, [files, sessionId]);
 
 // set progress to zero when there are no files
   useEffect(() => {
@@ -402,7 +405,7 @@ const handleCloseEvent = () => {
             images.map((image, index) => (
               <img 
                 key={index} 
-                src={`data:image/png;base64,${image}`} 
+                src={`/charts/${image}`} 
                 alt={`Temp Image ${index}`} 
                 style={{maxWidth: '100%'}} 
               />
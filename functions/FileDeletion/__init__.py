@@ -8,7 +8,7 @@ from itertools import islice
 import azure.functions as func
 from azure.core.credentials import AzureKeyCredential
 from azure.search.documents import SearchClient
-from azure.storage.blob import BlobServiceClient
+from azure.storage.blob import BlobPrefix, BlobServiceClient
 from shared_code.status_log import State, StatusClassification, StatusLog
 
 blob_connection_string = os.environ["BLOB_CONNECTION_STRING"]
@@ -110,10 +110,27 @@ def delete_search_entries(deleted_content_blobs: dict) -> None:
     if len(search_id_list_to_delete) > 0:
         search_client.delete_documents(documents=search_id_list_to_delete)
         logging.debug("Succesfully deleted items from AI Search index.")
+        # invalidate search results cached by the webapp
+        status_log.bump_index_generation()
     else:
         logging.debug("No items to delete from AI Search index.")
 
 
+def remove_empty_folders(blob_service_client: BlobServiceClient, folders: set) -> None:
+    '''Removes the folders that no longer hold any file from the folder catalog
+    read by the webapp folder picker. Files in subfolders are listed as prefixes
+    and do not keep their parent folder in the catalog.'''
+    upload_container_client = blob_service_client.get_container_client(
+        blob_storage_account_upload_container_name)
+    empty_folders = []
+    for folder in folders:
+        items = upload_container_client.walk_blobs(name_starts_with=folder + "/", delimiter="/")
+        if not any(not isinstance(item, BlobPrefix) for item in items):
+            empty_folders.append(folder)
+    if empty_folders:
+        status_log.update_folder_catalog(removed=empty_folders)
+
+
 def main(mytimer: func.TimerRequest) -> None:
     '''This function is a cron job that runs every 10 miuntes, detects when 
     a file has been deleted in the upload container and 
@@ -136,6 +153,7 @@ def main(mytimer: func.TimerRequest) -> None:
 
 
     blob_name = ""
+    deleted_folders = set()
     for blob in deleted_blobs:
         try:
             blob_name = blob
@@ -162,7 +180,9 @@ def main(mytimer: func.TimerRequest) -> None:
                                         'Document chunks, tags, and entries in AI Search have been deleted',
                                         StatusClassification.INFO,
                                         State.DELETED)
-                status_log.save_document(doc_path)                
+                status_log.save_document(doc_path)
+                if os.path.dirname(blob):
+                    deleted_folders.add(os.path.dirname(blob))
             
         except Exception as err:
             logging.info("An exception occured with doc %s: %s", blob_name, str(err))
@@ -175,3 +195,5 @@ def main(mytimer: func.TimerRequest) -> None:
                                     StatusClassification.ERROR,
                                     State.ERROR)
             status_log.save_document(doc_path)
+
+    remove_empty_folders(blob_service_client, deleted_folders)
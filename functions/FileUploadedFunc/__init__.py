@@ -116,6 +116,15 @@ def main(myblob: func.InputStream):
         )    
         myblob_filename = myblob.name.split("/", 1)[1]
 
+        # Add the folder of the blob to the catalog read by the webapp folder picker
+        myblob_folder = os.path.dirname(myblob_filename)
+        if myblob_folder:
+            # The catalog is best effort, it must not fail the processing of the upload
+            try:
+                statusLog.update_folder_catalog(added=[myblob_folder])
+            except Exception as err:
+                logging.warning("Unable to add folder %s to the folder catalog: %s", myblob_folder, str(err))
+
         # Check if the blob has been marked as 'do not process' and abort if so
         # This metadata is set if the blob is already processed and the content from
         # an existing resource group is simply being copied into this resource group
@@ -154,6 +163,8 @@ def main(myblob: func.InputStream):
         if len(search_id_list_to_delete) > 0:
             search_client.delete_documents(documents=search_id_list_to_delete)
             logging.debug("Succesfully deleted items from AI Search index.")
+            # invalidate search results cached by the webapp
+            statusLog.bump_index_generation()
         else:
             logging.debug("No items to delete from AI Search index.")        
             
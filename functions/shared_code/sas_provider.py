@@ -0,0 +1,107 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+""" Library of code for issuing and reusing storage SAS tokens across various calling features """
+import logging
+import threading
+from datetime import datetime, timedelta
+from azure.storage.blob import (
+    AccountSasPermissions,
+    BlobSasPermissions,
+    ContainerSasPermissions,
+    ResourceTypes,
+    generate_account_sas,
+    generate_blob_sas,
+    generate_container_sas,
+)
+
+class SasProvider:
+    """ Class for caching SAS tokens per (account, container, permission) scope. Tokens are signed once
+    and reused until they get within the refresh margin of their expiry, so callers can ask for a token
+    for every search hit or chunk without paying for HMAC signing each time. With the default lifetime
+    and margin every token handed out is still valid for at least an hour """
+
+    def __init__(self,
+                 account_name: str,
+                 account_key: str,
+                 lifetime: timedelta = timedelta(hours=2),
+                 refresh_margin: timedelta = timedelta(hours=1)
+                 ):
+        """ Constructor function """
+        self.account_name = account_name
+        self.account_key = account_key
+        self.lifetime = lifetime
+        self.refresh_margin = refresh_margin
+        self._tokens = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.signed = 0
+
+    def get_account_sas(self,
+                        resource_types: ResourceTypes,
+                        permission: AccountSasPermissions
+                        ) -> str:
+        """ Function to return an account SAS token for the given resource types and permissions """
+        return self._get_token(("account", str(resource_types), str(permission)),
+                               lambda expiry: generate_account_sas(
+                                   self.account_name,
+                                   self.account_key,
+                                   resource_types=resource_types,
+                                   permission=permission,
+                                   expiry=expiry))
+
+    def get_container_sas(self,
+                          container_name: str,
+                          permission: ContainerSasPermissions
+                          ) -> str:
+        """ Function to return a container SAS token, valid for every blob in the container """
+        return self._get_token(("container", container_name, str(permission)),
+                               lambda expiry: generate_container_sas(
+                                   account_name=self.account_name,
+                                   container_name=container_name,
+                                   account_key=self.account_key,
+                                   permission=permission,
+                                   expiry=expiry))
+
+    def get_blob_sas(self,
+                     container_name: str,
+                     blob_name: str,
+                     permission: BlobSasPermissions
+                     ) -> str:
+        """ Function to return a SAS token valid for a single blob """
+        return self._get_token(("blob", container_name, blob_name, str(permission)),
+                               lambda expiry: generate_blob_sas(
+                                   account_name=self.account_name,
+                                   container_name=container_name,
+                                   blob_name=blob_name,
+                                   account_key=self.account_key,
+                                   permission=permission,
+                                   expiry=expiry))
+
+    def _get_token(self, scope, sign) -> str:
+        """ Function to return the cached token of a scope, signing a new one when it is close to expiry """
+        now = datetime.utcnow()
+        with self._lock:
+            cached = self._tokens.get(scope)
+            if cached is not None and cached[0] - self.refresh_margin > now:
+                self.hits += 1
+                return cached[1]
+            # Drop the expired tokens, there is one per blob for the blob scopes
+            for expired in [key for key, (expiry, _) in self._tokens.items() if expiry <= now]:
+                del self._tokens[expired]
+            expiry = now + self.lifetime
+            token = sign(expiry)
+            self._tokens[scope] = (expiry, token)
+            self.signed += 1
+        logging.debug("Signed a new SAS token for scope %s of account %s", scope[:2], self.account_name)
+        return token
+
+    def stats(self) -> dict:
+        """ Function to return the number of cached scopes and how often a token was reused or signed """
+        return {
+            "scopes": len(self._tokens),
+            "hits": self.hits,
+            "signed": self.signed,
+            "lifetime_seconds": self.lifetime.total_seconds(),
+            "refresh_margin_seconds": self.refresh_margin.total_seconds()
+        }
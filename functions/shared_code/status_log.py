@@ -7,6 +7,7 @@ from datetime import datetime, timedelta
 import base64
 from enum import Enum
 import logging
+from azure.core import MatchConditions
 from azure.cosmos import CosmosClient, PartitionKey, exceptions
 import traceback, sys
 
@@ -38,6 +39,15 @@ class StatusQueryLevel(Enum):
 class StatusLog:
     """ Class for logging status of various processes to Cosmos DB"""
 
+    # Partition (file_name) of the counter bumped whenever the content of the search index changes
+    INDEX_GENERATION_FILE_NAME = "_index_generation"
+    # Partition (file_name) of the catalog of the folders holding files in the upload container
+    FOLDER_CATALOG_FILE_NAME = "_folder_catalog"
+    # Partition (file_name) of the catalog counting the documents carrying each tag
+    TAG_CATALOG_FILE_NAME = "_tag_catalog"
+    # Fields the status docs can be sorted on, each has a composite index with the state (infra/core/db/cosmosdb.tf)
+    STATUS_SORT_FIELDS = ("state_timestamp", "start_timestamp", "file_name")
+
     def __init__(self, url, key, database_name, container_name):
         """ Constructor function """
         self._url = url
@@ -111,22 +121,33 @@ class StatusLog:
         return State(items[0]['state'])
 
 
-    def read_files_status_by_timeframe(self, 
+    def build_files_status_query(self,
                        within_n_hours: int,
                        state: State = State.ALL,
                        folder_path: str = 'All',
                        tag: str = 'All',
-                       container: str = 'upload'
-                       ):
+                       container: str = 'upload',
+                       include_status_updates: bool = True,
+                       sort_by: str = 'state_timestamp',
+                       descending: bool = True,
+                       paged: bool = False
+                       ) -> str:
         """ 
-        Function to issue a query and return resulting docs          
+        Function to build the query returning the status docs of a timeframe
         args
             within_n_hours - integer representing from how many minutes ago to return docs for
+            include_status_updates - False to leave out the unbounded status_updates arrays
+            sort_by - one of STATUS_SORT_FIELDS, sorted on the server
+            paged - True for the paged reads, which order by state first when filtering on it
         """
+        if sort_by not in self.STATUS_SORT_FIELDS:
+            raise ValueError(f"Unsupported sort field {sort_by}")
 
         query_string = "SELECT c.id,  c.file_path, c.file_name, c.state, \
-            c.start_timestamp, c.state_description, c.state_timestamp, c.status_updates, \
-            c.tags FROM c"
+            c.start_timestamp, c.state_description, c.state_timestamp, c.tags"
+        if include_status_updates:
+            query_string += ", c.status_updates"
+        query_string += " FROM c"
 
         conditions = []    
         if within_n_hours != -1:
@@ -154,7 +175,29 @@ class StatusLog:
         if conditions:
             query_string += " WHERE " + " AND ".join(conditions)
 
-        query_string += " ORDER BY c.state_timestamp DESC"
+        order = "DESC" if descending else "ASC"
+        if paged and state != State.ALL:
+            # Lead with the equality filter so the (state, sort field) composite index serves the
+            # query, it is walked in reverse for the opposite direction
+            state_order = "ASC" if descending else "DESC"
+            query_string += f" ORDER BY c.state {state_order}, c.{sort_by} {order}"
+        else:
+            query_string += f" ORDER BY c.{sort_by} {order}"
+        return query_string
+
+    def read_files_status_by_timeframe(self, 
+                       within_n_hours: int,
+                       state: State = State.ALL,
+                       folder_path: str = 'All',
+                       tag: str = 'All',
+                       container: str = 'upload'
+                       ):
+        """ 
+        Function to issue a query and return resulting docs          
+        args
+            within_n_hours - integer representing from how many minutes ago to return docs for
+        """
+        query_string = self.build_files_status_query(within_n_hours, state, folder_path, tag, container)
 
         items = list(self.container.query_items(
             query=query_string,
@@ -163,6 +206,54 @@ class StatusLog:
 
         return items
 
+    def read_files_status_page(self,
+                       within_n_hours: int,
+                       state: State = State.ALL,
+                       folder_path: str = 'All',
+                       tag: str = 'All',
+                       container: str = 'upload',
+                       include_status_updates: bool = False,
+                       sort_by: str = 'state_timestamp',
+                       descending: bool = True,
+                       page_size: int = 100,
+                       continuation_token: str = None
+                       ):
+        """ 
+        Function to return one page of status docs and the continuation token of the next page,
+        None when this is the last page
+        """
+        query_string = self.build_files_status_query(within_n_hours, state, folder_path, tag, container,
+                                                     include_status_updates, sort_by, descending, paged=True)
+        pages = self.container.query_items(
+            query=query_string,
+            enable_cross_partition_query=True,
+            max_item_count=page_size
+        ).by_page(continuation_token)
+        items = list(next(pages, []))
+        return items, pages.continuation_token
+
+    def iter_files_status(self,
+                       within_n_hours: int,
+                       state: State = State.ALL,
+                       folder_path: str = 'All',
+                       tag: str = 'All',
+                       container: str = 'upload',
+                       include_status_updates: bool = False,
+                       sort_by: str = 'state_timestamp',
+                       descending: bool = True,
+                       page_size: int = 100
+                       ):
+        """ 
+        Function to iterate over the status docs, fetching them from Cosmos DB one page at a time
+        """
+        query_string = self.build_files_status_query(within_n_hours, state, folder_path, tag, container,
+                                                     include_status_updates, sort_by, descending, paged=True)
+        yield from self.container.query_items(
+            query=query_string,
+            enable_cross_partition_query=True,
+            max_item_count=page_size
+        )
+
     def upsert_document(self, document_path, status, status_classification: StatusClassification,
                         state=State.PROCESSING, fresh_start=False):
         """ Function to upsert a status item for a specified id """
@@ -173,9 +264,12 @@ class StatusLog:
         logging.info("%s DocumentID - %s", status, document_id)
 
         # If this event is the start of an upload, remove any existing status files for this path
+        # and take its tags off the tag catalog
         if fresh_start:
             try:
+                previous_document = self.container.read_item(item=document_id, partition_key=base_name)
                 self.container.delete_item(item=document_id, partition_key=base_name)
+                self._update_tag_catalog_best_effort(removed=previous_document.get('tags') or [])
             except exceptions.CosmosResourceNotFoundError:
                 pass
 
@@ -279,9 +373,11 @@ class StatusLog:
              # retrieve the stored document from cosmos
             base_name = os.path.basename(document_path)
             json_document = self.container.read_item(item=document_id, partition_key=base_name)
+            previous_tags = json_document.get('tags') or []
             json_document['tags'] = tags_list
             self._log_document[document_id] = json_document
             self.save_document(document_path)
+            self._update_tag_catalog_best_effort(added=tags_list, removed=previous_tags)
 
         except Exception as err:
             logging.error("An error occurred while updating the document state: %s", str(err))
@@ -295,6 +391,155 @@ class StatusLog:
             logging.debug("no update to be made for %s, skipping.", document_path)
         self._log_document[document_id] = ""
 
+    def read_index_generation(self) -> int:
+        """ Returns the current generation of the search index, 0 if it was never bumped """
+        try:
+            document = self.container.read_item(item=self.encode_document_id(self.INDEX_GENERATION_FILE_NAME),
+                                                partition_key=self.INDEX_GENERATION_FILE_NAME)
+            return document['generation']
+        except exceptions.CosmosResourceNotFoundError:
+            return 0
+
+    def bump_index_generation(self, retries: int = 5) -> int:
+        """ Increments the generation of the search index so that cached search results are
+        invalidated. Uses optimistic concurrency so concurrent writers never lose an increment """
+        document_id = self.encode_document_id(self.INDEX_GENERATION_FILE_NAME)
+        for _ in range(retries):
+            try:
+                document = self.container.read_item(item=document_id,
+                                                    partition_key=self.INDEX_GENERATION_FILE_NAME)
+            except exceptions.CosmosResourceNotFoundError:
+                try:
+                    self.container.create_item(body={
+                        "id": document_id,
+                        "file_name": self.INDEX_GENERATION_FILE_NAME,
+                        "generation": 1,
+                        "state_timestamp": str(datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+                    })
+                    return 1
+                except exceptions.CosmosResourceExistsError:
+                    continue
+            document['generation'] += 1
+            document['state_timestamp'] = str(datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            try:
+                self.container.replace_item(item=document, body=document,
+                                            etag=document['_etag'],
+                                            match_condition=MatchConditions.IfNotModified)
+                return document['generation']
+            except exceptions.CosmosAccessConditionFailedError:
+                continue
+        logging.warning("Unable to bump the search index generation after %s attempts", retries)
+        return None
+
+    def _update_catalog(self, file_name: str, modify, retries: int = 5) -> bool:
+        """ Applies modify to a catalog document with optimistic concurrency, retrying when another
+        writer got there first. Catalogs that were never built are left alone """
+        document_id = self.encode_document_id(file_name)
+        for _ in range(retries):
+            try:
+                document = self.container.read_item(item=document_id, partition_key=file_name)
+            except exceptions.CosmosResourceNotFoundError:
+                return False
+            if not modify(document):
+                return True
+            document['state_timestamp'] = str(datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            try:
+                self.container.replace_item(item=document, body=document,
+                                            etag=document['_etag'],
+                                            match_condition=MatchConditions.IfNotModified)
+                return True
+            except exceptions.CosmosAccessConditionFailedError:
+                continue
+        logging.warning("Unable to update the %s catalog after %s attempts", file_name, retries)
+        return False
+
+    def read_folder_catalog(self) -> list:
+        """ Returns the folders of the upload container, None if the catalog was never built """
+        try:
+            document = self.container.read_item(item=self.encode_document_id(self.FOLDER_CATALOG_FILE_NAME),
+                                                partition_key=self.FOLDER_CATALOG_FILE_NAME)
+            return document['folders']
+        except exceptions.CosmosResourceNotFoundError:
+            return None
+
+    def write_folder_catalog(self, folders: list) -> None:
+        """ Builds the folder catalog from a listing of the upload container """
+        self.container.upsert_item(body={
+            "id": self.encode_document_id(self.FOLDER_CATALOG_FILE_NAME),
+            "file_name": self.FOLDER_CATALOG_FILE_NAME,
+            "folders": sorted(set(folders)),
+            "state_timestamp": str(datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        })
+
+    def update_folder_catalog(self, added: list = (), removed: list = ()) -> bool:
+        """ Adds and removes folders of the upload container from the folder catalog """
+        def modify(document):
+            folders = (set(document['folders']) | set(added)) - set(removed)
+            if folders == set(document['folders']):
+                return False
+            document['folders'] = sorted(folders)
+            return True
+        return self._update_catalog(self.FOLDER_CATALOG_FILE_NAME, modify)
+
+    @staticmethod
+    def _split_tags(tags: list) -> list:
+        """ Returns the individual tags, some writers store several tags as one comma separated value """
+        return [tag for value in tags for tag in value.split(',') if tag]
+
+    def read_tag_catalog(self) -> list:
+        """ Returns the tags in use, None if the catalog was never built """
+        try:
+            document = self.container.read_item(item=self.encode_document_id(self.TAG_CATALOG_FILE_NAME),
+                                                partition_key=self.TAG_CATALOG_FILE_NAME)
+            return sorted(document['tags'])
+        except exceptions.CosmosResourceNotFoundError:
+            return None
+
+    def build_tag_catalog(self) -> list:
+        """ Builds the tag catalog by counting the tags of every document, returns the tags in use """
+        counts = {}
+        query = "SELECT VALUE c.tags FROM c WHERE IS_ARRAY(c.tags)"
+        for tags in self.container.query_items(query=query, enable_cross_partition_query=True):
+            for tag in self._split_tags(tags):
+                counts[tag] = counts.get(tag, 0) + 1
+        self.container.upsert_item(body={
+            "id": self.encode_document_id(self.TAG_CATALOG_FILE_NAME),
+            "file_name": self.TAG_CATALOG_FILE_NAME,
+            "tags": counts,
+            "state_timestamp": str(datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        })
+        return sorted(counts)
+
+    def update_tag_catalog(self, added: list = (), removed: list = ()) -> bool:
+        """ Adjusts the document count of the tags in the catalog, dropping the tags no longer used """
+        deltas = {}
+        for tag in self._split_tags(added):
+            deltas[tag] = deltas.get(tag, 0) + 1
+        for tag in self._split_tags(removed):
+            deltas[tag] = deltas.get(tag, 0) - 1
+        deltas = {tag: delta for tag, delta in deltas.items() if delta != 0}
+        if not deltas:
+            return True
+
+        def modify(document):
+            counts = document['tags']
+            for tag, delta in deltas.items():
+                count = counts.get(tag, 0) + delta
+                if count > 0:
+                    counts[tag] = count
+                else:
+                    counts.pop(tag, None)
+            return True
+        return self._update_catalog(self.TAG_CATALOG_FILE_NAME, modify)
+
+    def _update_tag_catalog_best_effort(self, added: list = (), removed: list = ()) -> None:
+        """ Updates the tag catalog, logging rather than raising when Cosmos DB fails, so the
+        status document itself is still written """
+        try:
+            self.update_tag_catalog(added=added, removed=removed)
+        except Exception as err:
+            logging.warning("Unable to update the tag catalog: %s", str(err))
+
     def get_stack_trace(self):
         """ Returns the stack trace of the current exception"""
         exc = sys.exc_info()[0]
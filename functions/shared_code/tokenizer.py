@@ -0,0 +1,48 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+""" Library of code for counting tokens reused across various calling features """
+from functools import lru_cache
+from typing import Sequence, Union
+import tiktoken
+
+# For gpt-4, gpt-3.5-turbo, text-embedding-ada-002, you need to use cl100k_base
+DEFAULT_ENCODING = "cl100k_base"
+
+# Threads used by tiktoken to encode a batch of strings
+BATCH_THREADS = 8
+
+@lru_cache(maxsize=None)
+def get_encoding(encoding_name: str = DEFAULT_ENCODING) -> tiktoken.Encoding:
+    """ Function to return a tiktoken encoding, loaded once per process """
+    return tiktoken.get_encoding(encoding_name)
+
+@lru_cache(maxsize=None)
+def get_model_encoding(model_name: str) -> tiktoken.Encoding:
+    """ Function to return the tiktoken encoding of an OpenAI model, resolved once per process """
+    return tiktoken.encoding_for_model(model_name)
+
+def _resolve(encoding: Union[str, tiktoken.Encoding]) -> tiktoken.Encoding:
+    if isinstance(encoding, str):
+        return get_encoding(encoding)
+    return encoding
+
+def count(text: str, encoding: Union[str, tiktoken.Encoding] = DEFAULT_ENCODING) -> int:
+    """ Function to return the number of tokens in a text string """
+    return len(_resolve(encoding).encode(text))
+
+def count_many(texts: Sequence[str], encoding: Union[str, tiktoken.Encoding] = DEFAULT_ENCODING) -> list[int]:
+    """ Function to return the number of tokens of each text string, encoding them in parallel """
+    if not texts:
+        return []
+    return [len(tokens) for tokens in _resolve(encoding).encode_batch(list(texts), num_threads=BATCH_THREADS)]
+
+def approx_count(text: str) -> int:
+    """ Function to estimate the number of tokens of a text string without encoding it,
+    assuming about 4 characters per token as for English text """
+    return (len(text) + 3) // 4
+
+def max_count(text: str) -> int:
+    """ Function to return an upper bound of the number of tokens of a text string without
+    encoding it. Every BPE token covers at least one byte of UTF-8 """
+    return len(text.encode("utf-8"))
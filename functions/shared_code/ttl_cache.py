@@ -0,0 +1,97 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+""" Library of code for bounded in-process caches reused across various calling features """
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+class TTLCache:
+    """ Class for a bounded in-process cache with least recently used eviction and a time to live.
+    A max_size of 0 disables the cache, every lookup is then a miss and nothing is stored.
+    When a weigher is given, the summed weight of the items (e.g. their size in bytes) is also
+    kept under max_weight """
+
+    def __init__(self, max_size: int, ttl_seconds: float, max_weight: int = 0,
+                 weigher: Callable[[Any], int] = None):
+        """ Constructor function """
+        self.max_size = int(max_size)
+        self.ttl_seconds = float(ttl_seconds)
+        self.max_weight = int(max_weight)
+        self.weigher = weigher
+        self.weight = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """ Returns the cached value for a key, or the default if it is missing or expired """
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            expires_at, value, weight = item
+            if expires_at < time.monotonic():
+                del self._items[key]
+                self.weight -= weight
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """ Stores a value, evicting the least recently used items when the cache is full """
+        if self.max_size <= 0:
+            return
+        weight = self.weigher(value) if self.weigher is not None else 0
+        if 0 < self.max_weight < weight:
+            return
+        with self._lock:
+            previous = self._items.pop(key, None)
+            if previous is not None:
+                self.weight -= previous[2]
+            self._items[key] = (time.monotonic() + self.ttl_seconds, value, weight)
+            self.weight += weight
+            while len(self._items) > self.max_size or (self.max_weight > 0 and self.weight > self.max_weight):
+                self.weight -= self._items.popitem(last=False)[1][2]
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """ Removes a key from the cache and returns its value """
+        with self._lock:
+            item = self._items.pop(key, None)
+            if item is not None:
+                self.weight -= item[2]
+        return default if item is None else item[1]
+
+    def clear(self) -> None:
+        """ Removes all items from the cache """
+        with self._lock:
+            self._items.clear()
+            self.weight = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def stats(self) -> dict:
+        """ Returns the size and hit/miss counters of the cache """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._items),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "weight": self.weight,
+            "max_weight": self.max_weight,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
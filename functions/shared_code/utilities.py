@@ -10,8 +10,8 @@ import zipfile
 import os
 from azure.storage.blob import BlobServiceClient
 from shared_code.utilities_helper import UtilitiesHelper
+from shared_code import tokenizer
 from nltk.tokenize import sent_tokenize
-import tiktoken
 import nltk
 # Try to download using nltk.download
 nltk.download('punkt')
@@ -339,17 +339,11 @@ class Utilities:
 
     def num_tokens_from_string(self, string: str, encoding_name: str) -> int:
         """ Function to return the number of tokens in a text string"""
-        encoding = tiktoken.get_encoding(encoding_name)
-        num_tokens = len(encoding.encode(string))
-        return num_tokens
+        return tokenizer.count(string, encoding_name)
 
     def token_count(self, input_text):
         """ Function to return the number of tokens in a text string"""
-        # calc token count
-        # For gpt-4, gpt-3.5-turbo, text-embedding-ada-002, you need to use cl100k_base
-        encoding = "cl100k_base"
-        token_count = self.num_tokens_from_string(input_text, encoding)
-        return token_count
+        return tokenizer.count(input_text)
 
     def write_chunk(self, myblob_name, myblob_uri, file_number, chunk_size, chunk_text, page_list, 
                     section_name, title_name, subtitle_name, file_class):
@@ -415,19 +409,24 @@ class Utilities:
         chunk_target_size = standard_chunk_target_size - self.token_count(prefix_text)
         rows = soup.find_all('tr')
         # Filter out rows that are part of thead block
-        filtered_rows = [row for row in rows if row.parent.name != "thead"] 
-               
-        for i, row in enumerate(filtered_rows):
-            row_html = str(row)
+        filtered_rows = [str(row) for row in rows if row.parent.name != "thead"]
+        # Count the tokens of every row once, in one batch, and keep a running total per chunk
+        row_sizes = tokenizer.count_many(filtered_rows)
+        current_chunk_size = self.token_count(current_chunk)
+        thead_size = self.token_count(thead)
+
+        for row_html, row_size in zip(filtered_rows, row_sizes):
 
             # If adding this row to the current chunk exceeds the target size, start a new chunk
-            if self.token_count(current_chunk + row_html) > chunk_target_size:
+            if current_chunk_size + row_size > chunk_target_size:
                 add_current_table_chunk(current_chunk)    
                 current_chunk = thead
+                current_chunk_size = thead_size
                 chunk_target_size = standard_chunk_target_size                
 
             # Add the current row to the chunk
             current_chunk += row_html
+            current_chunk_size += row_size
 
         # Add the final chunk if there's any content left
         add_current_table_chunk(current_chunk)      
@@ -448,10 +447,13 @@ class Utilities:
         chunk_count = 0
         previous_paragraph_element_is_a_table = False
 
+        # count the tokens of all paragraphs in one batch
+        paragraph_sizes = tokenizer.count_many([paragraph_element["text"] for paragraph_element in document_map['structure']])
+
         # iterate over the paragraphs and build a chuck based on a section
         # and/or title of the document
         for index, paragraph_element in enumerate(document_map['structure']):
-            paragraph_size = self.token_count(paragraph_element["text"])
+            paragraph_size = paragraph_sizes[index]
             paragraph_text = paragraph_element["text"]
             section_name = paragraph_element["section"]
             title_name = paragraph_element["title"]
@@ -504,15 +506,19 @@ class Utilities:
                         # and begin to process it on sentence boundaries to break it down into
                         # sub-chunks that are below the CHUNK_TARGET_SIZE
                         sentences = sent_tokenize(chunk_text + paragraph_text)
+                        # count each sentence once, with the space that joins it to the previous one
+                        sentence_sizes = tokenizer.count_many([" " + sentence for sentence in sentences])
                         chunks = []
                         chunk = ""
-                        for sentence in sentences:
-                            temp_chunk = chunk + " " + sentence if chunk else sentence
-                            if self.token_count(temp_chunk) <= chunk_target_size:
-                                chunk = temp_chunk
+                        chunk_tokens = 0
+                        for sentence, sentence_size in zip(sentences, sentence_sizes):
+                            if chunk_tokens + sentence_size <= chunk_target_size:
+                                chunk = chunk + " " + sentence if chunk else sentence
+                                chunk_tokens += sentence_size
                             else:
                                 chunks.append(chunk)
                                 chunk = sentence
+                                chunk_tokens = sentence_size
                         if chunk:
                             chunks.append(chunk)
 
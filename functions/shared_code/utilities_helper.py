@@ -2,10 +2,10 @@
 # Licensed under the MIT license.
 
 import os
-import logging
 import urllib.parse
-from datetime import datetime, timedelta
-from azure.storage.blob import generate_blob_sas, BlobSasPermissions
+from datetime import timedelta
+from azure.storage.blob import BlobSasPermissions
+from shared_code.sas_provider import SasProvider
 
 class UtilitiesHelper:
     """ Helper class for utility functions"""
@@ -17,6 +17,10 @@ class UtilitiesHelper:
         self.azure_blob_storage_account = azure_blob_storage_account
         self.azure_blob_storage_endpoint = azure_blob_storage_endpoint
         self.azure_blob_storage_key = azure_blob_storage_key
+        # Blob tokens live an hour like the ones signed per call before, each handed out is
+        # still valid for at least half an hour
+        self.sas_provider = SasProvider(azure_blob_storage_account, azure_blob_storage_key,
+                                        lifetime=timedelta(hours=1), refresh_margin=timedelta(minutes=30))
         
     def get_filename_and_extension(self, path):
             """ Function to return the file name & type"""
@@ -36,20 +40,13 @@ class UtilitiesHelper:
         separator = "/"
         file_path_w_name_no_cont = separator.join(
             blob_path.split(separator)[1:])
-        
+
         container_name = separator.join(
             blob_path.split(separator)[0:1])
 
-        # Gen SAS token
-        sas_token = generate_blob_sas(
-            account_name=self.azure_blob_storage_account,
-            container_name=container_name,
-            blob_name=file_path_w_name_no_cont,
-            account_key=self.azure_blob_storage_key,
-            permission=BlobSasPermissions(read=True),
-            expiry=datetime.utcnow() + timedelta(hours=1)
-        )
+        # Reuse the read-only SAS token of the blob, the URL is handed to other services and
+        # must not grant access to the rest of the container
+        sas_token = self.sas_provider.get_blob_sas(container_name, file_path_w_name_no_cont, BlobSasPermissions(read=True))
         blob_path = urllib.parse.quote(blob_path)
         source_blob_path = f'{self.azure_blob_storage_endpoint}{blob_path}?{sas_token}'
-        logging.info("Path and SAS token for file in azure storage are now generated \n")
         return source_blob_path
\ No newline at end of file
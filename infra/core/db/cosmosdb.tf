@@ -66,6 +66,50 @@ resource "azurerm_cosmosdb_sql_container" "log_container" {
 
   partition_key_path = "/file_name"
 
+  # Status queries sort on the server and filter on state, the status_updates arrays are never queried
+  indexing_policy {
+    indexing_mode = "consistent"
+
+    included_path {
+      path = "/*"
+    }
+
+    excluded_path {
+      path = "/status_updates/*"
+    }
+
+    composite_index {
+      index {
+        path  = "/state"
+        order = "Ascending"
+      }
+      index {
+        path  = "/state_timestamp"
+        order = "Descending"
+      }
+    }
+    composite_index {
+      index {
+        path  = "/state"
+        order = "Ascending"
+      }
+      index {
+        path  = "/start_timestamp"
+        order = "Descending"
+      }
+    }
+    composite_index {
+      index {
+        path  = "/state"
+        order = "Ascending"
+      }
+      index {
+        path  = "/file_name"
+        order = "Descending"
+      }
+    }
+  }
+
   autoscale_settings {
     max_throughput = var.autoscaleMaxThroughput
   }
@@ -184,6 +184,8 @@ module "backend" {
     ENABLE_TABULAR_DATA_ASSISTANT           = var.enableTabularDataAssistant
     ENABLE_MULTIMEDIA                       = var.enableMultimedia
     MAX_CSV_FILE_SIZE                       = var.maxCsvFileSize
+    ENABLE_PARALLEL_RETRIEVAL               = var.enableParallelRetrieval
+    ENABLE_ANSWER_CACHE                     = var.enableAnswerCache
   }
 
   aadClientId = module.entraObjects.azure_ad_web_app_client_id
@@ -518,4 +518,14 @@ variable "password_lifetime" {
   type    = number
   default = 365
   description = "The number of days used as the lifetime for passwords"  
-}
\ No newline at end of file
+}
+
+variable "enableParallelRetrieval" {
+  type    = bool
+  default = false
+}
+
+variable "enableAnswerCache" {
+  type    = bool
+  default = false
+}
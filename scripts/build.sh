@@ -33,6 +33,9 @@ cd ../backend
 mkdir -p ./shared_code
 cp  ../../functions/shared_code/status_log.py ./shared_code
 cp  ../../functions/shared_code/__init__.py ./shared_code
+cp  ../../functions/shared_code/ttl_cache.py ./shared_code
+cp  ../../functions/shared_code/sas_provider.py ./shared_code
+cp  ../../functions/shared_code/tokenizer.py ./shared_code
 
 # zip the webapp content from app/backend to the ./artifacts folders
 zip -q -r ${BINARIES_OUTPUT_PATH}/webapp.zip .
@@ -51,6 +54,8 @@ cd ${ENRICHMENT_ROOT_PATH}
 mkdir -p ./shared_code
 cp  ../../functions/shared_code/status_log.py ./shared_code
 cp  ../../functions/shared_code/utilities_helper.py ./shared_code
+cp  ../../functions/shared_code/ttl_cache.py ./shared_code
+cp  ../../functions/shared_code/sas_provider.py ./shared_code
 zip -q -r ${BINARIES_OUTPUT_PATH}/enrichment.zip . -x "models/*" @
 echo "Successfully zipped enrichment app"
 echo -e "\n"
\ No newline at end of file
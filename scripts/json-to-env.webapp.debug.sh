@@ -191,6 +191,8 @@ jq -r  '
     echo "ENABLE_MATH_ASSISTANT=$ENABLE_MATH_ASSISTANT"
     echo "ENABLE_TABULAR_DATA_ASSISTANT=$ENABLE_TABULAR_DATA_ASSISTANT"
     echo "ENABLE_MULTIMEDIA=$ENABLE_MULTIMEDIA"
+    echo "ENABLE_PARALLEL_RETRIEVAL=$ENABLE_PARALLEL_RETRIEVAL"
+    echo "ENABLE_ANSWER_CACHE=$ENABLE_ANSWER_CACHE"
 
 if [ -n "${IN_AUTOMATION}" ]; then
     if [ -n "${AZURE_ENVIRONMENT}" ] && [[ "$AZURE_ENVIRONMENT" == "AzureUSGovernment" ]]; then
@@ -0,0 +1,129 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+'''
+Benchmark for the cold start of the webapp backend.
+
+Times, in a fresh interpreter each time, the imports app.py used to do before it could
+accept requests (every approach, the math and tabular data assistants, pandas and the
+management client) against the imports it does now that approaches are constructed by the
+registry on first use. The remaining imports of the enabled features run in the background
+after startup and are reported separately. The ARM calls resolving the model metadata are
+not part of the measurement, they are also moved off the startup path and cached on disk.
+'''
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from rich.console import Console
+from rich.table import Table
+import rich.traceback
+
+rich.traceback.install()
+console = Console()
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app", "backend")
+
+# Imported by app.py in both versions
+COMMON_MODULES = [
+    "fastapi",
+    "openai",
+    "azure.identity",
+    "azure.search.documents.aio",
+    "azure.storage.blob",
+    "azure.storage.blob.aio",
+    "core.semanticcache",
+    "core.languagedetector",
+    "core.httptransport",
+    "core.citationcache",
+]
+
+EAGER_MODULES = COMMON_MODULES + [
+    "pandas",
+    "azure.mgmt.cognitiveservices",
+    "approaches.comparewebwithwork",
+    "approaches.compareworkwithweb",
+    "approaches.compareworkandweb",
+    "approaches.chatreadretrieveread",
+    "approaches.chatwebretrieveread",
+    "approaches.gpt_direct_approach",
+    "approaches.mathassistant",
+    "approaches.tabulardataassistant",
+]
+
+LAZY_MODULES = COMMON_MODULES + [
+    "approaches.approach",
+    "core.modelmetadata",
+    "core.approachregistry",
+]
+
+# Imported in the background after startup when every feature flag is enabled
+WARM_UP_MODULES = [
+    "azure.mgmt.cognitiveservices",
+    "approaches.chatreadretrieveread",
+    "approaches.chatwebretrieveread",
+    "approaches.comparewebwithwork",
+    "approaches.compareworkwithweb",
+    "approaches.compareworkandweb",
+    "approaches.gpt_direct_approach",
+    "approaches.mathassistant",
+    "approaches.tabulardataassistant",
+]
+
+# The assistants build their LangChain clients at import time and only need these to be set
+DUMMY_ENV = {
+    "AZURE_OPENAI_ENDPOINT": "https://localhost",
+    "AZURE_OPENAI_SERVICE_KEY": "benchmark",
+    "AZURE_OPENAI_CHATGPT_DEPLOYMENT": "benchmark",
+}
+
+def parse_arguments():
+    """
+    Parse command line arguments
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Number of fresh interpreters started for each measurement")
+
+    return parser.parse_args()
+
+def time_imports(modules, preload=()):
+    """Time importing the modules in a fresh interpreter, after importing the preload modules"""
+    code = ("import importlib, time\n"
+            f"for module in {list(preload)!r}: importlib.import_module(module)\n"
+            "start = time.perf_counter()\n"
+            f"for module in {list(modules)!r}: importlib.import_module(module)\n"
+            "print(time.perf_counter() - start)\n")
+    env = {**os.environ, **{key: os.environ.get(key, value) for key, value in DUMMY_ENV.items()}}
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+def measure(modules, repeat, preload=()):
+    """Median import time over the given number of interpreters"""
+    # The first run pays for reading the modules from disk, leave it out
+    time_imports(modules, preload)
+    return statistics.median(time_imports(modules, preload) for _ in range(repeat))
+
+def main(repeat):
+    """Main function to run the benchmark"""
+    eager = measure(EAGER_MODULES, repeat)
+    lazy = measure(LAZY_MODULES, repeat)
+    warm_up = measure(WARM_UP_MODULES, repeat, preload=LAZY_MODULES)
+
+    table = Table(title=f"Backend import time (median of {repeat} interpreters)")
+    table.add_column("Imports")
+    table.add_column("ms")
+    table.add_row("Startup, every approach and assistant imported eagerly", f"{eager * 1000:.0f}")
+    table.add_row("Startup, approaches constructed by the registry on first use", f"{lazy * 1000:.0f}")
+    table.add_row("Background warm up after startup, every feature enabled", f"{warm_up * 1000:.0f}")
+    console.print(table)
+    console.print(f"Startup speed-up: {eager / lazy:.1f}x")
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    main(args.repeat)
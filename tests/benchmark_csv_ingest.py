@@ -0,0 +1,132 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+'''
+Benchmark for the ingestion of the CSVs uploaded to the tabular data assistant.
+
+Generates a CSV of the requested size and parses it, each time in a fresh interpreter
+so that the peak memory can be compared, with the previous /posttd implementation
+(read the whole upload, decode it as latin-1, wrap it in StringIO and parse it with
+pandas) and with the backend's read_csv_upload (Arrow reading the spooled upload file
+on several threads). The frame is then downcast the way the dataframe store keeps it.
+'''
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from rich.console import Console
+from rich.table import Table
+import rich.traceback
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "app", "backend"))
+
+rich.traceback.install()
+console = Console()
+
+CITIES = ["Seattle", "Zürich", "São Paulo", "Montréal", "Oslo", "Nairobi", "Kraków", "Osaka"]
+PRODUCTS = ["ThinkPad X1", "Surface Pro", "MacBook Air", "XPS 13", "Pixelbook", "Galaxy Book"]
+
+def parse_arguments():
+    """
+    Parse command line arguments
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--size_mb",
+        type=int,
+        default=128,
+        help="Size of the generated CSV in MB")
+    parser.add_argument(
+        "--csv",
+        help="Parse this CSV instead of generating one")
+    parser.add_argument(
+        "--method",
+        choices=["previous", "arrow"],
+        help=argparse.SUPPRESS)
+
+    return parser.parse_args()
+
+def generate_csv(path, size_mb):
+    """Write a sales-like CSV of about size_mb MB"""
+    rng = random.Random(42)
+    target = size_mb * 1024 * 1024
+    with open(path, "w", encoding="utf-8", newline="") as csv:
+        csv.write("order_id,city,product,quantity,unit_price,discount,note\n")
+        order_id = 0
+        while csv.tell() < target:
+            rows = []
+            for _ in range(10000):
+                order_id += 1
+                rows.append(f"{order_id},{rng.choice(CITIES)},{rng.choice(PRODUCTS)},{rng.randint(1, 50)},"
+                            f"{rng.randint(100, 300000) / 100},{rng.choice([0, 0.05, 0.1, 0.25])},"
+                            f"customer {rng.randint(1, 10 ** 6)} asked for delivery before {rng.randint(1, 28)}/{rng.randint(1, 12)}\n")
+            csv.write("".join(rows))
+
+def run_method(method, path):
+    """Parse the CSV with one implementation and print the measurements as JSON"""
+    from core.dataframestore import downcast, memory_bytes
+    import pandas as pd
+    from io import StringIO
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    with open(path, "rb") as upload:
+        if method == "previous":
+            content = upload.read()
+            df = pd.read_csv(StringIO(content.decode('latin-1')))
+            del content
+        else:
+            from core.csvingest import read_csv_upload
+            df = read_csv_upload(upload, os.path.getsize(path))
+    parsed = time.perf_counter() - start
+    df = downcast(df)
+    total = time.perf_counter() - start
+    print(json.dumps({"parse_seconds": parsed,
+                      "total_seconds": total,
+                      "peak_mb": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline) / 1024,
+                      "frame_mb": memory_bytes(df) / 1024 / 1024,
+                      "rows": len(df)}))
+
+def measure(method, path):
+    """Run one implementation in a fresh interpreter"""
+    result = subprocess.run([sys.executable, __file__, "--method", method, "--csv", path],
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main(size_mb, path):
+    """Main function to run the benchmark"""
+    generated = path is None
+    if generated:
+        path = os.path.join(tempfile.gettempdir(), f"benchmark_csv_ingest_{size_mb}mb.csv")
+        console.print(f"Generating {path}...")
+        generate_csv(path, size_mb)
+    try:
+        results = {method: measure(method, path) for method in ["previous", "arrow"]}
+    finally:
+        if generated:
+            os.remove(path)
+
+    table = Table(title=f"Ingesting a {os.path.basename(path)} CSV of {results['arrow']['rows']} rows")
+    table.add_column("Implementation")
+    table.add_column("Parse s")
+    table.add_column("Parse + downcast s")
+    table.add_column("Peak MB")
+    table.add_column("Frame MB")
+    labels = {"previous": "Previous (read, latin-1 decode, StringIO, pandas)", "arrow": "Current (Arrow on the upload file)"}
+    for method, result in results.items():
+        table.add_row(labels[method], f"{result['parse_seconds']:.2f}", f"{result['total_seconds']:.2f}",
+                      f"{result['peak_mb']:.0f}", f"{result['frame_mb']:.0f}")
+    console.print(table)
+    console.print(f"Parse speed-up: {results['previous']['parse_seconds'] / results['arrow']['parse_seconds']:.1f}x, "
+                  f"peak memory: {results['arrow']['peak_mb'] / max(results['previous']['peak_mb'], 1):.2f}x")
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    if args.method:
+        run_method(args.method, args.csv)
+    else:
+        main(args.size_mb, args.csv)
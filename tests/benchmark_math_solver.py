@@ -0,0 +1,77 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+'''
+Benchmark for the local solver of the math assistant.
+
+Runs typical math assistant questions through the backend's SymPy solver and reports, for
+each one, whether it was answered locally or left to the LangChain agent, the answer and
+the time it took. Questions the agent gets cost several LLM calls instead.
+'''
+import argparse
+import os
+import sys
+import time
+from rich.console import Console
+from rich.table import Table
+import rich.traceback
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "app", "backend"))
+
+rich.traceback.install()
+console = Console()
+
+QUESTIONS = [
+    "What is 17% of 2340?",
+    "What is (125 * 4) / 8 + 3^4?",
+    "Calculate sqrt(144) + 2.5",
+    "Solve 2x + 3 = 11",
+    "x^2 - 5x + 6 = 0",
+    "Factor x^2 - 9",
+    "Expand (x + 2)^3",
+    "Find the derivative of f(x) = x^2 with respect to x.",
+    "Differentiate sin(x) * x^3",
+    "Find the integral of f(x) = 3x^2 with respect to x.",
+    "Integrate x^2 from 0 to 3",
+    "Find the limit of f(x) = (x^2 - 1) / (x - 1) as x approaches 1.",
+    "Limit of sin(x)/x as x approaches 0",
+    "John has 2 houses. Each house has 3 bedrooms with 2 windows each. How many windows are there?",
+    "What is the Pythagorean theorem?",
+]
+
+def parse_arguments():
+    """
+    Parse command line arguments
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--question",
+        action="append",
+        help="Question to run instead of the built-in ones, may be repeated")
+
+    return parser.parse_args()
+
+def main(questions):
+    """Main function to run the benchmark"""
+    start = time.perf_counter()
+    from approaches import mathsolver
+    console.print(f"Imported the solver in {time.perf_counter() - start:.2f}s")
+
+    table = Table(title="Math questions answered by the local solver")
+    table.add_column("Question")
+    table.add_column("Answered by")
+    table.add_column("ms")
+    table.add_column("Answer")
+    answered = 0
+    for question in questions:
+        start = time.perf_counter()
+        answer = mathsolver.answer(question)
+        elapsed = (time.perf_counter() - start) * 1000
+        answered += answer is not None
+        table.add_row(question, "solver" if answer is not None else "agent", f"{elapsed:.1f}", answer or "")
+    console.print(table)
+    console.print(f"{answered} of {len(questions)} questions answered without the agent")
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    main(args.question or QUESTIONS)
@@ -0,0 +1,117 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+'''
+Microbenchmark for building the chat prompt from a long conversation history.
+
+Compares Approach.get_messages_from_history of the webapp backend with the previous
+implementation (list.insert for every message and tiktoken.encoding_for_model for
+every token count), replaying each turn of a synthetic conversation the way the
+backend sees it: the whole history is sent again on every turn.
+'''
+import argparse
+import os
+import sys
+import time
+import tiktoken
+from rich.console import Console
+from rich.table import Table
+import rich.traceback
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "app", "backend"))
+from approaches.approach import Approach  # pylint: disable=wrong-import-position
+from core.modelhelper import get_oai_chatmodel_tiktok  # pylint: disable=wrong-import-position
+
+rich.traceback.install()
+console = Console()
+
+SYSTEM_PROMPT = "You are an Azure OpenAI Completion system. Answer ONLY with the facts listed in the sources. " * 10
+FEW_SHOTS = [
+    {'role': Approach.USER, 'content': 'What are the future plans for public transportation development?'},
+    {'role': Approach.ASSISTANT, 'content': 'Future plans for public transportation'},
+    {'role': Approach.USER, 'content': 'how much renewable energy was generated last year?'},
+    {'role': Approach.ASSISTANT, 'content': 'Renewable energy generation last year'}
+]
+
+def parse_arguments():
+    """
+    Parse command line arguments
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--turns",
+        type=int,
+        default=50,
+        help="Number of turns in the conversation")
+    parser.add_argument(
+        "--model",
+        default="gpt-35-turbo-16k",
+        help="Model name used to pick the tokenizer and the token limit")
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Number of times the whole conversation is replayed")
+
+    return parser.parse_args()
+
+def build_history(turns):
+    """Build a synthetic conversation with the given number of turns"""
+    return [{"user": f"Question {i}: what does section {i} of the policy say about leave and overtime?",
+             "bot": f"Answer {i}: section {i} describes the rules for annual leave, overtime pay and approvals. " * 4}
+            for i in range(turns)]
+
+def previous_messages_from_history(system_prompt, model_id, history, user_conv, few_shots, max_tokens):
+    """The previous implementation, kept here as the baseline"""
+    def count(message):
+        encoding = tiktoken.encoding_for_model(get_oai_chatmodel_tiktok(model_id))
+        return 2 + sum(len(encoding.encode(value)) for value in message.values())
+
+    messages = [{'role': 'system', 'content': system_prompt}]
+    token_length = count(messages[-1])
+    for shot in few_shots:
+        messages.insert(1, {'role': shot.get('role'), 'content': shot.get('content')})
+        token_length += count(messages[1])
+    append_index = len(few_shots) + 1
+    messages.insert(append_index, {'role': Approach.USER, 'content': user_conv})
+    token_length += count(messages[append_index])
+    for h in reversed(history[:-1]):
+        if h.get("bot"):
+            messages.insert(append_index, {'role': Approach.ASSISTANT, 'content': h.get('bot')})
+            token_length += count(messages[append_index])
+        messages.insert(append_index, {'role': Approach.USER, 'content': h.get('user')})
+        token_length += count(messages[append_index])
+        if token_length > max_tokens:
+            break
+    return messages
+
+def replay(build, history, model, repeat):
+    """Time building the prompt for every turn of the conversation"""
+    approach = Approach()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for turn in range(1, len(history) + 1):
+            conversation = history[:turn]
+            build(approach, SYSTEM_PROMPT, model, conversation, conversation[-1]["user"], FEW_SHOTS, 100000)
+    return (time.perf_counter() - start) / (repeat * len(history))
+
+def main(turns, model, repeat):
+    """Main function to run the benchmark"""
+    history = build_history(turns)
+    # Resolve the encoding once so that its download is not part of either measurement
+    tiktoken.encoding_for_model(get_oai_chatmodel_tiktok(model))
+
+    previous = replay(lambda approach, *args: previous_messages_from_history(*args), history, model, repeat)
+    current = replay(lambda approach, *args: approach.get_messages_from_history(*args), history, model, repeat)
+
+    table = Table(title=f"Prompt building over a {turns}-turn conversation ({model})")
+    table.add_column("Implementation")
+    table.add_column("ms per turn")
+    table.add_row("Previous (insert, encoder per message)", f"{previous * 1000:.3f}")
+    table.add_row("Current (append then reverse, memoized)", f"{current * 1000:.3f}")
+    console.print(table)
+    console.print(f"Speed-up: {previous / current:.1f}x")
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    main(args.turns, args.model, args.repeat)
@@ -0,0 +1,132 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+'''
+Benchmark for the engines of the tabular data assistant.
+
+Scales test_data/parts_inventory.csv up to the requested number of rows, keeps it the way
+the dataframe store does (downcast), and times typical analyst questions computed the way
+the pandas agent writes them and as the SQL the DuckDB engine runs over the same frame.
+The LLM is not involved, only the computation of each answer is measured.
+'''
+import argparse
+import os
+import sys
+import time
+from rich.console import Console
+from rich.table import Table
+import rich.traceback
+
+BACKEND = os.path.join(os.path.dirname(__file__), "..", "app", "backend")
+sys.path.append(BACKEND)
+
+rich.traceback.install()
+console = Console()
+
+PRICE_SQL = """CAST(replace(trim("Average Price"), '$', '') AS DOUBLE)"""
+
+def price(df):
+    """Average Price as a number, it is text such as "$163.97 " in the CSV"""
+    return df["Average Price"].astype(str).str.strip().str.lstrip("$").astype(float)
+
+QUESTIONS = [
+    ("Total stock by location",
+     lambda df: df.groupby("Location", observed=True)["Stock Level"].sum(),
+     'SELECT "Location", SUM("Stock Level") FROM data GROUP BY "Location"'),
+    ("Parts at or below their reorder point",
+     lambda df: int((df["Stock Level"] <= df["ROP"]).sum()),
+     'SELECT COUNT(*) FROM data WHERE "Stock Level" <= "ROP"'),
+    ("Average price by ABC and XYZ class",
+     lambda df: price(df).groupby([df["ABC Analysis"], df["XYZ Analysis"]], observed=True).mean(),
+     f'SELECT "ABC Analysis", "XYZ Analysis", AVG({PRICE_SQL}) FROM data GROUP BY ALL'),
+    ("Top 10 parts by inventory value",
+     lambda df: (df["Stock Level"] * price(df)).groupby(df["Description"], observed=True).sum().nlargest(10),
+     f'SELECT "Description", SUM("Stock Level" * {PRICE_SQL}) AS value FROM data GROUP BY ALL ORDER BY value DESC LIMIT 10'),
+    ("Median lead time by location",
+     lambda df: df.groupby("Location", observed=True)["Avg Lead Time"].median(),
+     'SELECT "Location", MEDIAN("Avg Lead Time") FROM data GROUP BY "Location"'),
+    ("Distinct parts per location",
+     lambda df: df.groupby("Location", observed=True)["Description"].nunique(),
+     'SELECT "Location", COUNT(DISTINCT "Description") FROM data GROUP BY "Location"'),
+]
+
+def parse_arguments():
+    """
+    Parse command line arguments
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--rows",
+        type=int,
+        default=5000000,
+        help="Number of rows of the scaled up inventory")
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Number of runs of each question, the fastest is reported")
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=0,
+        help="Threads DuckDB runs on, 0 for every core")
+    parser.add_argument(
+        "--memory_limit_mb",
+        type=int,
+        default=1024,
+        help="Memory DuckDB uses before spilling to disk")
+
+    return parser.parse_args()
+
+def scale_inventory(rows):
+    """The parts inventory repeated up to the number of rows, with varied stock levels and prices"""
+    import numpy as np
+    import pandas as pd
+    from core.dataframestore import downcast
+    inventory = pd.read_csv(os.path.join(BACKEND, "test_data", "parts_inventory.csv"))
+    rng = np.random.default_rng(42)
+    df = inventory.sample(rows, replace=True, random_state=42, ignore_index=True)
+    df["Stock Level"] = rng.integers(0, 100, rows)
+    df["Average Price"] = pd.Series(rng.integers(10000, 30000, rows) / 100).map("${:.2f} ".format)
+    return downcast(df)
+
+def best_time(function, repeat):
+    """The fastest of repeat runs, in seconds"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main(rows, repeat, threads, memory_limit_mb):
+    """Main function to run the benchmark"""
+    import tempfile
+    from core.duckdbengine import DuckDbEngine
+    console.print(f"Scaling the parts inventory up to {rows} rows...")
+    df = scale_inventory(rows)
+    engine = DuckDbEngine(os.path.join(tempfile.gettempdir(), "benchmark_tabular_duckdb"),
+                          memory_limit_mb * 1024 * 1024, threads)
+    connection = engine.connect(df)
+
+    table = Table(title=f"Answering questions over {rows} parts ({engine.threads} DuckDB threads)")
+    table.add_column("Question")
+    table.add_column("pandas s")
+    table.add_column("DuckDB s")
+    table.add_column("Speed-up")
+    totals = [0.0, 0.0]
+    try:
+        for question, pandas_answer, sql in QUESTIONS:
+            pandas_seconds = best_time(lambda: pandas_answer(df), repeat)
+            duckdb_seconds = best_time(lambda: engine.query(connection, sql), repeat)
+            totals[0] += pandas_seconds
+            totals[1] += duckdb_seconds
+            table.add_row(question, f"{pandas_seconds:.3f}", f"{duckdb_seconds:.3f}", f"{pandas_seconds / duckdb_seconds:.1f}x")
+    finally:
+        connection.close()
+    table.add_row("Total", f"{totals[0]:.3f}", f"{totals[1]:.3f}", f"{totals[0] / totals[1]:.1f}x")
+    console.print(table)
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    main(args.rows, args.repeat, args.threads, args.memory_limit_mb)
@@ -0,0 +1,139 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+'''
+Command line load test for the /chat endpoint of the webapp backend.
+
+Fires a number of concurrent grounded chat requests at a running backend and
+reports time to first byte and total latency, so the concurrency of a single
+worker can be compared between builds (e.g. before and after a change to the
+retrieval pipeline).
+'''
+import argparse
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from rich.console import Console
+from rich.table import Table
+import rich.traceback
+
+
+rich.traceback.install()
+console = Console()
+
+# Define top-level variables
+TIMEOUT_VALUE = 300
+QUESTIONS = [
+    "What are the future plans for public transportation development?",
+    "How much renewable energy was generated last year?",
+    "What steps are being taken to promote energy conservation?",
+    "Summarize the main findings of the uploaded documents.",
+]
+
+def parse_arguments():
+    """
+    Parse command line arguments
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--backend_url",
+        default="http://localhost:8000",
+        help="Base URL of the running webapp backend")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=16,
+        help="Number of chat requests in flight at the same time")
+    parser.add_argument(
+        "--requests",
+        type=int,
+        default=64,
+        help="Total number of chat requests to send")
+    parser.add_argument(
+        "--approach",
+        type=int,
+        default=1,
+        help="Approach to exercise (1 = ReadRetrieveRead)")
+
+    return parser.parse_args()
+
+def build_request(question, approach):
+    """Build a chat request body matching what the frontend sends"""
+    return {
+        "history": [{"user": question}],
+        "approach": approach,
+        "overrides": {
+            "semantic_ranker": True,
+            "semantic_captions": False,
+            "top": 5,
+            "suggest_followup_questions": False,
+            "user_persona": "analyst",
+            "system_persona": "an Assistant",
+            "ai_persona": "",
+            "response_length": 1024,
+            "response_temp": 0.6,
+            "selected_folders": "All",
+            "selected_tags": ""},
+        "citation_lookup": {},
+        "thought_chain": {}}
+
+def send_chat(backend_url, body):
+    """Send one chat request and time the first and the last NDJSON event"""
+    start = time.perf_counter()
+    first_event = None
+    error = None
+    with requests.post(f"{backend_url}/chat", json=body, stream=True, timeout=TIMEOUT_VALUE) as response:
+        if response.status_code != 200:
+            error = f"HTTP {response.status_code}"
+        for line in response.iter_lines():
+            if not line:
+                continue
+            if first_event is None:
+                first_event = time.perf_counter() - start
+            event = json.loads(line)
+            if event.get("error"):
+                error = event["error"]
+    total = time.perf_counter() - start
+    return first_event if first_event is not None else total, total, error
+
+def percentile(values, pct):
+    """Return the given percentile of a list of values"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def main(backend_url, concurrency, total_requests, approach):
+    """Main function to run the chat load test"""
+    console.print(f"Sending {total_requests} chat requests to {backend_url} "
+                  f"with concurrency {concurrency}...")
+    bodies = [build_request(QUESTIONS[i % len(QUESTIONS)], approach) for i in range(total_requests)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda body: send_chat(backend_url, body), bodies))
+    elapsed = time.perf_counter() - start
+
+    first_bytes = [r[0] for r in results]
+    totals = [r[1] for r in results]
+    errors = [r[2] for r in results if r[2]]
+
+    table = Table(title="Chat latency (seconds)")
+    table.add_column("Metric")
+    table.add_column("p50")
+    table.add_column("p95")
+    table.add_column("max")
+    for name, values in (("First event", first_bytes), ("Complete answer", totals)):
+        table.add_row(name,
+                      f"{statistics.median(values):.2f}",
+                      f"{percentile(values, 95):.2f}",
+                      f"{max(values):.2f}")
+    console.print(table)
+    console.print(f"Throughput: {total_requests / elapsed:.2f} requests/second")
+    if errors:
+        console.print(f"[red]{len(errors)} requests returned errors, e.g. {errors[0]}[/red]")
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    main(args.backend_url, args.concurrency, args.requests, args.approach)